@@ -6,51 +6,177 @@ Created on Fri Dec 29 17:47:25 2023
 @author: snipermonke
 """
 
+import threading
+import time
+
 from scripts.v2.get_available_liquidity import GetAvailableLiquidity
 from scripts.v2.get_borrow_apr import GetBorrowAPR
 from scripts.v2.get_claimable_fees import GetClaimableFees
 from scripts.v2.get_contract_balance import GetPoolTVL as ContractTVL
 from scripts.v2.get_funding_apr import GetFundingFee
 from scripts.v2.get_gm_prices import GMPrices
-from scripts.v2.get_markets import GetMarkets
 from scripts.v2.get_open_interest import OpenInterest
-from scripts.v2.get_oracle_prices import GetOraclePrices
 from scripts.v2.get_pool_tvl import GetPoolTVL
+from scripts.v2.gmx_utils import submit_many
+from scripts.v2.market_snapshot import MarketSnapshot
+
+# seconds a snapshot is reused for by the stat getters before it is read again
+SNAPSHOT_MAX_AGE = 5
+
+# method of GetGMXv2Stats that gets each stat in collect_all
+STATS_METHODS = {
+    'available_liquidity': 'get_available_liquidity',
+    'borrow_apr': 'get_borrow_apr',
+    'claimable_fees': 'get_claimable_fees',
+    'contract_tvl': 'get_contract_tvl',
+    'funding_apr': 'get_funding_apr',
+    'gm_prices': 'get_gm_price',
+    'markets': 'get_available_markets',
+    'open_interest': 'get_open_interest',
+    'oracle_prices': 'get_oracle_prices',
+    'pool_tvl': 'get_pool_tvl'
+}
 
 
 class GetGMXv2Stats:
 
-    def __init__(self, to_json, to_csv):
+    def __init__(self, to_json, to_csv, snapshot_max_age: float = SNAPSHOT_MAX_AGE):
 
         self.to_json = to_json
         self.to_csv = to_csv
+        self.snapshot_max_age = snapshot_max_age
+        self.snapshots = {}
+        self._snapshot_read_at = {}
+
+        # set on the worker threads of collect_all while they derive stats from its snapshots
+        self._collecting = threading.local()
+
+    def get_snapshot(self, chain):
+        """
+        Get the market snapshot every stat for a chain is derived from. It is read again once it
+        is older than snapshot_max_age seconds, except while collect_all is sharing one snapshot
+        across stats.
+        """
+        is_stale = (
+            chain not in self.snapshots or
+            time.monotonic() - self._snapshot_read_at[chain] >= self.snapshot_max_age
+        )
+        is_collecting = getattr(self._collecting, 'active', False)
+
+        if is_stale and not (is_collecting and chain in self.snapshots):
+            return self.refresh(chain)
+
+        return self.snapshots[chain]
+
+    def refresh(self, chain):
+
+        snapshot = MarketSnapshot(chain=chain).refresh()
+        self.snapshots[chain] = snapshot
+        self._snapshot_read_at[chain] = time.monotonic()
+
+        return snapshot
+
+    def collect_all(self, chains: list, metrics: list = None, refresh: bool = True):
+        """
+        Get several stats for several chains concurrently. The snapshots of every chain are
+        read in parallel, along with contract TVL which is not derived from them, then each stat
+        is derived from its chain's snapshot.
+
+        Parameters
+        ----------
+        chains : list
+            chains to get stats for.
+        metrics : list, optional
+            stats to get, keys of STATS_METHODS. The default is None, which gets every stat.
+        refresh : bool, optional
+            read new snapshots rather than reusing ones already read. The default is True.
+
+        Returns
+        -------
+        dict
+            output of each stat keyed by chain and then stat.
+
+        """
+        if metrics is None:
+            metrics = list(STATS_METHODS)
+
+        for metric in metrics:
+            if metric not in STATS_METHODS:
+                raise Exception('Unknown stat "{}"!'.format(metric))
+
+        snapshot_metrics = [metric for metric in metrics if metric != 'contract_tvl']
+
+        # read snapshots and contract TVL first, they are independent RPC bound work
+        first_round = [
+            (chain, None) for chain in chains
+            if snapshot_metrics and (refresh or chain not in self.snapshots)
+        ]
+        if 'contract_tvl' in metrics:
+            first_round += [(chain, 'contract_tvl') for chain in chains]
+
+        first_round_outputs = submit_many(self._collect, first_round)
+
+        # the remaining stats only process and save their snapshot, sharing it even if reading
+        # every chain took longer than snapshot_max_age
+        second_round = [(chain, metric) for chain in chains for metric in snapshot_metrics]
+        second_round_outputs = submit_many(self._collect, second_round)
+
+        stats = {chain: {} for chain in chains}
+        for (chain, metric), output in zip(
+            first_round + second_round, first_round_outputs + second_round_outputs
+        ):
+            if metric is not None:
+                stats[chain][metric] = output
+
+        return stats
+
+    def _collect(self, item: tuple):
+        """
+        Refresh the snapshot of a chain when metric is None, else get the metric from the
+        snapshot already read. The flag is only set on the thread getting the metric, so other
+        callers of this instance still refresh stale snapshots.
+        """
+        chain, metric = item
+
+        if metric is None:
+            return self.refresh(chain)
+
+        was_collecting = getattr(self._collecting, 'active', False)
+        self._collecting.active = True
+        try:
+            return getattr(self, STATS_METHODS[metric])(chain)
+        finally:
+            self._collecting.active = was_collecting
 
     def get_available_liquidity(self, chain):
 
-        return GetAvailableLiquidity(
+        data = self.get_snapshot(chain).get_available_liquidity()
+
+        GetAvailableLiquidity(
             chain=chain
-        ).get_available_liquidity(
-            to_csv=self.to_csv,
-            to_json=self.to_json
-        )
+        )._save_available_liquidity(data, self.to_json, self.to_csv)
+
+        return data
 
     def get_borrow_apr(self, chain):
 
-        return GetBorrowAPR(
+        data = self.get_snapshot(chain).get_borrow_apr()
+
+        GetBorrowAPR(
             chain=chain
-        ).get_borrow_apr(
-            to_csv=self.to_csv,
-            to_json=self.to_json
-        )
+        )._save_borrow_apr(data, self.to_json, self.to_csv)
+
+        return data
 
     def get_claimable_fees(self, chain):
 
-        return GetClaimableFees(
+        data = self.get_snapshot(chain).get_claimable_fees()
+
+        GetClaimableFees(
             chain=chain
-        ).get_claimable_fees(
-            to_csv=self.to_csv,
-            to_json=self.to_json
-        )
+        )._save_claimable_fees(data, self.to_json, self.to_csv)
+
+        return data
 
     def get_contract_tvl(self, chain):
 
@@ -62,51 +188,51 @@ class GetGMXv2Stats:
 
     def get_funding_apr(self, chain):
 
-        return GetFundingFee(
+        data = self.get_snapshot(chain).get_funding_apr()
+
+        GetFundingFee(
             chain=chain
-        ).get_funding_apr(
-            to_csv=self.to_csv,
-            to_json=self.to_json
-        )
+        )._save_funding_apr(data, self.to_json, self.to_csv)
+
+        return data
 
     def get_gm_price(self, chain):
 
-        return GMPrices(
+        data = self.get_snapshot(chain).get_gm_prices()
+
+        GMPrices(
             chain=chain
-        ).get_price_traders(
-            to_csv=self.to_csv,
-            to_json=self.to_json
-        )
+        )._save_gm_prices(data, self.to_json, self.to_csv)
+
+        return data
 
     def get_available_markets(self, chain):
 
-        return GetMarkets(
-            chain=chain
-        ).get_available_markets()
+        return self.get_snapshot(chain).markets
 
     def get_open_interest(self, chain):
 
-        return OpenInterest(
+        data = self.get_snapshot(chain).get_open_interest()
+
+        OpenInterest(
             chain=chain
-        ).call_open_interest(
-            to_csv=self.to_csv,
-            to_json=self.to_json
-        )
+        )._save_open_interest(data, self.to_json, self.to_csv)
+
+        return data
 
     def get_oracle_prices(self, chain):
 
-        return GetOraclePrices(
-            chain=chain
-        ).get_recent_prices()
+        return self.get_snapshot(chain).oracle_prices
 
     def get_pool_tvl(self, chain):
 
-        return GetPoolTVL(
+        data = self.get_snapshot(chain).get_pool_tvl()
+
+        GetPoolTVL(
             chain=chain
-        ).get_pool_balances(
-            to_csv=self.to_csv,
-            to_json=self.to_json
-        )
+        )._save_pool_balances(data, self.to_json, self.to_csv)
+
+        return data
 
 
 if __name__ == "__main__":
@@ -130,3 +256,9 @@ if __name__ == "__main__":
     open_interest = stats_object.get_open_interest(chain=chain)
     oracle_prices = stats_object.get_oracle_prices(chain=chain)
     pool_tvl = stats_object.get_pool_tvl(chain=chain)
+
+    # or get stats for several chains at once
+    stats = stats_object.collect_all(
+        chains=["arbitrum", "avalanche"],
+        metrics=["open_interest", "funding_apr", "gm_prices"]
+    )
@@ -6,13 +6,9 @@ Created on Thu Dec 28 19:34:37 2023
 @author: snipermonke
 """
 
-import time
 import numpy as np
 from numerize import numerize
-from scripts.v2.get_available_liquidity import GetAvailableLiquidity
-from scripts.v2.get_borrow_apr import GetBorrowAPR
-from scripts.v2.get_funding_apr import GetFundingFee
-from scripts.v2.get_open_interest import OpenInterest
+from scripts.v2.market_snapshot import MarketSnapshot
 from scripts.v2.order_argument_parser import OrderArgumentParser
 from scripts.v2.create_increase_order import IncreaseOrder
 
@@ -27,13 +23,13 @@ def get_data(chain: str = 'arbitrum'):
         Tuple:
         Tuple containing funding data, borrow data, available liquidity, and open interest data.
     """
-    funding_data = GetFundingFee(chain=chain).get_funding_apr()
-    time.sleep(0.5)
-    borrow_data = GetBorrowAPR(chain=chain).get_borrow_apr()
-    time.sleep(0.5)
-    available_liquidity = GetAvailableLiquidity(chain=chain).get_available_liquidity()
-    time.sleep(0.5)
-    open_interest_data = OpenInterest(chain=chain).call_open_interest()
+    # read every metric from one snapshot so they are consistent with each other
+    snapshot = MarketSnapshot(chain=chain).refresh()
+
+    funding_data = snapshot.get_funding_apr()
+    borrow_data = snapshot.get_borrow_apr()
+    available_liquidity = snapshot.get_available_liquidity()
+    open_interest_data = snapshot.get_open_interest()
 
     return funding_data, borrow_data, available_liquidity, open_interest_data
 
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:02:47 2026
+
+@author: snipermonke01
+"""
+
+from scripts.v2.collector import StatsCollector
+
+
+if __name__ == "__main__":
+
+    chains = ["arbitrum", "avalanche"]
+
+    # seconds between collections of each metric, metrics left out are not collected
+    intervals = {
+        'open_interest': 60,
+        'funding_apr': 60,
+        'borrow_apr': 60,
+        'available_liquidity': 60,
+        'gm_prices': 60,
+        'pool_tvl': 300,
+        'claimable_fees': 3600
+    }
+
+    collector = StatsCollector(
+        chains=chains,
+        intervals=intervals,
+        to_json=False,
+        to_csv=False,
+        to_timeseries=True
+    )
+
+    collector.run()
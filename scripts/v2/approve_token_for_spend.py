@@ -6,13 +6,11 @@ Created on Sun Dec  3 20:59:48 2023
 @author: snipermonke01
 """
 
-import json
-import os
-
 from web3 import Web3
 
-from .gmx_utils import create_connection
-from .gmx_utils import base_dir, get_config
+from .gmx_utils import create_connection, get_token_contract, submit_many
+from .gmx_utils import get_config
+from .nonce_manager import get_nonce_manager
 
 
 def check_if_approved(
@@ -46,7 +44,10 @@ def check_if_approved(
     """
 
     config = get_config()
+
+    # read only calls go through the batching connection so balance and allowance share a request
     connection = create_connection(chain=chain)
+    batch_connection = create_connection(chain=chain, batch_requests=True)
 
     spender_checksum_address = Web3.to_checksum_address(spender)
 
@@ -55,30 +56,34 @@ def check_if_approved(
 
     token_checksum_address = Web3.to_checksum_address(token_to_approve)
 
-    token_contract_abi = json.load(open(os.path.join(base_dir,
-                                                     'contracts',
-                                                     'v2',
-                                                     'token_approval.json')))
-    token_contract_obj = connection.eth.contract(address=token_to_approve,
-                                                 abi=token_contract_abi)
+    token_contract_obj = get_token_contract(chain, token_to_approve, 'token_approval.json')
+    batch_token_contract_obj = get_token_contract(
+        chain,
+        token_to_approve,
+        'token_approval.json',
+        batch_requests=True
+    )
 
     # TODO - for AVAX support this will need to incl WAVAX address
     if token_checksum_address == "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1":
-        try:
-            balance_of = connection.eth.getBalance(user_checksum_address)
-        except AttributeError:
-            balance_of = connection.eth.get_balance(user_checksum_address)
+        def balance_of_call():
+            return batch_connection.eth.get_balance(user_checksum_address)
 
     else:
-        balance_of = token_contract_obj.functions.balanceOf(user_checksum_address).call()
-
-    if balance_of < amount_of_tokens_to_spend:
-        raise Exception("Insufficient balance!")
+        balance_of_call = batch_token_contract_obj.functions.balanceOf(user_checksum_address).call
 
-    amount_approved = token_contract_obj.functions.allowance(
+    allowance_call = batch_token_contract_obj.functions.allowance(
         user_checksum_address,
         spender_checksum_address
-    ).call()
+    ).call
+
+    balance_of, amount_approved = submit_many(
+        lambda call: call(),
+        [balance_of_call, allowance_call]
+    )
+
+    if balance_of < amount_of_tokens_to_spend:
+        raise Exception("Insufficient balance!")
 
     print("Checking coins for approval..")
     if amount_approved < amount_of_tokens_to_spend and approve:
@@ -86,22 +91,21 @@ def check_if_approved(
         print('Approving contract "{}" to spend {} tokens belonging to token address: {}'.format(
             spender_checksum_address, amount_of_tokens_to_spend, token_checksum_address))
 
-        nonce = connection.eth.get_transaction_count(user_checksum_address)
-
-        arguments = spender_checksum_address, amount_of_tokens_to_spend
-        raw_txn = token_contract_obj.functions.approve(
-            *arguments
-        ).build_transaction({
-            'value': 0,
-            'chainId': 42161,
-            'gas': 4000000,
-            'maxFeePerGas': Web3.to_wei('0.1', 'gwei'),
-            'maxPriorityFeePerGas': Web3.to_wei('0.1', 'gwei'),
-            'nonce': nonce})
-
-        signed_txn = connection.eth.account.sign_transaction(raw_txn,
-                                                             config['private_key'])
-        tx_hash = connection.eth.send_raw_transaction(signed_txn.rawTransaction)
+        with get_nonce_manager(chain, user_checksum_address).use_nonce() as nonce:
+            arguments = spender_checksum_address, amount_of_tokens_to_spend
+            raw_txn = token_contract_obj.functions.approve(
+                *arguments
+            ).build_transaction({
+                'value': 0,
+                'chainId': 42161,
+                'gas': 4000000,
+                'maxFeePerGas': Web3.to_wei('0.1', 'gwei'),
+                'maxPriorityFeePerGas': Web3.to_wei('0.1', 'gwei'),
+                'nonce': nonce})
+
+            signed_txn = connection.eth.account.sign_transaction(raw_txn,
+                                                                 config['private_key'])
+            tx_hash = connection.eth.send_raw_transaction(signed_txn.rawTransaction)
 
         print("Txn submitted!")
         print("Check status: https://arbiscan.io/tx/{}".format(tx_hash.hex()))
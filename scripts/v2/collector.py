@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:26:14 2026
+
+@author: snipermonke01
+"""
+
+import asyncio
+import logging
+import time
+
+import pandas as pd
+
+from .get_available_liquidity import GetAvailableLiquidity
+from .get_borrow_apr import GetBorrowAPR
+from .get_claimable_fees import GetClaimableFees
+from .get_funding_apr import GetFundingFee
+from .get_gm_prices import GMPrices
+from .get_open_interest import OpenInterest
+from .get_pool_tvl import GetPoolTVL
+from .gmx_utils import get_executor
+from .market_snapshot import MarketSnapshot
+from .timeseries_store import TimeSeriesStore
+
+# seconds between collections of each metric
+DEFAULT_COLLECTOR_INTERVALS = {
+    'open_interest': 60,
+    'funding_apr': 60,
+    'borrow_apr': 60,
+    'available_liquidity': 60,
+    'gm_prices': 60,
+    'pool_tvl': 300,
+    'claimable_fees': 3600
+}
+
+# MarketSnapshot getter of each metric
+COLLECTOR_METRICS = {
+    'open_interest': 'get_open_interest',
+    'funding_apr': 'get_funding_apr',
+    'borrow_apr': 'get_borrow_apr',
+    'available_liquidity': 'get_available_liquidity',
+    'gm_prices': 'get_gm_prices',
+    'pool_tvl': 'get_pool_tvl',
+    'claimable_fees': 'get_claimable_fees'
+}
+
+
+def get_timeseries_rows(metric: str, data: dict):
+    """
+    Split the output of a metric into the rows written to the time series store, named as the
+    datastore csv files are
+
+    Parameters
+    ----------
+    metric : str
+        name of the metric, one of COLLECTOR_METRICS.
+    data : dict
+        output of the metric.
+
+    Returns
+    -------
+    dict
+        row of values keyed by store metric name.
+
+    """
+    if metric == 'gm_prices':
+        return {'gm_prices': data}
+
+    if metric == 'pool_tvl':
+        return {'total_tvl': data['total_tvl']}
+
+    if metric == 'claimable_fees':
+        return {'total_fees': data}
+
+    return {
+        'long_{}'.format(metric): data['long'],
+        'short_{}'.format(metric): data['short']
+    }
+
+
+class StatsCollector:
+    """
+    Long running collector of GMX stats. Each chain keeps a warm MarketSnapshot, so connections,
+    contracts, markets and token metadata are only loaded once, and chains are polled
+    concurrently on one event loop.
+
+    Every metric is polled on its own interval. When metrics are due on a chain the snapshot is
+    refreshed once, reading only the due metrics (and open interest for funding and liquidity),
+    and every due metric is derived from it, then written to the time series store and/or the
+    datastore json and csv files.
+    """
+
+    def __init__(
+        self,
+        chains: list,
+        intervals: dict = None,
+        to_json: bool = False,
+        to_csv: bool = False,
+        store: TimeSeriesStore = None,
+        to_timeseries: bool = True
+    ):
+
+        if intervals is None:
+            intervals = DEFAULT_COLLECTOR_INTERVALS
+
+        for metric in intervals:
+            if metric not in COLLECTOR_METRICS:
+                raise Exception('Unknown metric "{}"!'.format(metric))
+
+        if to_timeseries and store is None:
+            store = TimeSeriesStore()
+
+        self.chains = chains
+        self.intervals = dict(intervals)
+        self.to_json = to_json
+        self.to_csv = to_csv
+        self.store = store if to_timeseries else None
+
+        self.snapshots = {chain: MarketSnapshot(chain=chain) for chain in chains}
+        self._savers = {chain: self._get_savers(chain) for chain in chains}
+        self._next_runs = {
+            (chain, metric): 0 for chain in chains for metric in self.intervals
+        }
+
+        self._loop = None
+        self._stop_event = None
+
+    def run(self, iterations: int = None):
+        """
+        Run the collector until stopped, or interrupted with ctrl+c
+
+        Parameters
+        ----------
+        iterations : int, optional
+            stop each chain after this many collections. The default is None, which runs until
+            stopped.
+
+        """
+        try:
+            asyncio.run(self.arun(iterations))
+        except KeyboardInterrupt:
+            logging.info("Collector stopped")
+
+    async def arun(self, iterations: int = None):
+        """
+        Async version of run, for use in an existing event loop
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+
+        await asyncio.gather(
+            *[self._arun_chain(chain, iterations) for chain in self.chains]
+        )
+
+    def stop(self):
+        """
+        Stop a running collector, can be called from any thread
+        """
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+    async def acollect(self, chain: str, metrics: list):
+        """
+        Refresh the given metrics in the snapshot of a chain and write them from it
+
+        Parameters
+        ----------
+        chain : str
+            chain to collect.
+        metrics : list
+            metrics to write.
+
+        """
+        snapshot = await self.snapshots[chain].arefresh(metrics=metrics)
+
+        # processing and writing is blocking, keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(
+            get_executor(), self._write_metrics, chain, metrics, snapshot
+        )
+
+    async def _arun_chain(self, chain: str, iterations: int):
+        collections = 0
+
+        while not self._stop_event.is_set():
+
+            if iterations is not None and collections >= iterations:
+                return
+
+            now = time.monotonic()
+            due = [
+                metric for metric in self.intervals if self._next_runs[(chain, metric)] <= now
+            ]
+
+            if due:
+                try:
+                    await self.acollect(chain, due)
+
+                # keep collecting, the metrics are tried again on their next interval
+                except Exception as e:
+                    logging.warning("Failed to collect {} on {}: {}".format(due, chain, e))
+
+                for metric in due:
+                    self._next_runs[(chain, metric)] = now + self.intervals[metric]
+
+                collections += 1
+
+            wait = min(
+                self._next_runs[(chain, metric)] for metric in self.intervals
+            ) - time.monotonic()
+
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=max(wait, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    def _write_metrics(self, chain: str, metrics: list, snapshot: MarketSnapshot):
+        """
+        Derive each metric from the snapshot and write it to the sinks
+        """
+        # every row of one collection shares the same timestamp
+        timestamp = pd.Timestamp.now(tz='UTC')
+
+        for metric in metrics:
+            data = getattr(snapshot, COLLECTOR_METRICS[metric])()
+
+            if self.to_json or self.to_csv:
+                self._savers[chain][metric](data, self.to_json, self.to_csv)
+
+            if self.store is not None:
+                for name, row in get_timeseries_rows(metric, data).items():
+                    self.store.append(chain, name, row, timestamp=timestamp)
+
+        logging.info("Collected {} on {} at block {}".format(
+            metrics, chain, snapshot.block_number
+        ))
+
+    def _get_savers(self, chain: str):
+        """
+        Save helper of each metric, writing the datastore json and csv files
+        """
+        return {
+            'open_interest': OpenInterest(chain=chain)._save_open_interest,
+            'funding_apr': GetFundingFee(chain=chain)._save_funding_apr,
+            'borrow_apr': GetBorrowAPR(chain=chain)._save_borrow_apr,
+            'available_liquidity': GetAvailableLiquidity(chain=chain)._save_available_liquidity,
+            'gm_prices': GMPrices(chain=chain)._save_gm_prices,
+            'pool_tvl': GetPoolTVL(chain=chain)._save_pool_balances,
+            'claimable_fees': GetClaimableFees(chain=chain)._save_claimable_fees
+        }
+
+
+if __name__ == "__main__":
+
+    StatsCollector(chains=["arbitrum"]).run(iterations=1)
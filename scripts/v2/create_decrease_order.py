@@ -1,6 +1,4 @@
 from .order import Order
-from .gas_utils import get_gas_limits
-from .gmx_utils import (get_datastore_contract)
 
 
 class DecreaseOrder(Order):
@@ -20,6 +18,5 @@ class DecreaseOrder(Order):
         self.order_builder(is_close=True)
 
     def determine_gas_limits(self):
-        datastore = get_datastore_contract(self.chain)
-        self._gas_limits = get_gas_limits(datastore)
+        super().determine_gas_limits()
         self._gas_limits_order_type = self._gas_limits["decrease_order"]
@@ -1,11 +1,9 @@
 from web3 import Web3
 
 from .order import Order
-from .gas_utils import get_gas_limits
 from .get_oracle_prices import GetOraclePrices
 from .gmx_utils import (
-    find_dictionary_by_key_value, get_estimated_swap_output, contract_map,
-    get_datastore_contract
+    find_dictionary_by_key_value, get_estimated_swap_output, contract_map
 )
 
 
@@ -27,13 +25,13 @@ class SwapOrder(Order):
         self.order_builder(is_swap=True)
 
     def determine_gas_limits(self):
-        datastore = get_datastore_contract(self.chain)
-        self._gas_limits = get_gas_limits(datastore)
+        super().determine_gas_limits()
         self._gas_limits_order_type = self._gas_limits["swap_order"]
 
-    def estimated_swap_output(self, market, in_token, in_token_amount):
+    def estimated_swap_output(self, market, in_token, in_token_amount, prices: dict = None):
         print(in_token)
-        prices = GetOraclePrices(chain=self.chain).get_recent_prices()
+        if prices is None:
+            prices = GetOraclePrices(chain=self.chain).get_recent_prices()
 
         # For every path we through we need to call this to get the expected
         # output after x number of swaps
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 16:37:52 2026
+
+@author: snipermonke01
+"""
+
+from .gmx_utils import get_datastore_contract, create_async_connection
+from .multicall import execute_multicall, async_execute_multicall
+
+# datastore getter for each value type
+VALUE_TYPE_FUNCTIONS = {
+    "uint": "getUint",
+    "int": "getInt",
+    "bytes32": "getBytes32",
+    "address": "getAddress",
+    "bool": "getBool",
+    "string": "getString"
+}
+
+
+class DataStoreReader:
+    """
+    Reads many datastore values in one multicall round trip, optionally pinned to a block.
+
+    Keys can be passed as a list or a dict of keys from keys.py. Each key is read as
+    value_type, unless it is passed as a (key, value_type) tuple. Results come back in the same
+    shape as the keys, a failed read returns None.
+    """
+
+    def __init__(self, chain: str = None, block_identifier: int = None, datastore_object=None):
+
+        if chain is None and datastore_object is None:
+            raise Exception("Either chain or datastore_object must be passed!")
+
+        self.chain = chain
+        self.block_identifier = block_identifier
+
+        if datastore_object is None:
+            datastore_object = get_datastore_contract(chain)
+
+        self.datastore_object = datastore_object
+
+    def get_call(self, key: bytes, value_type: str = "uint"):
+        """
+        Build the uncalled datastore query for a key
+
+        Parameters
+        ----------
+        key : bytes
+            hashed datastore key.
+        value_type : str, optional
+            one of VALUE_TYPE_FUNCTIONS. The default is "uint".
+
+        Returns
+        -------
+        web3._utils.contracts.ContractFunction
+            uncalled web3 query.
+
+        """
+        try:
+            function_name = VALUE_TYPE_FUNCTIONS[value_type]
+        except KeyError:
+            raise Exception('Unknown datastore value type "{}"!'.format(value_type))
+
+        return getattr(self.datastore_object.functions, function_name)(key)
+
+    def get_calls(self, keys: list, value_type: str = "uint"):
+        """
+        Build the uncalled datastore queries for a list of keys, to be executed together with
+        other queries in one multicall
+
+        Parameters
+        ----------
+        keys : list
+            hashed datastore keys, or (key, value_type) tuples.
+        value_type : str, optional
+            value type of keys not passed as tuples. The default is "uint".
+
+        Returns
+        -------
+        list
+            uncalled web3 queries in the same order as keys.
+
+        """
+        calls = []
+        for key in keys:
+            if isinstance(key, tuple):
+                key, key_value_type = key
+            else:
+                key_value_type = value_type
+
+            calls.append(self.get_call(key, key_value_type))
+
+        return calls
+
+    def read(self, keys, value_type: str = "uint", allow_failure: bool = True):
+        """
+        Read every key in one multicall
+
+        Parameters
+        ----------
+        keys : list or dict
+            hashed datastore keys, or (key, value_type) tuples.
+        value_type : str, optional
+            value type of keys not passed as tuples. The default is "uint".
+        allow_failure : bool, optional
+            if True a failed read returns None instead of raising. The default is True.
+
+        Returns
+        -------
+        list or dict
+            values in the same order or with the same dict keys as keys.
+
+        """
+        if isinstance(keys, dict):
+            names = list(keys)
+            values = self.read([keys[name] for name in names], value_type, allow_failure)
+            return dict(zip(names, values))
+
+        return execute_multicall(
+            self.get_calls(keys, value_type),
+            block_identifier=self.block_identifier,
+            allow_failure=allow_failure
+        )
+
+    async def aread(self, keys, value_type: str = "uint", allow_failure: bool = True):
+        """
+        Async version of read
+
+        Parameters
+        ----------
+        keys : list or dict
+            hashed datastore keys, or (key, value_type) tuples.
+        value_type : str, optional
+            value type of keys not passed as tuples. The default is "uint".
+        allow_failure : bool, optional
+            if True a failed read returns None instead of raising. The default is True.
+
+        Returns
+        -------
+        list or dict
+            values in the same order or with the same dict keys as keys.
+
+        """
+        if isinstance(keys, dict):
+            names = list(keys)
+            values = await self.aread(
+                [keys[name] for name in names], value_type, allow_failure
+            )
+            return dict(zip(names, values))
+
+        if self.chain is None:
+            raise Exception("Async reads need the reader to be created with a chain!")
+
+        return await async_execute_multicall(
+            create_async_connection(chain=self.chain),
+            self.get_calls(keys, value_type),
+            block_identifier=self.block_identifier,
+            allow_failure=allow_failure
+        )
+
+    def read_key_index(self, key_index, names: list = None):
+        """
+        Read the uint values of every row of a MarketKeyIndex in one multicall
+
+        Parameters
+        ----------
+        key_index : MarketKeyIndex
+            precomputed market keys, from keys.get_market_key_index.
+        names : list, optional
+            only read keys with these names. The default is None, which reads every key.
+
+        Returns
+        -------
+        dict
+            values keyed by (market, key name).
+
+        """
+        rows = [
+            row for row in key_index if names is None or row[1] in names
+        ]
+
+        return dict(
+            zip(
+                [(market_key, name) for market_key, name, key in rows],
+                self.read([key for market_key, name, key in rows])
+            )
+        )
+
+
+if __name__ == "__main__":
+
+    from .keys import get_market_key_index
+    from .get_markets import GetMarkets
+
+    key_index = get_market_key_index(
+        "arbitrum", GetMarkets(chain="arbitrum").get_available_markets()
+    )
+    values = DataStoreReader(chain="arbitrum").read_key_index(key_index, names=["pool_amount_long"])
@@ -10,56 +10,76 @@ from .keys import decrease_order_gas_limit_key, increase_order_gas_limit_key, \
     execution_gas_fee_base_amount_key, execution_gas_fee_multiplier_key, single_swap_gas_limit_key,\
     swap_order_gas_limit_key
 
+from .datastore_reader import DataStoreReader
 from .gmx_utils import apply_factor, get_datastore_contract, create_connection
 
 
-def get_execution_fee(gas_limits: dict, estimated_gas_limit, gas_price: int):
+def get_execution_fee(gas_limits: dict, estimated_gas_limit: int, gas_price: int):
     """
-    Given a dictionary of gas_limits, the uncalled datastore object of a given operation, and the
-    latest gas price, calculate the minimum execution fee required to perform an action
+    Given a dictionary of gas_limits, the gas limit of a given operation, and the latest gas
+    price, calculate the minimum execution fee required to perform an action
 
     Parameters
     ----------
     gas_limits : dict
-        dictionary of uncalled datastore limit obkects.
-    estimated_gas_limit : datastore_object
-        the uncalled datastore object specific to operation that will be undertaken.
+        dictionary of gas limits, as output by get_gas_limits.
+    estimated_gas_limit : int
+        the gas limit specific to operation that will be undertaken.
     gas_price : int
         latest gas price.
 
     """
 
-    base_gas_limit = gas_limits['estimated_fee_base_gas_limit'].call()
-    multiplier_factor = gas_limits['estimated_fee_multiplier_factor'].call()
-    adjusted_gas_limit = base_gas_limit + apply_factor(estimated_gas_limit.call(),
+    base_gas_limit = gas_limits['estimated_fee_base_gas_limit']
+    multiplier_factor = gas_limits['estimated_fee_multiplier_factor']
+    adjusted_gas_limit = base_gas_limit + apply_factor(estimated_gas_limit,
                                                        multiplier_factor)
 
     return adjusted_gas_limit * gas_price
 
 
-def get_gas_limits(datastore_object):
+def get_gas_limits(datastore_object, block_identifier: int = None):
     """
-    Given a Web3 contract object of the datstore, return a dictionary with the uncalled gas limits
-    that correspond to various operations that will require the execution fee to calculated for.
+    Given a Web3 contract object of the datstore, return a dictionary with the gas limits that
+    correspond to various operations that will require the execution fee to calculated for. All
+    limits are read from the datastore in one multicall.
 
     Parameters
     ----------
     datastore_object : web3 object
         contract connection.
+    block_identifier : int, optional
+        block to read at. The default is None, which uses the latest block.
+
+    Returns
+    -------
+    gas_limits : dict
+        gas limits keyed by operation. These are values, earlier versions returned uncalled
+        datastore functions which had to be called with .call().
 
     """
-    gas_limits = {
-        "deposit_single_token": None,
-        "deposit_multi_token": None,
-        "withdraw_multi_token": None,
-        "single_swap": datastore_object.functions.getUint(single_swap_gas_limit_key()),
-        "swap_order": datastore_object.functions.getUint(swap_order_gas_limit_key()),
-        "increase_order": datastore_object.functions.getUint(increase_order_gas_limit_key()),
-        "decrease_order": datastore_object.functions.getUint(decrease_order_gas_limit_key()),
-        "estimated_fee_base_gas_limit": datastore_object.functions.getUint(
-            execution_gas_fee_base_amount_key()),
-        "estimated_fee_multiplier_factor": datastore_object.functions.getUint(
-            execution_gas_fee_multiplier_key())}
+    gas_limits = DataStoreReader(
+        datastore_object=datastore_object,
+        block_identifier=block_identifier
+    ).read(
+        {
+            "single_swap": single_swap_gas_limit_key(),
+            "swap_order": swap_order_gas_limit_key(),
+            "increase_order": increase_order_gas_limit_key(),
+            "decrease_order": decrease_order_gas_limit_key(),
+            "estimated_fee_base_gas_limit": execution_gas_fee_base_amount_key(),
+            "estimated_fee_multiplier_factor": execution_gas_fee_multiplier_key()
+        },
+        allow_failure=False
+    )
+
+    gas_limits.update(
+        {
+            "deposit_single_token": None,
+            "deposit_multi_token": None,
+            "withdraw_multi_token": None
+        }
+    )
 
     return gas_limits
 
@@ -8,24 +8,57 @@ Created on Fri Aug 11 21:20:01 2023
 
 import os
 import json
-import time
+import asyncio
+import logging
 
 import numpy as np
 
 from numerize import numerize
 
+from .datastore_reader import DataStoreReader
 from .get_markets import GetMarkets
-from .gmx_utils import base_dir, execute_threading, save_json_file_to_datastore, \
-    make_timestamped_dataframe, save_csv_to_datastore
+from .gmx_utils import base_dir, save_json_file_to_datastore, make_timestamped_dataframe, \
+    save_csv_to_datastore, create_async_connection
+from .multicall import execute_multicall_groups, async_execute_multicall_groups
 
 from .get_oracle_prices import GetOraclePrices
 from .get_open_interest import OpenInterest
 from .keys import (
-    get_datastore_contract, pool_amount_key, reserve_factor_key,
-    open_interest_reserve_factor_key
+    pool_amount_key, reserve_factor_key, open_interest_reserve_factor_key, get_market_key_index
 )
 
 
+class AvailableLiquidityRecord:
+    """
+    Pool amount and reserve factor queries of one market and the values needed to process their
+    outputs
+    """
+    __slots__ = (
+        'market_symbol', 'reserved_long', 'reserved_short', 'token_price', 'long_precision',
+        'short_precision', 'long_pool_amount', 'short_pool_amount', 'long_reserve_factor',
+        'short_reserve_factor', 'long_open_interest_reserve_factor',
+        'short_open_interest_reserve_factor'
+    )
+
+    def __init__(
+        self, market_symbol, reserved_long, reserved_short, token_price, long_precision,
+        short_precision, long_pool_amount, short_pool_amount, long_reserve_factor,
+        short_reserve_factor, long_open_interest_reserve_factor, short_open_interest_reserve_factor
+    ):
+        self.market_symbol = market_symbol
+        self.reserved_long = reserved_long
+        self.reserved_short = reserved_short
+        self.token_price = token_price
+        self.long_precision = long_precision
+        self.short_precision = short_precision
+        self.long_pool_amount = long_pool_amount
+        self.short_pool_amount = short_pool_amount
+        self.long_reserve_factor = long_reserve_factor
+        self.short_reserve_factor = short_reserve_factor
+        self.long_open_interest_reserve_factor = long_open_interest_reserve_factor
+        self.short_open_interest_reserve_factor = short_open_interest_reserve_factor
+
+
 class GetAvailableLiquidity:
 
     def __init__(self, chain: str, use_local_datastore: bool = False):
@@ -53,6 +86,39 @@ class GetAvailableLiquidity:
         """
         data = self._available_liquidity()
 
+        self._save_available_liquidity(data, to_json, to_csv)
+
+        if not to_csv:
+            return data
+
+    async def aget_available_liquidity(self, to_json: bool = False, to_csv: bool = False):
+        """
+        Async version of get_available_liquidity
+
+        Parameters
+        ----------
+        to_json : bool, optional
+            save output to json file. The default is False.
+        to_csv : bool, optional
+            save out to csv file. The default is False.
+
+        Returns
+        -------
+        data : dict
+            dictionary of data.
+
+        """
+        data = await self._aavailable_liquidity()
+
+        self._save_available_liquidity(data, to_json, to_csv)
+
+        if not to_csv:
+            return data
+
+    def _save_available_liquidity(self, data: dict, to_json: bool, to_csv: bool):
+        """
+        Save available liquidity data to the datastore as json and/or csv
+        """
         if to_json:
             save_json_file_to_datastore(
                 "{}_available_liquidity.json".format(self.chain),
@@ -71,8 +137,16 @@ class GetAvailableLiquidity:
                 short_dataframe
             )
 
-        else:
-            return data
+    def _load_local_open_interest(self):
+        return json.load(
+            open(
+                os.path.join(
+                    base_dir,
+                    "data_store",
+                    "{}_open_interest.json".format(self.chain)
+                )
+            )
+        )
 
     def _available_liquidity(self):
         """
@@ -85,42 +159,76 @@ class GetAvailableLiquidity:
 
         """
         if self.use_local_datastore:
-            open_interest = json.load(
-                open(
-                    os.path.join(
-                        base_dir,
-                        "data_store",
-                        "{}_open_interest.json".format(self.chain)
-                    )
-                )
-            )
+            open_interest = self._load_local_open_interest()
         else:
             open_interest = OpenInterest(chain=self.chain).call_open_interest(
                 to_json=False
             )
 
         markets = GetMarkets(chain=self.chain).get_available_markets()
-        available_liquidity = {
-            "long": {
-            },
-            "short": {
-            }
-        }
+        prices = GetOraclePrices(chain=self.chain).get_recent_prices()
 
-        print("\nGMX v2 Available Liquidity\n")
+        queries = self._build_available_liquidity_queries(markets, prices, open_interest)
+
+        # read every market in one multicall so all values come from the same block
+        outputs = execute_multicall_groups(*queries['calls'])
+
+        return self._process_available_liquidity(queries, outputs)
 
-        reserved_long_list = []
-        reserved_short_list = []
-        token_price_list = []
-        mapper = []
-        long_pool_amount_list = []
-        long_reserve_factor_list = []
-        long_open_interest_reserve_factor_list = []
-        short_pool_amount_list = []
-        short_reserve_factor_list = []
-        short_open_interest_reserve_factor_list = []
-        long_precision_list = []
-        short_precision_list = []
+    async def _aavailable_liquidity(self):
+        """
+        Async version of _available_liquidity, open interest, markets and prices are fetched
+        concurrently
+
+        Returns
+        -------
+        funding_apr : dict
+            dictionary of available liquidity
+
+        """
+        if self.use_local_datastore:
+            markets, prices = await asyncio.gather(
+                GetMarkets(chain=self.chain).aget_available_markets(),
+                GetOraclePrices(chain=self.chain).aget_recent_prices()
+            )
+            open_interest = self._load_local_open_interest()
+        else:
+            open_interest, markets, prices = await asyncio.gather(
+                OpenInterest(chain=self.chain).acall_open_interest(to_json=False),
+                GetMarkets(chain=self.chain).aget_available_markets(),
+                GetOraclePrices(chain=self.chain).aget_recent_prices()
+            )
+
+        queries = self._build_available_liquidity_queries(markets, prices, open_interest)
+
+        outputs = await async_execute_multicall_groups(
+            create_async_connection(chain=self.chain),
+            *queries['calls']
+        )
+
+        return self._process_available_liquidity(queries, outputs)
+
+    def _build_available_liquidity_queries(self, markets: dict, prices: dict, open_interest: dict):
+        """
+        Build the uncalled pool amount and reserve factor queries for every non swap market
+
+        Parameters
+        ----------
+        markets : dict
+            dictionary of available markets.
+        prices : dict
+            dictionary of oracle prices keyed by token address.
+        open_interest : dict
+            open interest data, as output by OpenInterest.
+
+        Returns
+        -------
+        dict
+            call groups for the multicall, with a record per market to process the outputs with.
+
+        """
+        records = []
+        key_index = get_market_key_index(self.chain, markets)
 
         for market_key in markets:
 
@@ -129,8 +237,9 @@ class GetAvailableLiquidity:
             if "SWAP" in market_symbol:
                 continue
 
-            # collate market symbol to map dictionary later
-            mapper = mapper + [market_symbol]
+            # skip markets which open interest could not be read for
+            if market_symbol not in open_interest['long']:
+                continue
 
             # calculate long pool metrics
             long_token_address = markets[market_key]['long_token_address']
@@ -138,40 +247,25 @@ class GetAvailableLiquidity:
                 long_open_interest_reserve_factor = self.get_max_reserved_usd(
                     market_key,
                     long_token_address,
-                    True
+                    True,
+                    key_index
                 )
             long_precision = 10**(30+markets[market_key]['long_token_metadata']['decimals'])
 
-            # collate long side lists to iterate through
-            reserved_long_list = reserved_long_list + [open_interest['long'][market_symbol]]
-            long_pool_amount_list = long_pool_amount_list + [long_pool_amount]
-            long_reserve_factor_list = long_reserve_factor_list + [long_reserve_factor]
-            long_open_interest_reserve_factor_list = long_open_interest_reserve_factor_list + \
-                [long_open_interest_reserve_factor]
-            long_precision_list = long_precision_list + [long_precision]
-
             # calculate short pool metrics
             short_token_address = markets[market_key]['short_token_address']
             short_pool_amount, short_reserve_factor, \
                 short_open_interest_reserve_factor = self.get_max_reserved_usd(
                     market_key,
                     short_token_address,
-                    False
+                    False,
+                    key_index
                 )
             short_precision = 10**(
                 30 + markets[market_key]['short_token_metadata']['decimals']
             )
 
-            # collate short side lists to iterate through
-            reserved_short_list = reserved_short_list + [open_interest['short'][market_symbol]]
-            short_pool_amount_list = short_pool_amount_list + [short_pool_amount]
-            short_reserve_factor_list = short_reserve_factor_list + [short_reserve_factor]
-            short_open_interest_reserve_factor_list = short_open_interest_reserve_factor_list + \
-                [short_open_interest_reserve_factor]
-            short_precision_list = short_precision_list + [short_precision]
-
             # calculate token price
-            prices = GetOraclePrices(chain=self.chain).get_recent_prices()
             oracle_precision = 10**(30-markets[market_key]['long_token_metadata']['decimals'])
 
             token_price = np.median([float(
@@ -179,48 +273,88 @@ class GetAvailableLiquidity:
                 float(prices[long_token_address]['minPriceFull'])/oracle_precision]
             )
 
-            # collate token price to iterate through
-            token_price_list = token_price_list + [token_price]
+            records.append(
+                AvailableLiquidityRecord(
+                    market_symbol,
+                    open_interest['long'][market_symbol],
+                    open_interest['short'][market_symbol],
+                    token_price,
+                    long_precision,
+                    short_precision,
+                    long_pool_amount,
+                    short_pool_amount,
+                    long_reserve_factor,
+                    short_reserve_factor,
+                    long_open_interest_reserve_factor,
+                    short_open_interest_reserve_factor
+                )
+            )
+
+        return {
+            'calls': [
+                [record.long_pool_amount for record in records],
+                [record.short_pool_amount for record in records],
+                [record.long_reserve_factor for record in records],
+                [record.short_reserve_factor for record in records],
+                [record.long_open_interest_reserve_factor for record in records],
+                [record.short_open_interest_reserve_factor for record in records]
+            ],
+            'records': records
+        }
 
-        # TODO - Series of sleeps to stop ratelimit on the RPC, should have retry
-        long_pool_amount_output = execute_threading(long_pool_amount_list)
-        time.sleep(0.2)
+    def _process_available_liquidity(self, queries: dict, outputs: list):
+        """
+        Turn the multicall outputs of the liquidity queries into the available liquidity dictionary
 
-        short_pool_amount_output = execute_threading(short_pool_amount_list)
-        time.sleep(0.2)
+        Parameters
+        ----------
+        queries : dict
+            output of _build_available_liquidity_queries.
+        outputs : list
+            grouped multicall outputs, in the same order as queries['calls'].
 
-        long_reserve_factor_list_output = execute_threading(long_reserve_factor_list)
-        time.sleep(0.2)
+        Returns
+        -------
+        available_liquidity : dict
+            dictionary of available liquidity
 
-        short_reserve_factor_list_output = execute_threading(short_reserve_factor_list)
-        time.sleep(0.2)
+        """
+        available_liquidity = {
+            "long": {
+            },
+            "short": {
+            }
+        }
 
-        long_open_interest_reserve_factor_list_output = execute_threading(
-            long_open_interest_reserve_factor_list
-        )
-        time.sleep(0.2)
+        print("\nGMX v2 Available Liquidity\n")
 
-        short_open_interest_reserve_factor_list_output = execute_threading(
-            short_open_interest_reserve_factor_list
-        )
+        long_pool_amount_output, short_pool_amount_output, long_reserve_factor_list_output, \
+            short_reserve_factor_list_output, long_open_interest_reserve_factor_list_output, \
+            short_open_interest_reserve_factor_list_output = outputs
 
-        for long_pool_amount, short_pool_amount, long_reserve_factor, short_reserve_factor, \
-                long_open_interest_reserve_factor, short_open_interest_reserve_factor, \
-                reserved_long, reserved_short, token_price, token_symbol, long_precision, \
-                short_precision in zip(
+        for record, long_pool_amount, short_pool_amount, long_reserve_factor, \
+                short_reserve_factor, long_open_interest_reserve_factor, \
+                short_open_interest_reserve_factor in zip(
+                    queries['records'],
                     long_pool_amount_output,
                     short_pool_amount_output,
                     long_reserve_factor_list_output,
                     short_reserve_factor_list_output,
                     long_open_interest_reserve_factor_list_output,
-                    short_open_interest_reserve_factor_list_output,
-                    reserved_long_list,
-                    reserved_short_list,
-                    token_price_list,
-                    mapper,
-                    long_precision_list,
-                    short_precision_list
+                    short_open_interest_reserve_factor_list_output
                 ):
+            token_symbol = record.market_symbol
+            reserved_long = record.reserved_long
+            reserved_short = record.reserved_short
+            token_price = record.token_price
+            long_precision = record.long_precision
+            short_precision = record.short_precision
+
+            if None in (long_pool_amount, short_pool_amount, long_reserve_factor,
+                        short_reserve_factor, long_open_interest_reserve_factor,
+                        short_open_interest_reserve_factor):
+                logging.warning("Skipping {}, liquidity query failed!".format(token_symbol))
+                continue
 
             print(token_symbol)
 
@@ -262,7 +396,9 @@ class GetAvailableLiquidity:
 
         return available_liquidity
 
-    def get_max_reserved_usd(self, market: str, token: str, is_long: bool):
+    def get_max_reserved_usd(
+        self, market: str, token: str, is_long: bool, key_index=None
+    ):
         """
         For a given market, long/short token and pool direction get the uncalled web3 functions to
         calculate pool size, pool reserve factor and open interest reserve factor
@@ -275,6 +411,9 @@ class GetAvailableLiquidity:
             contract address of long or short token.
         is_long : bool
             pass True for long pool or False for short.
+        key_index : MarketKeyIndex, optional
+            precomputed keys of the market set, the keys are hashed for the market if not passed.
+            The default is None.
 
         Returns
         -------
@@ -287,32 +426,23 @@ class GetAvailableLiquidity:
 
         """
 
-        # get web3 datastore object
-        datastore = get_datastore_contract(self.chain)
-
-        # get hashed keys for datastore
-        pool_amount_hash_data = pool_amount_key(
-            market,
-            token
-        )
-        reserve_factor_hash_data = reserve_factor_key(
-            market,
-            is_long
-        )
-        open_interest_reserve_factor_hash_data = open_interest_reserve_factor_key(
-            market,
-            is_long
-        )
-
-        pool_amount = datastore.functions.getUint(
-            pool_amount_hash_data
-        )
-        reserve_factor = datastore.functions.getUint(
-            reserve_factor_hash_data
-        )
-        open_interest_reserve_factor = datastore.functions.getUint(
-            open_interest_reserve_factor_hash_data
-        )
+        if key_index is None:
+            keys = [
+                pool_amount_key(market, token),
+                reserve_factor_key(market, is_long),
+                open_interest_reserve_factor_key(market, is_long)
+            ]
+        else:
+            side = "long" if is_long else "short"
+            keys = [
+                key_index.get(market, "pool_amount_{}".format(side)),
+                key_index.get(market, "reserve_factor_{}".format(side)),
+                key_index.get(market, "open_interest_reserve_factor_{}".format(side))
+            ]
+
+        pool_amount, reserve_factor, open_interest_reserve_factor = DataStoreReader(
+            chain=self.chain
+        ).get_calls(keys)
 
         return pool_amount, reserve_factor, open_interest_reserve_factor
 
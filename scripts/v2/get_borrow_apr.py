@@ -6,14 +6,14 @@ Created on Sat Dec 16 22:08:08 2023
 @author: snipermonke01
 """
 
-import pandas as pd
-
-from datetime import datetime
+import asyncio
+import logging
 
 from .get_oracle_prices import GetOraclePrices
 from .get_markets import GetMarkets
-from .gmx_utils import get_reader_contract, contract_map, execute_threading, \
-    save_json_file_to_datastore, save_csv_to_datastore, make_timestamped_dataframe
+from .gmx_utils import get_reader_contract, contract_map, save_json_file_to_datastore, \
+    save_csv_to_datastore, make_timestamped_dataframe, create_async_connection
+from .multicall import execute_multicall, async_execute_multicall
 
 
 class GetBorrowAPR:
@@ -45,6 +45,40 @@ class GetBorrowAPR:
 
         data = self._borrow_apr()
 
+        self._save_borrow_apr(data, to_json, to_csv)
+
+        if not to_csv:
+            return data
+
+    async def aget_borrow_apr(self, to_json: bool = False, to_csv: bool = False):
+        """
+        Async version of get_borrow_apr
+
+        Parameters
+        ----------
+        to_json : bool, optional
+            save output to json file. The default is False.
+        to_csv : bool, optional
+            save out to csv file. The default is False.
+
+        Returns
+        -------
+        data : dict
+            dictionary of data.
+
+        """
+
+        data = await self._aborrow_apr()
+
+        self._save_borrow_apr(data, to_json, to_csv)
+
+        if not to_csv:
+            return data
+
+    def _save_borrow_apr(self, data: dict, to_json: bool, to_csv: bool):
+        """
+        Save borrow APR data to the datastore as json and/or csv
+        """
         if to_json:
             save_json_file_to_datastore(
                 "{}_borrow_apr.json".format(self.chain),
@@ -62,8 +96,6 @@ class GetBorrowAPR:
                 "{}_short_borrow_apr.csv".format(self.chain),
                 short_dataframe
             )
-        else:
-            return data
 
     def _borrow_apr(self):
         """
@@ -75,10 +107,58 @@ class GetBorrowAPR:
             dictionary of borrow data.
 
         """
+        markets = GetMarkets(chain=self.chain).get_available_markets()
+        oracle_prices_dict = GetOraclePrices(chain=self.chain).get_recent_prices()
 
-        self.data_store_contract_address = contract_map[self.chain]['datastore']['contract_address']
+        queries = self._build_borrow_apr_queries(markets, oracle_prices_dict)
 
-        markets = GetMarkets(chain=self.chain).get_available_markets()
+        # feed the uncalled web3 objects into multicall function
+        outputs = execute_multicall(queries['calls'])
+
+        return self._process_borrow_apr(queries, outputs)
+
+    async def _aborrow_apr(self):
+        """
+        Async version of _borrow_apr, markets and prices are fetched concurrently
+
+        Returns
+        -------
+        funding_apr : dict
+            dictionary of borrow data.
+
+        """
+        markets, oracle_prices_dict = await asyncio.gather(
+            GetMarkets(chain=self.chain).aget_available_markets(),
+            GetOraclePrices(chain=self.chain).aget_recent_prices()
+        )
+
+        queries = self._build_borrow_apr_queries(markets, oracle_prices_dict)
+
+        outputs = await async_execute_multicall(
+            create_async_connection(chain=self.chain),
+            queries['calls']
+        )
+
+        return self._process_borrow_apr(queries, outputs)
+
+    def _build_borrow_apr_queries(self, markets: dict, oracle_prices_dict: dict):
+        """
+        Build the uncalled market info queries for every non swap market
+
+        Parameters
+        ----------
+        markets : dict
+            dictionary of available markets.
+        oracle_prices_dict : dict
+            dictionary of oracle prices keyed by token address.
+
+        Returns
+        -------
+        dict
+            calls for the multicall, with the market symbols to map the outputs to.
+
+        """
+        self.data_store_contract_address = contract_map[self.chain]['datastore']['contract_address']
 
         output_list = []
         mapper = []
@@ -93,24 +173,48 @@ class GetBorrowAPR:
             output = self._make_market_info_query(market_key,
                                                   index_token_address,
                                                   long_token_address,
-                                                  short_token_address)
+                                                  short_token_address,
+                                                  oracle_prices_dict)
 
             # add the uncalled web3 object to list
-            output_list = output_list + [output]
+            output_list.append(output)
 
             # add the market symbol to a list to use to map to dictionary later
-            mapper = mapper + [markets[market_key]['market_symbol']]
+            mapper.append(markets[market_key]['market_symbol'])
+
+        return {
+            'calls': output_list,
+            'mapper': mapper
+        }
 
-        # feed the uncalled web3 objects into threading function
-        threaded_output = execute_threading(output_list)
+    def _process_borrow_apr(self, queries: dict, outputs: list):
+        """
+        Turn the multicall outputs of the market info queries into the borrow APR dictionary
+
+        Parameters
+        ----------
+        queries : dict
+            output of _build_borrow_apr_queries.
+        outputs : list
+            multicall outputs, in the same order as queries['calls'].
 
+        Returns
+        -------
+        borrow_apr_dict : dict
+            dictionary of borrow data.
+
+        """
         borrow_apr_dict = {
             "long": {
             },
             "short": {
             }
         }
-        for key, output in zip(mapper, threaded_output):
+        for key, output in zip(queries['mapper'], outputs):
+            if output is None:
+                logging.warning("Skipping {}, market info query failed!".format(key))
+                continue
+
             borrow_apr_dict["long"][key] = (output[1]/10**28)*3600
             borrow_apr_dict["short"][key] = (output[2]/10**28)*3600
             print(
@@ -127,7 +231,8 @@ class GetBorrowAPR:
                                 market_key,
                                 index_token_address,
                                 long_token_address,
-                                short_token_address):
+                                short_token_address,
+                                oracle_prices_dict: dict = None):
         """
         For a given market get the marketInfo from the reader contract
 
@@ -141,6 +246,8 @@ class GetBorrowAPR:
             address of long collateral token.
         short_token_address : str
             address of short collateral token.
+        oracle_prices_dict : dict, optional
+            oracle prices keyed by token address. The default is None, which fetches them.
 
         Returns
         -------
@@ -151,7 +258,8 @@ class GetBorrowAPR:
 
         reader_contract = get_reader_contract(chain=self.chain)
 
-        oracle_prices_dict = GetOraclePrices(chain=self.chain).get_recent_prices()
+        if oracle_prices_dict is None:
+            oracle_prices_dict = GetOraclePrices(chain=self.chain).get_recent_prices()
         try:
             prices = (
                 (
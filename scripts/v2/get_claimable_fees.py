@@ -6,19 +6,41 @@ Created on Fri Aug 11 21:20:01 2023
 @author: snipermonke01
 """
 
-import os
-import json
+import asyncio
+import logging
 
 import numpy as np
 
 from numerize import numerize
 
+from .datastore_reader import DataStoreReader
 from .get_markets import GetMarkets
-from .gmx_utils import base_dir, execute_threading, make_timestamped_dataframe, \
-    save_csv_to_datastore, save_json_file_to_datastore
+from .gmx_utils import make_timestamped_dataframe, save_csv_to_datastore, \
+    save_json_file_to_datastore, create_async_connection
+from .multicall import execute_multicall_groups, async_execute_multicall_groups
 from .get_oracle_prices import GetOraclePrices
 
-from .keys import get_datastore_contract, claimable_fee_amount_key
+from .keys import get_market_key_index
+
+
+class ClaimableFeesRecord:
+    """
+    Claimable fee queries of one market and the values needed to process their outputs
+    """
+    __slots__ = (
+        'market_symbol', 'long_precision', 'long_token_price', 'long_claimable_fee',
+        'short_claimable_fee'
+    )
+
+    def __init__(
+        self, market_symbol, long_precision, long_token_price, long_claimable_fee,
+        short_claimable_fee
+    ):
+        self.market_symbol = market_symbol
+        self.long_precision = long_precision
+        self.long_token_price = long_token_price
+        self.long_claimable_fee = long_claimable_fee
+        self.short_claimable_fee = short_claimable_fee
 
 
 class GetClaimableFees:
@@ -48,8 +70,42 @@ class GetClaimableFees:
 
         data = self._claimable_fees()
 
+        self._save_claimable_fees(data, to_json, to_csv)
+
+        if not to_csv:
+            return data
+
+    async def aget_claimable_fees(self, to_json: bool = False, to_csv: bool = False):
+        """
+        Async version of get_claimable_fees
+
+        Parameters
+        ----------
+        to_json : bool, optional
+            save output to json file. The default is False.
+        to_csv : bool, optional
+            save out to csv file. The default is False.
+
+        Returns
+        -------
+        data : dict
+            dictionary of data.
+
+        """
+
+        data = await self._aclaimable_fees()
+
+        self._save_claimable_fees(data, to_json, to_csv)
+
+        if not to_csv:
+            return data
+
+    def _save_claimable_fees(self, data: dict, to_json: bool, to_csv: bool):
+        """
+        Save claimable fees data to the datastore as json and/or csv
+        """
         if to_json:
-            self.save_json_file_to_datastore(
+            save_json_file_to_datastore(
                 "{}_claimable_fees.json".format(self.chain),
                 data
             )
@@ -59,8 +115,6 @@ class GetClaimableFees:
                 "{}_total_fees.csv".format(self.chain),
                 dataframe
             )
-        else:
-            return data
 
     def _claimable_fees(self):
         """
@@ -73,14 +127,58 @@ class GetClaimableFees:
 
         """
         markets = GetMarkets(chain=self.chain).get_available_markets()
+        prices = GetOraclePrices(chain=self.chain).get_recent_prices()
 
-        total_fees = 0
+        queries = self._build_claimable_fees_queries(markets, prices)
+
+        # feed the uncalled web3 objects into one multicall
+        outputs = execute_multicall_groups(*queries['calls'])
+
+        return self._process_claimable_fees(queries, outputs)
+
+    async def _aclaimable_fees(self):
+        """
+        Async version of _claimable_fees, markets and prices are fetched concurrently
+
+        Returns
+        -------
+        funding_apr : dict
+            dictionary of total fees for week so far.
+
+        """
+        markets, prices = await asyncio.gather(
+            GetMarkets(chain=self.chain).aget_available_markets(),
+            GetOraclePrices(chain=self.chain).aget_recent_prices()
+        )
+
+        queries = self._build_claimable_fees_queries(markets, prices)
 
-        long_output_list = []
-        short_output_list = []
-        long_precision_list = []
-        long_token_price_list = []
-        mapper = []
+        outputs = await async_execute_multicall_groups(
+            create_async_connection(chain=self.chain),
+            *queries['calls']
+        )
+
+        return self._process_claimable_fees(queries, outputs)
+
+    def _build_claimable_fees_queries(self, markets: dict, prices: dict):
+        """
+        Build the uncalled claimable fee queries for both sides of every non swap market
+
+        Parameters
+        ----------
+        markets : dict
+            dictionary of available markets.
+        prices : dict
+            dictionary of oracle prices keyed by token address.
+
+        Returns
+        -------
+        dict
+            call groups for the multicall, with a record per market to process the outputs with.
+
+        """
+        records = []
+        key_index = get_market_key_index(self.chain, markets)
 
         for market_key in markets:
 
@@ -90,56 +188,78 @@ class GetClaimableFees:
                 continue
 
             long_token_address = markets[market_key]['long_token_address']
-            short_token_address = markets[market_key]['short_token_address']
 
             # uncalled web3 object for long fees
             long_output = self._get_claimable_fee_amount(
-                market_key,
-                long_token_address
+                key_index.get(market_key, "claimable_fee_amount_long")
             )
 
-            prices = GetOraclePrices(chain=self.chain).get_recent_prices()
             oracle_precision = 10**(30-markets[market_key]['long_token_metadata']['decimals'])
             long_token_price = np.median([float(
                 prices[long_token_address]['maxPriceFull'])/oracle_precision,
                 float(prices[long_token_address]['minPriceFull'])/oracle_precision]
             )
 
-            long_token_price_list = long_token_price_list + [long_token_price]
-
             long_precision = 10**(
                 markets[market_key]['long_token_metadata']['decimals']-1
             )
 
-            long_precision_list = long_precision_list + [long_precision]
-
             # uncalled web3 object for short fees
             short_output = self._get_claimable_fee_amount(
-                market_key,
-                short_token_address
+                key_index.get(market_key, "claimable_fee_amount_short")
             )
 
-            # add the uncalled web3 object to list
-            long_output_list = long_output_list + [long_output]
+            records.append(
+                ClaimableFeesRecord(
+                    markets[market_key]['market_symbol'],
+                    long_precision,
+                    long_token_price,
+                    long_output,
+                    short_output
+                )
+            )
 
-            # add the uncalled web3 object to list
-            short_output_list = short_output_list + [short_output]
+        return {
+            'calls': [
+                [record.long_claimable_fee for record in records],
+                [record.short_claimable_fee for record in records]
+            ],
+            'records': records
+        }
 
-            # add the market symbol to a list to use to map to dictionary later
-            mapper = mapper + [markets[market_key]['market_symbol']]
+    def _process_claimable_fees(self, queries: dict, outputs: list):
+        """
+        Turn the multicall outputs of the claimable fee queries into the total fees dictionary
 
-        # feed the uncalled web3 objects into threading function
-        long_threaded_output = execute_threading(long_output_list)
-        short_threaded_output = execute_threading(short_output_list)
+        Parameters
+        ----------
+        queries : dict
+            output of _build_claimable_fees_queries.
+        outputs : list
+            grouped multicall outputs, in the same order as queries['calls'].
 
-        for long_claimable_fees, short_claimable_fees, long_precision,\
-                long_token_price, token_symbol, in zip(
-                    long_threaded_output,
-                    short_threaded_output,
-                    long_precision_list,
-                    long_token_price_list,
-                    mapper
-                ):
+        Returns
+        -------
+        dict
+            dictionary of total fees for week so far.
+
+        """
+        total_fees = 0
+
+        long_threaded_output, short_threaded_output = outputs
+
+        for record, long_claimable_fees, short_claimable_fees in zip(
+            queries['records'],
+            long_threaded_output,
+            short_threaded_output
+        ):
+            token_symbol = record.market_symbol
+            long_precision = record.long_precision
+            long_token_price = record.long_token_price
+
+            if long_claimable_fees is None or short_claimable_fees is None:
+                logging.warning("Skipping {}, claimable fee query failed!".format(token_symbol))
+                continue
 
             # convert raw outputs into USD value
             long_claimable_usd = (
@@ -164,16 +284,14 @@ class GetClaimableFees:
 
         return {'latest_total_fees': total_fees}
 
-    def _get_claimable_fee_amount(self, market_address: str, token_address: str):
+    def _get_claimable_fee_amount(self, claimable_fee_key: bytes):
         """
         For a given market and long/short side of the pool get the raw output for pending fees
 
         Parameters
         ----------
-        market_address : str
-            addess of the GMX market.
-        token_address : str
-            address of either long or short collateral token.
+        claimable_fee_key : bytes
+            claimable fee amount key of the market side, from the market key index.
 
         Returns
         -------
@@ -182,17 +300,7 @@ class GetClaimableFees:
 
         """
 
-        datastore = get_datastore_contract(self.chain)
-
-        # create hashed key to query the datastore
-        claimable_fees_amount_hash_data = claimable_fee_amount_key(
-            market_address,
-            token_address
-        )
-
-        claimable_fee = datastore.functions.getUint(
-            claimable_fees_amount_hash_data
-        )
+        claimable_fee = DataStoreReader(chain=self.chain).get_call(claimable_fee_key)
 
         return claimable_fee
 
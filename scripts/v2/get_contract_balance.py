@@ -8,7 +8,8 @@ Created on Mon Aug  7 15:41:14 2023
 
 import numpy as np
 
-from .gmx_utils import get_token_balance_contract, save_json_file_to_datastore
+from .gmx_utils import get_token_balance_contract, save_json_file_to_datastore, \
+    execute_threading
 from .get_markets import GetMarkets
 from .get_oracle_prices import GetOraclePrices
 
@@ -18,7 +19,6 @@ class GetPoolTVL:
     def __init__(self, chain):
 
         self.chain = chain
-        self.oracle_prices_dict = GetOraclePrices(chain=chain).get_recent_prices
 
     def get_pool_balances(self, to_json: bool = False):
         """
@@ -37,23 +37,35 @@ class GetPoolTVL:
         """
 
         markets = GetMarkets(chain=self.chain).get_available_markets()
+        oracle_prices_dict = GetOraclePrices(chain=self.chain).get_recent_prices()
 
         pool_tvl_dict = {}
 
+        # collect every balance and decimals call up front so the batching connection can send
+        # them to the RPC together
+        balance_calls = []
         for market in markets:
+            balance_calls += self._query_balances(
+                market,
+                markets[market]['long_token_address'],
+                markets[market]['short_token_address']
+            )
+
+        balance_outputs = execute_threading(balance_calls)
+
+        for i, market in enumerate(markets):
             print("\n"+markets[market]['market_symbol'])
 
-            long_token_address = markets[market]['long_token_address']
+            long_balance, long_decimals, short_balance, short_decimals = \
+                balance_outputs[i*4:i*4+4]
+            long_token_balance = long_balance/10**long_decimals
+            short_token_balance = short_balance/10**short_decimals
 
-            short_token_address = markets[market]['short_token_address']
-            long_token_balance, short_token_balance = self._query_balances(
-                market,
-                long_token_address,
-                short_token_address
-            )
+            long_token_address = markets[market]['long_token_address']
             oracle_precision = 10**(30-markets[market]['long_token_metadata']['decimals'])
 
             long_usd_balance = self._calculate_usd_value(
+                oracle_prices_dict,
                 long_token_balance,
                 long_token_address,
                 oracle_precision
@@ -85,7 +97,8 @@ class GetPoolTVL:
         self, market: str, long_token_address: str, short_token_address: str
     ):
         """
-        Get token balance of each pool for a given market and its long and short token addresses
+        Get the uncalled balance and decimals queries of each pool token for a given market and
+        its long and short token addresses
 
         Parameters
         ----------
@@ -98,37 +111,42 @@ class GetPoolTVL:
 
         Returns
         -------
-        long_token_balance : float
-            balance of token in adjusted significant figures.
-        short_token_balance : float
-            balance of token in adjusted significant figures.
+        list
+            uncalled long balance, long decimals, short balance and short decimals queries.
 
         """
         long_token_contract = get_token_balance_contract(
             self.chain,
-            long_token_address
+            long_token_address,
+            batch_requests=True
         )
-        long_token_balance = long_token_contract.functions.balanceOf(
-            market
-        ).call()/10**long_token_contract.functions.decimals().call()
         short_token_contract = get_token_balance_contract(
             self.chain,
-            short_token_address
+            short_token_address,
+            batch_requests=True
         )
-        short_token_balance = short_token_contract.functions.balanceOf(
-            market
-        ).call()/10**short_token_contract.functions.decimals().call()
 
-        return long_token_balance, short_token_balance
+        return [
+            long_token_contract.functions.balanceOf(market),
+            long_token_contract.functions.decimals(),
+            short_token_contract.functions.balanceOf(market),
+            short_token_contract.functions.decimals()
+        ]
 
     def _calculate_usd_value(
-        self, token_balance: float, contract_address: str, oracle_precision: int
+        self,
+        oracle_prices_dict: dict,
+        token_balance: float,
+        contract_address: str,
+        oracle_precision: int
     ):
         """
         For given contract(token) address, calculate the USD value from the input token amount
 
         Parameters
         ----------
+        oracle_prices_dict : dict
+            dictionary of oracle prices keyed by token address.
         token_balance : float
             amount of tokens.
         contract_address : str
@@ -144,10 +162,8 @@ class GetPoolTVL:
         """
         try:
             token_price = np.median([float(
-                self.oracle_prices_dict(
-                )[contract_address]['maxPriceFull'])/oracle_precision,
-                float(self.oracle_prices_dict(
-                )[contract_address]['minPriceFull'])/oracle_precision]
+                oracle_prices_dict[contract_address]['maxPriceFull'])/oracle_precision,
+                float(oracle_prices_dict[contract_address]['minPriceFull'])/oracle_precision]
             )
             return token_price*token_balance
         except KeyError:
@@ -7,14 +7,30 @@ Created on Thu Nov 30 14:14:10 2023
 """
 
 import json
+import asyncio
+import logging
 import os
 
 from .get_oracle_prices import GetOraclePrices
 from .get_open_interest import OpenInterest
 from .get_markets import GetMarkets
 from .gmx_utils import get_reader_contract, contract_map, get_funding_factor_per_period, base_dir, \
-    execute_threading, save_json_file_to_datastore, make_timestamped_dataframe, \
-    save_csv_to_datastore
+    save_json_file_to_datastore, make_timestamped_dataframe, save_csv_to_datastore, \
+    create_async_connection
+from .multicall import execute_multicall, async_execute_multicall
+
+
+class FundingAprRecord:
+    """
+    Market info query of one market and the open interest needed to process its output
+    """
+    __slots__ = ('market_symbol', 'long_interest_usd', 'short_interest_usd', 'market_info')
+
+    def __init__(self, market_symbol, long_interest_usd, short_interest_usd, market_info):
+        self.market_symbol = market_symbol
+        self.long_interest_usd = long_interest_usd
+        self.short_interest_usd = short_interest_usd
+        self.market_info = market_info
 
 
 class GetFundingFee:
@@ -47,6 +63,40 @@ class GetFundingFee:
 
         data = self._get_funding_apr_dict()
 
+        self._save_funding_apr(data, to_json, to_csv)
+
+        if not to_csv:
+            return data
+
+    async def aget_funding_apr(self, to_json: bool = False, to_csv: bool = False):
+        """
+        Async version of get_funding_apr
+
+        Parameters
+        ----------
+        to_json : bool, optional
+            save output to json file. The default is False.
+        to_csv : bool, optional
+            save out to csv file. The default is False.
+
+        Returns
+        -------
+        data : dict
+            dictionary of data.
+
+        """
+
+        data = await self._aget_funding_apr_dict()
+
+        self._save_funding_apr(data, to_json, to_csv)
+
+        if not to_csv:
+            return data
+
+    def _save_funding_apr(self, data: dict, to_json: bool, to_csv: bool):
+        """
+        Save funding APR data to the datastore as json and/or csv
+        """
         if to_json:
             save_json_file_to_datastore(
                 "{}_funding_apr.json".format(self.chain),
@@ -63,8 +113,17 @@ class GetFundingFee:
                 "{}_short_funding_apr.csv".format(self.chain),
                 short_dataframe
             )
-        else:
-            return data
+
+    def _load_local_open_interest(self):
+        return json.load(
+            open(
+                os.path.join(
+                    base_dir,
+                    "data_store",
+                    "{}_open_interest.json".format(self.chain)
+                )
+            )
+        )
 
     def _get_funding_apr_dict(self):
         """
@@ -79,38 +138,78 @@ class GetFundingFee:
 
         # If passing true will use local instance of open interest data
         if self.use_local_datastore:
-            open_interest = json.load(
-                open(
-                    os.path.join(
-                        base_dir,
-                        "data_store",
-                        "{}_open_interest.json".format(self.chain)
-                    )
-                )
-            )
+            open_interest = self._load_local_open_interest()
         else:
             open_interest = OpenInterest(chain=self.chain).call_open_interest(to_json=False)
 
-        self.reader_contract = get_reader_contract(self.chain)
-        self.data_store_contract_address = contract_map[self.chain]['datastore']['contract_address']
-
         markets = GetMarkets(chain=self.chain).get_available_markets()
+        oracle_prices_dict = GetOraclePrices(chain=self.chain).get_recent_prices()
 
-        print("\nGMX v2 Funding Rates (% per hour)")
+        queries = self._build_funding_apr_queries(markets, oracle_prices_dict, open_interest)
 
-        # define skeleton of output dictionary
-        funding_apr = {
-            "long": {
-            },
-            "short": {
-            }
-        }
+        # Multicall on contract
+        outputs = execute_multicall(queries['calls'])
 
-        # define empty lists to pass to zip iterater later on
-        mapper = []
-        output_list = []
-        long_interest_usd_list = []
-        short_interest_usd_list = []
+        return self._process_funding_apr(queries, outputs)
+
+    async def _aget_funding_apr_dict(self):
+        """
+        Async version of _get_funding_apr_dict, open interest, markets and prices are fetched
+        concurrently
+
+        Returns
+        -------
+        funding_apr : dict
+            dictionary of funding data.
+
+        """
+        if self.use_local_datastore:
+            markets, oracle_prices_dict = await asyncio.gather(
+                GetMarkets(chain=self.chain).aget_available_markets(),
+                GetOraclePrices(chain=self.chain).aget_recent_prices()
+            )
+            open_interest = self._load_local_open_interest()
+        else:
+            open_interest, markets, oracle_prices_dict = await asyncio.gather(
+                OpenInterest(chain=self.chain).acall_open_interest(to_json=False),
+                GetMarkets(chain=self.chain).aget_available_markets(),
+                GetOraclePrices(chain=self.chain).aget_recent_prices()
+            )
+
+        queries = self._build_funding_apr_queries(markets, oracle_prices_dict, open_interest)
+
+        outputs = await async_execute_multicall(
+            create_async_connection(chain=self.chain),
+            queries['calls']
+        )
+
+        return self._process_funding_apr(queries, outputs)
+
+    def _build_funding_apr_queries(
+        self, markets: dict, oracle_prices_dict: dict, open_interest: dict
+    ):
+        """
+        Build the uncalled market info queries for every non swap market
+
+        Parameters
+        ----------
+        markets : dict
+            dictionary of available markets.
+        oracle_prices_dict : dict
+            dictionary of oracle prices keyed by token address.
+        open_interest : dict
+            open interest data, as output by OpenInterest.
+
+        Returns
+        -------
+        dict
+            calls for the multicall, with a record per market to process the outputs with.
+
+        """
+        self.reader_contract = get_reader_contract(self.chain)
+        self.data_store_contract_address = contract_map[self.chain]['datastore']['contract_address']
+
+        records = []
 
         # loop markets
         for market_key in markets:
@@ -123,26 +222,68 @@ class GetFundingFee:
             if index_token_address == "0x0000000000000000000000000000000000000000":
                 continue
 
+            # skip markets which open interest could not be read for
+            if symbol not in open_interest['long']:
+                continue
+
             long_token_address = markets[market_key]['long_token_address']
             short_token_address = markets[market_key]['short_token_address']
 
             output = self._make_market_info_query(market_key,
                                                   index_token_address,
                                                   long_token_address,
-                                                  short_token_address)
+                                                  short_token_address,
+                                                  oracle_prices_dict)
+
+            records.append(
+                FundingAprRecord(
+                    symbol,
+                    open_interest['long'][symbol]*10**30,
+                    open_interest['short'][symbol]*10**30,
+                    output
+                )
+            )
+
+        return {
+            'calls': [record.market_info for record in records],
+            'records': records
+        }
 
-            mapper = mapper + [symbol]
-            output_list = output_list + [output]
-            long_interest_usd_list = long_interest_usd_list + \
-                [open_interest['long'][symbol]*10**30]
-            short_interest_usd_list = short_interest_usd_list + \
-                [open_interest['short'][symbol]*10**30]
+    def _process_funding_apr(self, queries: dict, outputs: list):
+        """
+        Turn the multicall outputs of the market info queries into the funding APR dictionary
+
+        Parameters
+        ----------
+        queries : dict
+            output of _build_funding_apr_queries.
+        outputs : list
+            multicall outputs, in the same order as queries['calls'].
 
-        # Multithreaded call on contract
-        threaded_output = execute_threading(output_list)
-        for output, long_interest_usd, short_interest_usd, symbol in zip(
-                threaded_output, long_interest_usd_list, short_interest_usd_list, mapper
-        ):
+        Returns
+        -------
+        funding_apr : dict
+            dictionary of funding data.
+
+        """
+        print("\nGMX v2 Funding Rates (% per hour)")
+
+        # define skeleton of output dictionary
+        funding_apr = {
+            "long": {
+            },
+            "short": {
+            }
+        }
+
+        for record, output in zip(queries['records'], outputs):
+            symbol = record.market_symbol
+            long_interest_usd = record.long_interest_usd
+            short_interest_usd = record.short_interest_usd
+
+            if output is None:
+                logging.warning("Skipping {}, market info query failed!".format(symbol))
+                continue
 
             print("\n{}".format(symbol))
 
@@ -182,7 +323,8 @@ class GetFundingFee:
                                 market_key: str,
                                 index_token_address: str,
                                 long_token_address: str,
-                                short_token_address: str):
+                                short_token_address: str,
+                                oracle_prices_dict: dict = None):
         """
         For a given market get the marketInfo from the reader contract
 
@@ -196,6 +338,8 @@ class GetFundingFee:
             address of long collateral token.
         short_token_address : str
             address of short collateral token.
+        oracle_prices_dict : dict, optional
+            oracle prices keyed by token address. The default is None, which fetches them.
 
         Returns
         -------
@@ -203,7 +347,8 @@ class GetFundingFee:
             unexecuted reader contract object.
 
         """
-        oracle_prices_dict = GetOraclePrices(self.chain).get_recent_prices()
+        if oracle_prices_dict is None:
+            oracle_prices_dict = GetOraclePrices(self.chain).get_recent_prices()
 
         try:
             prices = (
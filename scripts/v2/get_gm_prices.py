@@ -6,8 +6,12 @@ Created on Fri Dec 15 21:57:52 2023
 @author: snipermonke01
 """
 
-from .gmx_utils import get_reader_contract, contract_map, execute_threading, \
-    save_json_file_to_datastore, make_timestamped_dataframe, save_csv_to_datastore
+import asyncio
+import logging
+
+from .gmx_utils import get_reader_contract, contract_map, save_json_file_to_datastore, \
+    make_timestamped_dataframe, save_csv_to_datastore, create_async_connection
+from .multicall import execute_multicall, async_execute_multicall
 
 from .get_oracle_prices import GetOraclePrices
 from .get_markets import GetMarkets
@@ -93,6 +97,72 @@ class GMPrices:
         pnl_factor_type = MAX_PNL_FACTOR_FOR_TRADERS
         return self._get_prices(pnl_factor_type)
 
+    async def aget_price_withdraw(self, to_json: bool = False, to_csv: bool = False):
+        """
+        Async version of get_price_withdraw
+
+        Parameters
+        ----------
+        to_json : bool, optional
+            pass True to save price to json. The default is False.
+        to_csv : bool, optional
+            pass True to save price to json. The default is False.
+
+        Returns
+        -------
+        gm_pool_prices: dict
+            dictionary of gm prices.
+
+        """
+
+        self.to_json = to_json
+        self.to_csv = to_csv
+        return await self._aget_prices(MAX_PNL_FACTOR_FOR_WITHDRAWALS)
+
+    async def aget_price_deposit(self, to_json: bool = False, to_csv: bool = False):
+        """
+        Async version of get_price_deposit
+
+        Parameters
+        ----------
+        to_json : bool, optional
+            pass True to save price to json. The default is False.
+        to_csv : bool, optional
+            pass True to save price to json. The default is False.
+
+        Returns
+        -------
+        gm_pool_prices: dict
+            dictionary of gm prices.
+
+        """
+
+        self.to_json = to_json
+        self.to_csv = to_csv
+        return await self._aget_prices(MAX_PNL_FACTOR_FOR_DEPOSITS)
+
+    async def aget_price_traders(self, to_json: bool = False, to_csv: bool = False):
+        """
+        Async version of get_price_traders
+
+        Parameters
+        ----------
+        to_json : bool, optional
+            pass True to save price to json. The default is False.
+        to_csv : bool, optional
+            pass True to save price to json. The default is False.
+
+        Returns
+        -------
+        gm_pool_prices: dict
+            dictionary of gm prices.
+
+        """
+
+        self.to_json = to_json
+        self.to_csv = to_csv
+        return await self._aget_prices(MAX_PNL_FACTOR_FOR_TRADERS)
+
     def _get_prices(self, pnl_factor_type):
         """
         Get GM pool prices for a given profit/loss factor
@@ -112,6 +182,61 @@ class GMPrices:
         markets = GetMarkets(chain=self.chain).get_available_markets()
         prices = GetOraclePrices(chain=self.chain).get_recent_prices()
 
+        queries = self._build_gm_price_queries(markets, prices, pnl_factor_type)
+
+        # feed the uncalled web3 objects into multicall function
+        outputs = execute_multicall(queries['calls'])
+
+        return self._process_gm_prices(queries, outputs)
+
+    async def _aget_prices(self, pnl_factor_type):
+        """
+        Async version of _get_prices, markets and prices are fetched concurrently
+
+        Parameters
+        ----------
+        pnl_factor_type : hash
+            descriptor for datastore.
+
+        Returns
+        -------
+        gm_pool_prices : dict
+            dictionary of gm prices.
+
+        """
+        markets, prices = await asyncio.gather(
+            GetMarkets(chain=self.chain).aget_available_markets(),
+            GetOraclePrices(chain=self.chain).aget_recent_prices()
+        )
+
+        queries = self._build_gm_price_queries(markets, prices, pnl_factor_type)
+
+        outputs = await async_execute_multicall(
+            create_async_connection(chain=self.chain),
+            queries['calls']
+        )
+
+        return self._process_gm_prices(queries, outputs)
+
+    def _build_gm_price_queries(self, markets: dict, prices: dict, pnl_factor_type):
+        """
+        Build the uncalled market token price queries for every non swap market
+
+        Parameters
+        ----------
+        markets : dict
+            dictionary of available markets.
+        prices : dict
+            dictionary of oracle prices keyed by token address.
+        pnl_factor_type : hash
+            descriptor for datastore.
+
+        Returns
+        -------
+        dict
+            calls for the multicall, with the market symbols to map the outputs to.
+
+        """
         output_list = []
         mapper = []
         for market_key in markets:
@@ -158,21 +283,53 @@ class GMPrices:
             )
 
             # add the uncalled web3 object to list
-            output_list = output_list + [output]
+            output_list.append(output)
 
             # add the market symbol to a list to use to map to dictionary later
-            mapper = mapper + [markets[market_key]['market_symbol']]
+            mapper.append(markets[market_key]['market_symbol'])
 
-        # feed the uncalled web3 objects into threading function
-        threaded_output = execute_threading(output_list)
+        return {
+            'calls': output_list,
+            'mapper': mapper
+        }
 
+    def _process_gm_prices(self, queries: dict, outputs: list):
+        """
+        Turn the multicall outputs of the market token price queries into GM prices, saving them
+        if to_json or to_csv were set
+
+        Parameters
+        ----------
+        queries : dict
+            output of _build_gm_price_queries.
+        outputs : list
+            multicall outputs, in the same order as queries['calls'].
+
+        Returns
+        -------
+        gm_pool_prices : dict
+            dictionary of gm prices.
+
+        """
         gm_pool_prices = {}
-        for key, output in zip(mapper, threaded_output):
+        for key, output in zip(queries['mapper'], outputs):
+
+            if output is None:
+                logging.warning("Skipping {}, GM price query failed!".format(key))
+                continue
 
             # divide by 10**30 to turn into USD value
             gm_pool_prices[key] = output[0]/10**30
 
-        if self.to_json:
+        self._save_gm_prices(gm_pool_prices, self.to_json, self.to_csv)
+
+        return gm_pool_prices
+
+    def _save_gm_prices(self, gm_pool_prices: dict, to_json: bool, to_csv: bool):
+        """
+        Save GM prices to the datastore as json and/or csv
+        """
+        if to_json:
 
             filename = "{}_gm_prices.json".format(self.chain)
             save_json_file_to_datastore(
@@ -180,7 +337,7 @@ class GMPrices:
                 gm_pool_prices
             )
 
-        if self.to_csv:
+        if to_csv:
 
             dataframe = make_timestamped_dataframe(gm_pool_prices)
 
@@ -188,8 +345,6 @@ class GMPrices:
                 "{}_gm_prices.csv".format(self.chain),
                 dataframe)
 
-        return gm_pool_prices
-
     def _make_market_token_price_query(
             self,
             market: list,
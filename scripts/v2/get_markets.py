@@ -6,20 +6,39 @@ Created on Fri Jul 28 10:01:23 2023
 @author: snipermonke01
 """
 
+import asyncio
+import logging
+
+from web3 import Web3
+
 from .gmx_utils import (
-    contract_map, get_tokens_address_dict, get_reader_contract
+    contract_map, get_tokens_address_dict, fetch_tokens_address_dict, afetch_tokens_address_dict,
+    get_reader_contract, get_event_emitter_contract, create_async_connection, store_metadata,
+    get_cached_metadata, aget_cached_metadata, get_datastore_contract
 )
+from .keys import market_list_key, get_market_key_index
+from .multicall import execute_multicall, async_execute_multicall, async_execute_call
+
+# EventLog1 carries the hash of the event name as its second topic (topics[1]), after the
+# event signature, so MarketCreated logs are filtered on that topic
+MARKET_CREATED_TOPIC = Web3.keccak(text="MarketCreated").hex()
+
+# Number of markets read from the reader contract per getMarkets call
+MARKETS_PAGE_SIZE = 25
 
 
 class GetMarkets:
 
-    def __init__(self, chain):
+    def __init__(self, chain, use_cache: bool = True):
 
         self.chain = chain
+        self.use_cache = use_cache
 
     def get_available_markets(self):
         """
-        Get the available markets on a given chain
+        Get the available markets on a given chain. Markets are served from the metadata cache
+        and revalidated in the background against MarketCreated events once stale, unless the
+        class was initialised with use_cache=False.
 
         Returns
         -------
@@ -27,26 +46,269 @@ class GetMarkets:
             dictionary of the available markets.
 
         """
+        if not self.use_cache:
+            return self._process_markets()
 
-        return self._process_markets()
+        return get_cached_metadata(
+            self.chain,
+            "markets",
+            self._load_markets,
+            self._revalidate_markets
+        )
 
-    def _get_available_markets_raw(self):
+    async def aget_available_markets(self):
         """
-        Get the available markets from the reader contract
+        Async version of get_available_markets, on a cache miss the token api and the reader
+        contract are queried concurrently
 
         Returns
         -------
-        Markets: tuple
-            tuple of raw output from the reader contract.
+        Markets: dict
+            dictionary of the available markets.
+
+        """
+        if not self.use_cache:
+            markets, block_number = await self._aload_markets()
+            return markets
+
+        return await aget_cached_metadata(
+            self.chain,
+            "markets",
+            self._aload_markets,
+            self._load_markets,
+            self._revalidate_markets
+        )
+
+    def refresh_available_markets(self):
+        """
+        Fetch the available markets and token metadata now and replace the cached copies, eg
+        when a market is known to have just been created
+
+        Returns
+        -------
+        Markets: dict
+            dictionary of the available markets.
+
+        """
+        markets, block_number = self._load_markets()
+
+        return store_metadata(self.chain, "markets", markets, block_number)
+
+    def _load_markets(self):
+        """
+        Fetch and decode the markets at the latest block, caching the token metadata fetched
+        alongside them
+
+        Returns
+        -------
+        Markets: dict
+            dictionary of the available markets.
+        block_number : int
+            block the markets were read at.
+
+        """
+        block_number = get_reader_contract(self.chain).w3.eth.block_number
+
+        token_address_dict = store_metadata(
+            self.chain, "tokens", fetch_tokens_address_dict(self.chain)
+        )
+        raw_markets = self._get_available_markets_raw(block_identifier=block_number)
+        markets = self._decode_markets(token_address_dict, raw_markets)
+
+        # hash every datastore key for the new market set up front
+        get_market_key_index(self.chain, markets)
+
+        return markets, block_number
+
+    async def _aload_markets(self):
+        """
+        Async version of _load_markets
+        """
+        async_web3_obj = create_async_connection(chain=self.chain)
+        block_number = await async_web3_obj.eth.block_number
+
+        token_address_dict, raw_markets = await asyncio.gather(
+            afetch_tokens_address_dict(self.chain),
+            self._aget_available_markets_raw(async_web3_obj, block_number)
+        )
+
+        token_address_dict = store_metadata(self.chain, "tokens", token_address_dict)
+        markets = self._decode_markets(token_address_dict, raw_markets)
+
+        # hash every datastore key for the new market set up front
+        get_market_key_index(self.chain, markets)
+
+        return markets, block_number
+
+    def _revalidate_markets(self, entry: dict):
+        """
+        Check the event emitter for MarketCreated events since the cached markets were read, and
+        if there are any fetch only the markets added to the end of the market list since then
+
+        Parameters
+        ----------
+        entry : dict
+            cached markets entry.
+
+        Returns
+        -------
+        tuple
+            up to date markets and the block they were read at, or None if they need reloading.
+
+        """
+        if entry['block_number'] is None:
+            return None
+
+        event_emitter = get_event_emitter_contract(self.chain)
+        web3_obj = event_emitter.w3
+
+        try:
+            latest_block = web3_obj.eth.block_number
+            logs = web3_obj.eth.get_logs(
+                {
+                    'address': event_emitter.address,
+                    'fromBlock': entry['block_number'] + 1,
+                    'toBlock': latest_block,
+                    'topics': [None, MARKET_CREATED_TOPIC]
+                }
+            )
+
+        # eg the block range is larger than the RPC allows, just reload the markets instead
+        except Exception as e:
+            logging.info("Could not check for new markets, reloading: {}".format(e))
+            return None
+
+        if len(logs) == 0:
+            return entry['data'], latest_block
+
+        cached_markets = entry['data']
+        market_count = self._get_market_count_query().call(block_identifier=latest_block)
+
+        # markets are only ever appended to the market list, anything else needs a full reload
+        if market_count < len(cached_markets):
+            return None
+
+        token_address_dict = store_metadata(
+            self.chain, "tokens", fetch_tokens_address_dict(self.chain)
+        )
+        raw_markets = self._get_market_pages(
+            len(cached_markets), market_count, latest_block
+        )
+
+        markets = dict(cached_markets)
+        markets.update(
+            self._decode_markets(
+                token_address_dict,
+                raw_markets,
+                taken_symbols={market['market_symbol'] for market in cached_markets.values()}
+            )
+        )
+
+        get_market_key_index(self.chain, markets)
+
+        return markets, latest_block
+
+    def _get_market_count_query(self):
+        """
+        Build the uncalled datastore query for the number of markets in the market list
+
+        Returns
+        -------
+        web3._utils.contracts.ContractFunction
+            uncalled web3 query.
+
+        """
+        return get_datastore_contract(self.chain).functions.getAddressCount(market_list_key())
+
+    def _get_available_markets_queries(self, start: int, end: int):
+        """
+        Build the uncalled reader contract queries for the markets between start and end, one
+        per page of MARKETS_PAGE_SIZE markets
+
+        Parameters
+        ----------
+        start : int
+            index of the first market.
+        end : int
+            index after the last market.
+
+        Returns
+        -------
+        list
+            uncalled web3 queries.
 
         """
 
         reader_contract = get_reader_contract(self.chain)
         data_store_contract_address = contract_map[self.chain]['datastore']['contract_address']
 
-        return reader_contract.functions.getMarkets(
-            data_store_contract_address, 0, 15
-        ).call()
+        return [
+            reader_contract.functions.getMarkets(
+                data_store_contract_address,
+                page_start,
+                min(page_start + MARKETS_PAGE_SIZE, end)
+            )
+            for page_start in range(start, end, MARKETS_PAGE_SIZE)
+        ]
+
+    def _get_market_pages(self, start: int, end: int, block_identifier: int):
+        """
+        Fetch every page of markets between start and end in one multicall
+
+        Returns
+        -------
+        list
+            raw output from the reader contract for each market.
+
+        """
+        pages = execute_multicall(
+            self._get_available_markets_queries(start, end),
+            block_identifier=block_identifier,
+            allow_failure=False
+        )
+
+        return [raw_market for page in pages for raw_market in page]
+
+    def _get_available_markets_raw(self, block_identifier: int = None):
+        """
+        Get every available market from the reader contract, paging through the market list
+
+        Parameters
+        ----------
+        block_identifier : int, optional
+            block to read at. The default is None, which uses the latest block.
+
+        Returns
+        -------
+        Markets: list
+            raw output from the reader contract for each market.
+
+        """
+        if block_identifier is None:
+            block_identifier = get_reader_contract(self.chain).w3.eth.block_number
+
+        market_count = self._get_market_count_query().call(block_identifier=block_identifier)
+
+        return self._get_market_pages(0, market_count, block_identifier)
+
+    async def _aget_available_markets_raw(self, async_web3_obj, block_identifier: int):
+        """
+        Async version of _get_available_markets_raw
+        """
+        market_count = await async_execute_call(
+            async_web3_obj,
+            self._get_market_count_query(),
+            block_identifier=block_identifier
+        )
+
+        pages = await async_execute_multicall(
+            async_web3_obj,
+            self._get_available_markets_queries(0, market_count),
+            block_identifier=block_identifier,
+            allow_failure=False
+        )
+
+        return [raw_market for page in pages for raw_market in page]
 
     def _process_markets(self):
         """
@@ -58,10 +320,37 @@ class GetMarkets:
             dictionary decoded market data.
 
         """
-        token_address_dict = get_tokens_address_dict(self.chain)
+        token_address_dict = get_tokens_address_dict(self.chain, use_cache=self.use_cache)
 
         raw_markets = self._get_available_markets_raw()
 
+        return self._decode_markets(token_address_dict, raw_markets)
+
+    def _decode_markets(
+        self, token_address_dict: dict, raw_markets: tuple, taken_symbols: set = ()
+    ):
+        """
+        Decode the raw market data using the token metadata. Several markets can share an index
+        token, eg ETH backed by WETH-USDC and by WETH-WETH, and would overwrite each other in every
+        output keyed by market symbol. The first listed keeps the plain symbol and the others are
+        named after their pool tokens too, eg "ETH [WETH-WETH]".
+
+        Parameters
+        ----------
+        token_address_dict : dict
+            token metadata keyed by token address.
+        raw_markets : tuple
+            tuple of raw output from the reader contract.
+        taken_symbols : set, optional
+            symbols of markets already decoded, when decoding markets added since. The default
+            is ().
+
+        Returns
+        -------
+        decoded_markets : dict
+            dictionary decoded market data.
+
+        """
         decoded_markets = {}
 
         for raw_market in raw_markets:
@@ -97,6 +386,17 @@ class GetMarkets:
                     'short_token_address': raw_market[3]
                 }
 
+        taken_symbols = set(taken_symbols)
+        for market in decoded_markets.values():
+            if market['market_symbol'] in taken_symbols:
+                market['market_symbol'] = "{} [{}-{}]".format(
+                    market['market_symbol'],
+                    market['long_token_metadata']['symbol'],
+                    market['short_token_metadata']['symbol']
+                )
+
+            taken_symbols.add(market['market_symbol'])
+
         return decoded_markets
 
 
@@ -6,17 +6,39 @@ Created on Sat Aug  5 23:54:59 2023
 @author: snipermonke01
 """
 
-import time
-import web3
+import asyncio
+import logging
 
 from numerize import numerize
 
-from .gmx_utils import contract_map, get_reader_contract, execute_threading, \
-    save_json_file_to_datastore, make_timestamped_dataframe, save_csv_to_datastore
+from .gmx_utils import contract_map, get_reader_contract, save_json_file_to_datastore, \
+    make_timestamped_dataframe, save_csv_to_datastore, create_async_connection
+from .multicall import execute_multicall_groups, async_execute_multicall_groups
 from .get_oracle_prices import GetOraclePrices
 from .get_markets import GetMarkets
 
 
+class OpenInterestRecord:
+    """
+    Open interest queries of one market and the values needed to process their outputs
+    """
+    __slots__ = (
+        'market_symbol', 'long_precision', 'long_oi_with_pnl', 'short_oi_with_pnl', 'long_pnl',
+        'short_pnl'
+    )
+
+    def __init__(
+        self, market_symbol, long_precision, long_oi_with_pnl, short_oi_with_pnl, long_pnl,
+        short_pnl
+    ):
+        self.market_symbol = market_symbol
+        self.long_precision = long_precision
+        self.long_oi_with_pnl = long_oi_with_pnl
+        self.short_oi_with_pnl = short_oi_with_pnl
+        self.long_pnl = long_pnl
+        self.short_pnl = short_pnl
+
+
 class OpenInterest:
 
     def __init__(self, chain: str):
@@ -43,6 +65,39 @@ class OpenInterest:
         """
         data = self._get_open_interest()
 
+        self._save_open_interest(data, to_json, to_csv)
+
+        if not to_csv:
+            return data
+
+    async def acall_open_interest(self, to_json: bool = False, to_csv: bool = False):
+        """
+        Async version of call_open_interest
+
+        Parameters
+        ----------
+        to_json : bool, optional
+            save output to json file. The default is False.
+        to_csv : bool, optional
+            save out to csv file. The default is False.
+
+        Returns
+        -------
+        data : dict
+            dictionary of data.
+
+        """
+        data = await self._aget_open_interest()
+
+        self._save_open_interest(data, to_json, to_csv)
+
+        if not to_csv:
+            return data
+
+    def _save_open_interest(self, data: dict, to_json: bool, to_csv: bool):
+        """
+        Save open interest data to the datastore as json and/or csv
+        """
         if to_json:
             save_json_file_to_datastore(
                 "{}_open_interest.json".format(self.chain),
@@ -59,8 +114,6 @@ class OpenInterest:
                 "{}_short_open_interest.csv".format(self.chain),
                 short_dataframe
             )
-        else:
-            return data
 
     def _get_open_interest(self):
         """
@@ -72,25 +125,61 @@ class OpenInterest:
             dictionary of open interest data.
 
         """
+        markets = GetMarkets(chain=self.chain).get_available_markets()
+        oracle_prices_dict = GetOraclePrices(chain=self.chain).get_recent_prices()
+
+        queries = self._build_open_interest_queries(markets, oracle_prices_dict)
+
+        # read every market in one multicall so all values come from the same block
+        outputs = execute_multicall_groups(*queries['calls'])
+
+        return self._process_open_interest(queries, outputs)
+
+    async def _aget_open_interest(self):
+        """
+        Async version of _get_open_interest, markets and prices are fetched concurrently
+
+        Returns
+        -------
+        funding_apr : dict
+            dictionary of open interest data.
+
+        """
+        markets, oracle_prices_dict = await asyncio.gather(
+            GetMarkets(chain=self.chain).aget_available_markets(),
+            GetOraclePrices(chain=self.chain).aget_recent_prices()
+        )
+
+        queries = self._build_open_interest_queries(markets, oracle_prices_dict)
+
+        outputs = await async_execute_multicall_groups(
+            create_async_connection(chain=self.chain),
+            *queries['calls']
+        )
+
+        return self._process_open_interest(queries, outputs)
+
+    def _build_open_interest_queries(self, markets: dict, oracle_prices_dict: dict):
+        """
+        Build the uncalled open interest and pnl queries for every non swap market
+
+        Parameters
+        ----------
+        markets : dict
+            dictionary of available markets.
+        oracle_prices_dict : dict
+            dictionary of oracle prices keyed by token address.
 
+        Returns
+        -------
+        dict
+            call groups for the multicall, with a record per market to process the outputs with.
+
+        """
         reader_contract = get_reader_contract(self.chain)
         data_store_contract_address = contract_map[self.chain]['datastore']['contract_address']
-        markets = GetMarkets(chain=self.chain).get_available_markets()
-        oracle_prices_dict = GetOraclePrices(chain=self.chain).get_recent_prices()
-        print("GMX v2 Open Interest\n")
-        open_interest = {
-            "long": {
-            },
-            "short": {
-            }
-        }
 
-        long_oi_output_list = []
-        short_oi_output_list = []
-        long_pnl_output_list = []
-        short_pnl_output_list = []
-        mapper = []
-        long_precision_list = []
+        records = []
 
         for market_key in markets:
 
@@ -121,7 +210,6 @@ class OpenInterest:
             oracle_factor = 30-markets[market_key]['market_metadata']['decimals']
 
             precision = 10**(decimal_factor + oracle_factor)
-            long_precision_list = long_precision_list + [precision]
 
             long_oi_with_pnl, long_pnl = self.make_query(reader_contract,
                                                          data_store_contract_address,
@@ -135,29 +223,68 @@ class OpenInterest:
                                                            prices_list,
                                                            is_long=False)
 
-            long_oi_output_list = long_oi_output_list + [long_oi_with_pnl]
-            short_oi_output_list = short_oi_output_list + [short_oi_with_pnl]
-            long_pnl_output_list = long_pnl_output_list + [long_pnl]
-            short_pnl_output_list = short_pnl_output_list + [short_pnl]
-            mapper = mapper + [markets[market_key]['market_symbol']]
-
-        # TODO - currently just waiting x amount of time to not hit rate limit, but needs a retry
-        long_oi_threaded_output = execute_threading(long_oi_output_list)
-        time.sleep(0.2)
-        short_oi_threaded_output = execute_threading(short_oi_output_list)
-        time.sleep(0.2)
-        long_pnl_threaded_output = execute_threading(long_pnl_output_list)
-        time.sleep(0.2)
-        short_pnl_threaded_output = execute_threading(short_pnl_output_list)
-
-        for market_symbol, long_oi, short_oi, long_pnl, short_pnl, long_precision in zip(
-            mapper,
+            records.append(
+                OpenInterestRecord(
+                    markets[market_key]['market_symbol'],
+                    precision,
+                    long_oi_with_pnl,
+                    short_oi_with_pnl,
+                    long_pnl,
+                    short_pnl
+                )
+            )
+
+        return {
+            'calls': [
+                [record.long_oi_with_pnl for record in records],
+                [record.short_oi_with_pnl for record in records],
+                [record.long_pnl for record in records],
+                [record.short_pnl for record in records]
+            ],
+            'records': records
+        }
+
+    def _process_open_interest(self, queries: dict, outputs: list):
+        """
+        Turn the multicall outputs of the open interest queries into the open interest dictionary
+
+        Parameters
+        ----------
+        queries : dict
+            output of _build_open_interest_queries.
+        outputs : list
+            grouped multicall outputs, in the same order as queries['calls'].
+
+        Returns
+        -------
+        open_interest : dict
+            dictionary of open interest data.
+
+        """
+        print("GMX v2 Open Interest\n")
+        open_interest = {
+            "long": {
+            },
+            "short": {
+            }
+        }
+
+        long_oi_threaded_output, short_oi_threaded_output, long_pnl_threaded_output, \
+            short_pnl_threaded_output = outputs
+
+        for record, long_oi, short_oi, long_pnl, short_pnl in zip(
+            queries['records'],
             long_oi_threaded_output,
             short_oi_threaded_output,
             long_pnl_threaded_output,
-            short_pnl_threaded_output,
-            long_precision_list
+            short_pnl_threaded_output
         ):
+            market_symbol = record.market_symbol
+            long_precision = record.long_precision
+
+            if None in (long_oi, short_oi, long_pnl, short_pnl):
+                logging.warning("Skipping {}, open interest query failed!".format(market_symbol))
+                continue
 
             print("{} Long: ${}".format(market_symbol,
                                         numerize.numerize((long_oi-long_pnl)/long_precision)))
@@ -6,15 +6,15 @@ Created on Thu Dec 14 21:04:50 2023
 @author: snipermonke01
 """
 
+import asyncio
 import logging
 import numpy as np
 
 from .gmx_utils import get_reader_contract, contract_map, get_tokens_address_dict, \
-    convert_to_checksum_address
+    aget_tokens_address_dict, convert_to_checksum_address, create_async_connection
 from .get_markets import GetMarkets
 from .get_oracle_prices import GetOraclePrices
-
-chain = 'arbitrum'
+from .multicall import async_execute_call
 
 
 class GetOpenPositons:
@@ -22,10 +22,20 @@ class GetOpenPositons:
     def __init__(self, chain):
 
         self.chain = chain
-        self.markets = GetMarkets(chain=chain).get_available_markets()
+        self._markets = None
 
         self.reader_contract = get_reader_contract(chain)
 
+    @property
+    def markets(self):
+        """
+        Available markets, fetched on first use
+        """
+        if self._markets is None:
+            self._markets = GetMarkets(chain=self.chain).get_available_markets()
+
+        return self._markets
+
     def get_positions(self, address: str):
         """
         Get all open positions for a given address on the chain defined in class init
@@ -45,6 +55,73 @@ class GetOpenPositons:
         address = convert_to_checksum_address(self.chain, address)
 
         raw_positions = self. _query_for_positions(address)
+        if len(raw_positions) == 0:
+            return self._process_positions(address, raw_positions, {}, {})
+
+        chain_tokens = get_tokens_address_dict(self.chain)
+        prices = GetOraclePrices(chain=self.chain).get_recent_prices()
+
+        return self._process_positions(address, raw_positions, chain_tokens, prices)
+
+    async def aget_positions(self, address: str):
+        """
+        Async version of get_positions, the positions, markets, tokens and prices are all fetched
+        concurrently
+
+        Parameters
+        ----------
+        address : str
+            evm address .
+
+        Returns
+        -------
+        processed_positions : dict
+            a dictionary containing the open positions, where asset and direction are the keys.
+
+        """
+
+        address = convert_to_checksum_address(self.chain, address)
+
+        if self._markets is None:
+            markets_request = GetMarkets(chain=self.chain).aget_available_markets()
+        else:
+            markets_request = asyncio.sleep(0, result=self._markets)
+
+        raw_positions, self._markets, chain_tokens, prices = await asyncio.gather(
+            async_execute_call(
+                create_async_connection(chain=self.chain),
+                self._get_positions_query(address)
+            ),
+            markets_request,
+            aget_tokens_address_dict(self.chain),
+            GetOraclePrices(chain=self.chain).aget_recent_prices()
+        )
+
+        return self._process_positions(address, raw_positions, chain_tokens, prices)
+
+    def _process_positions(
+        self, address: str, raw_positions: tuple, chain_tokens: dict, prices: dict
+    ):
+        """
+        Process every raw position into a dictionary keyed by asset and direction
+
+        Parameters
+        ----------
+        address : str
+            evm address .
+        raw_positions : tuple
+            raw positions info returned from the reader contract.
+        chain_tokens : dict
+            token metadata keyed by token address.
+        prices : dict
+            oracle prices keyed by token address.
+
+        Returns
+        -------
+        processed_positions : dict
+            a dictionary containing the open positions, where asset and direction are the keys.
+
+        """
         if len(raw_positions) == 0:
             logging.info(
                 'No positions open for address: "{}"" on {}.'.format(
@@ -56,7 +133,7 @@ class GetOpenPositons:
 
         for raw_position in raw_positions:
 
-            processed_position = self._process_positon(raw_position)
+            processed_position = self._process_positon(raw_position, chain_tokens, prices)
 
             # TODO - maybe a better way of building the key?
             if processed_position['is_long']:
@@ -70,7 +147,7 @@ class GetOpenPositons:
 
         return processed_positions
 
-    def _process_positon(self, raw_position: tuple):
+    def _process_positon(self, raw_position: tuple, chain_tokens: dict, prices: dict):
         """
         A tuple containing the raw information return from the reader contract query
         GetAccountPositions
@@ -79,6 +156,10 @@ class GetOpenPositons:
         ----------
         raw_position : tuple
             raw information return from the reader contract .
+        chain_tokens : dict
+            token metadata keyed by token address.
+        prices : dict
+            oracle prices keyed by token address.
 
         Returns
         -------
@@ -89,7 +170,6 @@ class GetOpenPositons:
 
         market_info = self.markets[raw_position[0][1]]
 
-        chain_tokens = get_tokens_address_dict(chain)
         entry_price = (
             raw_position[1][0]/raw_position[1][1]) / 10**(
             30 - chain_tokens[market_info['index_token_address']]['decimals']
@@ -98,7 +178,6 @@ class GetOpenPositons:
             raw_position[1][0]/10**30) / (
             raw_position[1][2]/10**chain_tokens[raw_position[0][2]]['decimals']
         )
-        prices = GetOraclePrices(chain=chain).get_recent_prices()
         mark_price = np.median(
             [float(prices[market_info['index_token_address']]['maxPriceFull']),
              float(prices[market_info['index_token_address']]['minPriceFull'])]
@@ -148,15 +227,35 @@ class GetOpenPositons:
 
         """
 
-        reader_contract = get_reader_contract(self.chain)
+        return self._get_positions_query(address, start, end).call()
+
+    def _get_positions_query(self, address: str, start: int = 0, end: int = 10):
+        """
+        Build the uncalled getAccountPositions query for a given evm address
+
+        Parameters
+        ----------
+        address : str
+            evm address .
+        start: int
+            location of first position to fetch, default is 0
+        end: int
+            location of last position to fetch, default is 10
+
+        Returns
+        -------
+        web3._utils.contracts.ContractFunction
+            uncalled web3 query.
+
+        """
         data_store_contract_address = contract_map[self.chain]['datastore']['contract_address']
 
-        return reader_contract.functions.getAccountPositions(
+        return self.reader_contract.functions.getAccountPositions(
             data_store_contract_address,
             address,
             start,
             end
-        ).call()
+        )
 
 
 if __name__ == "__main__":
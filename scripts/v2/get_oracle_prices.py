@@ -6,20 +6,163 @@ Created on Thu Aug  3 17:11:15 2023
 @author: snipermonke01
 """
 
+import asyncio
+import threading
+import time
+
+import aiohttp
 import requests
 
+# Seconds a fetched set of prices is reused for before the api is asked again
+ORACLE_PRICES_TTL = 1
+
+# chain -> dict of processed prices, fetch time and the ETag/Last-Modified validators
+_price_cache = {}
+_price_cache_lock = threading.Lock()
+
+# per chain locks so only one thread fetches prices at a time, the rest wait and reuse the result
+_price_fetch_locks = {}
+
+# chain -> in flight asyncio task fetching prices, shared by every coroutine asking for them
+_async_price_fetches = {}
+
 
 class GetOraclePrices:
 
-    def __init__(self, chain: str):
+    def __init__(self, chain: str, ttl: float = ORACLE_PRICES_TTL):
 
         self.chain = chain
+        self.ttl = ttl
         self.oracle_url = {"arbitrum": "https://arbitrum-api.gmxinfra.io/signed_prices/latest",
                            "avalanche": "https://avalanche-api.gmxinfra.io/signed_prices/latest"}
 
     def get_recent_prices(self):
         """
-        Get raw output of the GMX rest v2 api for signed prices
+        Get raw output of the GMX rest v2 api for signed prices. Prices younger than the ttl are
+        reused, and concurrent callers share a single request.
+
+        Returns
+        -------
+        dict
+            dictionary containing raw output for each token as its keys.
+
+        """
+        prices = self._get_cached_prices()
+        if prices is not None:
+            return prices
+
+        requested_at = time.monotonic()
+        with self._get_fetch_lock():
+
+            # another thread may have fetched the prices while we waited for the lock
+            prices = self._get_cached_prices(fetched_after=requested_at)
+            if prices is not None:
+                return prices
+
+            response = self._make_query()
+
+            if response.status_code == 304:
+                return self._store_prices(None, response.headers)
+
+            response.raise_for_status()
+
+            return self._store_prices(response.json(), response.headers)
+
+    async def aget_recent_prices(self):
+        """
+        Async version of get_recent_prices
+
+        Returns
+        -------
+        dict
+            dictionary containing raw output for each token as its keys.
+
+        """
+        prices = self._get_cached_prices()
+        if prices is not None:
+            return prices
+
+        loop = asyncio.get_running_loop()
+        fetch = _async_price_fetches.get(self.chain)
+
+        if fetch is None or fetch.get_loop() is not loop:
+            fetch = loop.create_task(self._afetch_prices())
+            _async_price_fetches[self.chain] = fetch
+            fetch.add_done_callback(
+                lambda task: _async_price_fetches.pop(self.chain, None)
+                if _async_price_fetches.get(self.chain) is task else None
+            )
+
+        # shield so a cancelled caller does not cancel the fetch other callers are waiting on
+        return dict(await asyncio.shield(fetch))
+
+    async def _afetch_prices(self):
+        async with aiohttp.ClientSession() as session:
+            async with session.get(
+                self.oracle_url[self.chain],
+                headers=self._get_conditional_headers()
+            ) as response:
+                if response.status == 304:
+                    return self._store_prices(None, response.headers)
+
+                response.raise_for_status()
+
+                return self._store_prices(await response.json(), response.headers)
+
+    def _get_fetch_lock(self):
+        with _price_cache_lock:
+            if self.chain not in _price_fetch_locks:
+                _price_fetch_locks[self.chain] = threading.Lock()
+
+            return _price_fetch_locks[self.chain]
+
+    def _get_cached_prices(self, fetched_after: float = None):
+        """
+        Return a copy of the cached prices if they are younger than the ttl or were fetched after
+        fetched_after, else None
+        """
+        with _price_cache_lock:
+            cache_entry = _price_cache.get(self.chain)
+
+            if cache_entry is None:
+                return None
+
+            is_fresh = time.monotonic() - cache_entry['fetched_at'] < self.ttl
+            if not is_fresh and (fetched_after is None or cache_entry['fetched_at'] < fetched_after):
+                return None
+
+            return dict(cache_entry['prices'])
+
+    def _get_conditional_headers(self):
+        """
+        Build If-None-Match/If-Modified-Since headers from the last response, so the api can
+        answer 304 Not Modified if the prices have not changed
+        """
+        with _price_cache_lock:
+            cache_entry = _price_cache.get(self.chain)
+
+        headers = {}
+        if cache_entry is None:
+            return headers
+
+        if cache_entry['etag'] is not None:
+            headers['If-None-Match'] = cache_entry['etag']
+        if cache_entry['last_modified'] is not None:
+            headers['If-Modified-Since'] = cache_entry['last_modified']
+
+        return headers
+
+    def _store_prices(self, raw_output: dict, headers):
+        """
+        Cache freshly fetched prices, or if raw_output is None (304 Not Modified) mark the cached
+        prices as fresh again
+
+        Parameters
+        ----------
+        raw_output : dict
+            raw api response, or None if the api answered 304.
+        headers : dict
+            response headers.
 
         Returns
         -------
@@ -27,13 +170,26 @@ class GetOraclePrices:
             dictionary containing raw output for each token as its keys.
 
         """
-        raw_output = self._make_query().json()
+        with _price_cache_lock:
+            if raw_output is None:
+                cache_entry = _price_cache[self.chain]
+                cache_entry['fetched_at'] = time.monotonic()
+
+                return dict(cache_entry['prices'])
+
+            prices = self._process_output(raw_output)
+            _price_cache[self.chain] = {
+                'prices': prices,
+                'fetched_at': time.monotonic(),
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified')
+            }
 
-        return self._process_output(raw_output)
+            return dict(prices)
 
     def _make_query(self):
         """
-        Make request using oracle url
+        Make request using oracle url, conditional on the last response if there is one
 
         Returns
         -------
@@ -43,7 +199,7 @@ class GetOraclePrices:
         """
         url = self.oracle_url[self.chain]
 
-        return requests.get(url)
+        return requests.get(url, headers=self._get_conditional_headers())
 
     def _process_output(self, output: dict):
         """
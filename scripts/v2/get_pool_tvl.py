@@ -6,11 +6,16 @@ Created on Mon Aug  7 15:41:14 2023
 @author: snipermonke01
 """
 
+import asyncio
+import logging
+
 import numpy as np
 
-from .keys import pool_amount_key
-from .gmx_utils import get_datastore_contract, base_dir, save_json_file_to_datastore, \
-    make_timestamped_dataframe, save_csv_to_datastore
+from .datastore_reader import DataStoreReader
+from .keys import get_market_key_index
+from .gmx_utils import base_dir, save_json_file_to_datastore, \
+    make_timestamped_dataframe, save_csv_to_datastore, create_async_connection
+from .multicall import execute_multicall_groups, async_execute_multicall_groups
 from .get_markets import GetMarkets
 from .get_oracle_prices import GetOraclePrices
 
@@ -20,7 +25,6 @@ class GetPoolTVL:
     def __init__(self, chain: str):
 
         self.chain = chain
-        self.oracle_prices_dict = GetOraclePrices(chain=chain).get_recent_prices
 
     def get_pool_balances(self, to_json: bool = False, to_csv: bool = False):
         """
@@ -41,8 +45,129 @@ class GetPoolTVL:
 
         """
 
-        markets = GetMarkets(chain=self.chain).get_available_markets(
+        markets = GetMarkets(chain=self.chain).get_available_markets()
+        oracle_prices_dict = GetOraclePrices(chain=self.chain).get_recent_prices()
+
+        queries = self._build_pool_balance_queries(markets)
+
+        # read every pool in one multicall so all balances come from the same block
+        outputs = execute_multicall_groups(*queries['calls'])
+
+        pool_tvl_dict = self._process_pool_balances(markets, oracle_prices_dict, queries, outputs)
+
+        self._save_pool_balances(pool_tvl_dict, to_json, to_csv)
+
+        if not to_csv:
+            return pool_tvl_dict
+
+    async def aget_pool_balances(self, to_json: bool = False, to_csv: bool = False):
+        """
+        Async version of get_pool_balances, markets and prices are fetched concurrently
+
+        Parameters
+        ----------
+        to_json : bool, optional
+            save output to json file. The default is False.
+        to_csv : bool, optional
+            save out to csv file. The default is False.
+
+        Returns
+        -------
+        data : dict
+            dictionary of data.
+
+        """
+        markets, oracle_prices_dict = await asyncio.gather(
+            GetMarkets(chain=self.chain).aget_available_markets(),
+            GetOraclePrices(chain=self.chain).aget_recent_prices()
         )
+
+        queries = self._build_pool_balance_queries(markets)
+
+        outputs = await async_execute_multicall_groups(
+            create_async_connection(chain=self.chain),
+            *queries['calls']
+        )
+
+        pool_tvl_dict = self._process_pool_balances(markets, oracle_prices_dict, queries, outputs)
+
+        self._save_pool_balances(pool_tvl_dict, to_json, to_csv)
+
+        if not to_csv:
+            return pool_tvl_dict
+
+    def _save_pool_balances(self, pool_tvl_dict: dict, to_json: bool, to_csv: bool):
+        """
+        Save pool TVL data to the datastore as json and/or csv
+        """
+        if to_json:
+            save_json_file_to_datastore(
+                "{}_pool_tvl.json".format(self.chain),
+                pool_tvl_dict
+            )
+        if to_csv:
+            dataframe = make_timestamped_dataframe(pool_tvl_dict['total_tvl'])
+            save_csv_to_datastore(
+                "{}_total_tvl.csv".format(self.chain),
+                dataframe
+            )
+
+    def _build_pool_balance_queries(self, markets: dict):
+        """
+        Build the uncalled pool amount queries for both sides of every market
+
+        Parameters
+        ----------
+        markets : dict
+            dictionary of available markets.
+
+        Returns
+        -------
+        dict
+            call groups for the multicall, with the market keys to map the outputs to.
+
+        """
+        long_balance_list = []
+        short_balance_list = []
+        mapper = []
+        key_index = get_market_key_index(self.chain, markets)
+
+        for market in markets:
+
+            long_token_balance, short_token_balance = self._query_balances(market, key_index)
+
+            long_balance_list.append(long_token_balance)
+            short_balance_list.append(short_token_balance)
+            mapper.append(market)
+
+        return {
+            'calls': [long_balance_list, short_balance_list],
+            'mapper': mapper
+        }
+
+    def _process_pool_balances(
+        self, markets: dict, oracle_prices_dict: dict, queries: dict, outputs: list
+    ):
+        """
+        Turn the multicall outputs of the pool amount queries into USD pool values
+
+        Parameters
+        ----------
+        markets : dict
+            dictionary of available markets.
+        oracle_prices_dict : dict
+            dictionary of oracle prices keyed by token address.
+        queries : dict
+            output of _build_pool_balance_queries.
+        outputs : list
+            grouped multicall outputs, in the same order as queries['calls'].
+
+        Returns
+        -------
+        pool_tvl_dict : dict
+            dictionary of pool values.
+
+        """
         pool_tvl_dict = {
             "total_tvl": {
             },
@@ -52,20 +177,28 @@ class GetPoolTVL:
             }
         }
 
-        for market in markets:
+        long_balance_output, short_balance_output = outputs
+
+        for market, long_token_balance, short_token_balance in zip(
+            queries['mapper'],
+            long_balance_output,
+            short_balance_output
+        ):
 
             print("\n"+markets[market]['market_symbol'])
 
+            if long_token_balance is None or short_token_balance is None:
+                logging.warning(
+                    "Skipping {}, pool balance query failed!".format(
+                        markets[market]['market_symbol']
+                    )
+                )
+                continue
+
             index_token_address = markets[market]['index_token_address']
             long_token_metadata = markets[market]['long_token_metadata']
             short_token_metadata = markets[market]['short_token_metadata']
 
-            long_token_balance, short_token_balance = self._query_balances(
-                market,
-                long_token_metadata,
-                short_token_metadata
-            )
-
             long_precision = 10**long_token_metadata['decimals']
             short_precision = 10**short_token_metadata['decimals']
             long_token_balance = long_token_balance/long_precision
@@ -80,6 +213,7 @@ class GetPoolTVL:
 
             oracle_precision = 10**(30-markets[market]['long_token_metadata']['decimals'])
             long_usd_balance = self._calculate_usd_value(
+                oracle_prices_dict,
                 index_token_address,
                 long_token_balance,
                 oracle_precision
@@ -99,69 +233,40 @@ class GetPoolTVL:
                 )
             )
 
-        if to_json:
-            save_json_file_to_datastore(
-                "{}_pool_tvl.json".format(self.chain),
-                pool_tvl_dict
-            )
-        if to_csv:
-            dataframe = make_timestamped_dataframe(pool_tvl_dict['total_tvl'])
-            save_csv_to_datastore(
-                "{}_total_tvl.csv".format(self.chain),
-                dataframe
-            )
-        else:
-            return pool_tvl_dict
+        return pool_tvl_dict
 
-    def _query_balances(
-        self,
-        market: str,
-        long_token_metadata: dict,
-        short_token_metadata: dict
-    ):
+    def _query_balances(self, market: str, key_index):
         """
-        For a given GMX market get the balance of long and short tokens from the datastore
-        contract
+        For a given GMX market get the uncalled queries for the balance of long and short tokens
+        from the datastore contract
 
         Parameters
         ----------
         market : str
             contract address of the market.
-        long_token_metadata : dict
-            dictionary containing address.
-        short_token_metadata : dict
-            dictionary containing address.
+        key_index : MarketKeyIndex
+            precomputed keys of the market set.
 
         Returns
         -------
-        long_token_balance : int
-            amount of tokens.
-        short_token_balance : int
-            amount of tokens.
+        long_token_balance : web3 datastore obj
+            uncalled query for amount of tokens.
+        short_token_balance : web3 datastore obj
+            uncalled query for amount of tokens.
 
         """
-        datastore = get_datastore_contract(self.chain)
-        pool_amount_hash_data = pool_amount_key(
-            market,
-            long_token_metadata['address']
-        )
-        long_token_balance = datastore.functions.getUint(
-            pool_amount_hash_data
-        ).call()
-
-        datastore = get_datastore_contract(self.chain)
-        pool_amount_hash_data = pool_amount_key(
-            market,
-            short_token_metadata['address']
+        long_token_balance, short_token_balance = DataStoreReader(chain=self.chain).get_calls(
+            [
+                key_index.get(market, "pool_amount_long"),
+                key_index.get(market, "pool_amount_short")
+            ]
         )
-        short_token_balance = datastore.functions.getUint(
-            pool_amount_hash_data
-        ).call()
 
         return long_token_balance, short_token_balance
 
     def _calculate_usd_value(
         self,
+        oracle_prices_dict: dict,
         token_address: str,
         token_balance: int,
         oracle_precision: int,
@@ -171,6 +276,8 @@ class GetPoolTVL:
 
         Parameters
         ----------
+        oracle_prices_dict : dict
+            dictionary of oracle prices keyed by token address.
         token_address : str
             contracta address.
         token_balance : int
@@ -187,10 +294,8 @@ class GetPoolTVL:
 
         try:
             token_price = np.median([float(
-                self.oracle_prices_dict(
-                )[token_address]['maxPriceFull'])/oracle_precision,
-                float(self.oracle_prices_dict(
-                )[token_address]['minPriceFull'])/oracle_precision]
+                oracle_prices_dict[token_address]['maxPriceFull'])/oracle_precision,
+                float(oracle_prices_dict[token_address]['minPriceFull'])/oracle_precision]
             )
 
             return token_price*token_balance
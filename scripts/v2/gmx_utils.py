@@ -7,18 +7,30 @@ Created on Fri Jul 28 09:48:13 2023
 """
 
 from eth_abi import encode
-from web3 import Web3
+from web3 import AsyncHTTPProvider, AsyncWeb3, Web3
+import aiohttp
+import asyncio
+import atexit
+import copy
 import yaml
 import logging
 import os
 import json
+import pickle
+import random
+import threading
+import time
 import requests
 
+from requests.adapters import HTTPAdapter
+
 import pandas as pd
 
+from contextlib import contextmanager
 from datetime import datetime
+from types import MappingProxyType
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait
 
 
 base_dir = os.path.join(os.path.dirname(__file__), '..', '..')
@@ -31,16 +43,223 @@ logging.basicConfig(
 )
 
 
+# Number of worker threads in the shared executor
+EXECUTOR_MAX_WORKERS = 32
+EXECUTOR_THREAD_NAME_PREFIX = "gmx-sdk"
+
+# Number of worker threads running fan outs started from inside the shared executor
+NESTED_EXECUTOR_MAX_WORKERS = 32
+
+_executor = None
+_nested_executor = None
+_executor_lock = threading.Lock()
+_worker_context = threading.local()
+
+
+def _mark_worker_thread():
+    _worker_context.is_worker = True
+
+
+def _mark_nested_worker_thread():
+    _worker_context.is_worker = True
+    _worker_context.is_nested_worker = True
+
+
+def _create_executor(max_workers: int, thread_name_prefix: str):
+    return ThreadPoolExecutor(
+        max_workers=max_workers,
+        thread_name_prefix=thread_name_prefix,
+        initializer=_mark_worker_thread
+    )
+
+
+def configure_executor(
+    max_workers: int = EXECUTOR_MAX_WORKERS,
+    thread_name_prefix: str = EXECUTOR_THREAD_NAME_PREFIX
+):
+    """
+    Replace the shared executor with one of the given size, the old executor finishes any work
+    already submitted to it
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        number of worker threads. The default is EXECUTOR_MAX_WORKERS.
+    thread_name_prefix : str, optional
+        prefix of the worker thread names. The default is EXECUTOR_THREAD_NAME_PREFIX.
+
+    Returns
+    -------
+    ThreadPoolExecutor
+        the new shared executor.
+
+    """
+    global _executor
+
+    with _executor_lock:
+        old_executor = _executor
+        _executor = executor = _create_executor(max_workers, thread_name_prefix)
+
+    if old_executor is not None:
+        old_executor.shutdown(wait=False)
+
+    return executor
+
+
+def get_executor():
+    """
+    Get the executor shared by the whole sdk, created on first use
+
+    Returns
+    -------
+    ThreadPoolExecutor
+        shared executor.
+
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = _create_executor(EXECUTOR_MAX_WORKERS, EXECUTOR_THREAD_NAME_PREFIX)
+
+        return _executor
+
+
+def _get_nested_executor():
+    """
+    Get the executor for fan outs started by a worker of the shared executor, created on first
+    use
+    """
+    global _nested_executor
+
+    with _executor_lock:
+        if _nested_executor is None:
+            _nested_executor = ThreadPoolExecutor(
+                max_workers=NESTED_EXECUTOR_MAX_WORKERS,
+                thread_name_prefix="{}-nested".format(EXECUTOR_THREAD_NAME_PREFIX),
+                initializer=_mark_nested_worker_thread
+            )
+
+        return _nested_executor
+
+
+def shutdown_executor(wait: bool = True, cancel_futures: bool = False):
+    """
+    Shut down the shared executor and the nested executor, new ones are created if they are
+    needed again
+
+    Parameters
+    ----------
+    wait : bool, optional
+        wait for running work to finish. The default is True.
+    cancel_futures : bool, optional
+        cancel work which has not started yet. The default is False.
+
+    """
+    global _executor, _nested_executor
+
+    with _executor_lock:
+        executors = [_executor, _nested_executor]
+        _executor = None
+        _nested_executor = None
+
+    for executor in executors:
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+atexit.register(shutdown_executor, wait=False, cancel_futures=True)
+
+
+def submit_many(
+    function,
+    items: list,
+    timeout: float = None,
+    return_partial: bool = False
+):
+    """
+    Run function on every item using the shared executor and return the results in order.
+
+    A fan out started from a worker of the shared executor, eg the two rounds of an order built
+    by OrderBatch, runs on a separate nested executor rather than queueing behind its own caller,
+    which could deadlock the pool. Fan outs started from a nested worker run inline. So one level
+    of nesting still runs in parallel while the number of threads stays bounded, at the cost of
+    running the third level and below serially, without timeout as inline calls can not be
+    interrupted. A single item is also run inline, unless there is a timeout.
+
+    Parameters
+    ----------
+    function : callable
+        function to call with each item.
+    items : list
+        items to call function with.
+    timeout : float, optional
+        seconds to wait for all results. The default is None, which waits indefinitely.
+    return_partial : bool, optional
+        if True, items which failed or did not finish in time give None instead of raising. The
+        default is False.
+
+    Returns
+    -------
+    results : list
+        results in the same order as items.
+
+    """
+    items = list(items)
+
+    if getattr(_worker_context, 'is_nested_worker', False) or \
+            (len(items) <= 1 and timeout is None):
+        futures = None
+    else:
+        if getattr(_worker_context, 'is_worker', False):
+            executor = _get_nested_executor()
+        else:
+            executor = get_executor()
+
+        futures = [executor.submit(function, item) for item in items]
+        done, not_done = wait(futures, timeout=timeout)
+
+        if not_done:
+            for future in not_done:
+                future.cancel()
+
+            if not return_partial:
+                raise TimeoutError(
+                    "{} of {} calls did not finish in time!".format(len(not_done), len(items))
+                )
+
+    results = []
+    for i, item in enumerate(items):
+        try:
+            if futures is None:
+                results.append(function(item))
+            elif futures[i].done() and not futures[i].cancelled():
+                results.append(futures[i].result())
+            else:
+                results.append(None)
+
+        except Exception as e:
+            if not return_partial:
+                raise
+            logging.warning("Call failed: {}".format(e))
+            results.append(None)
+
+    return results
+
+
 # Functions required for multithreading
 def execute_call(call):
     return call.call()
 
 
-def execute_threading(function_calls):
+def execute_threading(function_calls, timeout: float = None, return_partial: bool = False):
 
-    with ThreadPoolExecutor() as executor:
-        results = list(executor.map(execute_call, function_calls))
-    return results
+    return submit_many(
+        execute_call,
+        function_calls,
+        timeout=timeout,
+        return_partial=return_partial
+    )
 
 
 contract_map = {
@@ -133,6 +352,32 @@ contract_map = {
 }
 
 
+_config_cache = {}
+_config_lock = threading.Lock()
+
+
+def _get_file_mtime(filepath: str):
+    """
+    Get the modification time of a file in nanoseconds, or None if it does not exist
+    """
+    try:
+        return os.stat(filepath).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _freeze_config(config: dict):
+    """
+    Return a read only view of a config dictionary, nested dictionaries included
+    """
+    return MappingProxyType(
+        {
+            key: _freeze_config(value) if isinstance(value, dict) else value
+            for key, value in config.items()
+        }
+    )
+
+
 class Config:
 
     def __init__(
@@ -154,18 +399,37 @@ class Config:
         }
 
     def load_config(self):
+        """
+        Read and validate the config file, the loaded config is cached so later calls to
+        get_config do not need to parse the file again
+
+        Returns
+        -------
+        config : dict
+            editable dictionary of config parameters.
+
+        """
+        mtime = _get_file_mtime(self.file_path)
         try:
-            config = yaml.safe_load(open(os.path.join(base_dir, "config.yaml")))
-            return self.test_config_format(config)
+            with open(self.file_path) as file:
+                config = self.test_config_format(yaml.safe_load(file))
         except FileNotFoundError:
             print(f"Config file '{self.file_path}' not found.\nLoading blank template!")
-            return self.skeleton
+            config = self.skeleton
+
+        with _config_lock:
+            _config_cache[os.path.abspath(self.file_path)] = (mtime, _freeze_config(config))
+
+        return config
 
     def set_config(self, config):
         print(f"Setting config file: '{self.file_path}'")
         with open(self.file_path, 'w') as file:
             yaml.dump(config, file)
 
+        with _config_lock:
+            _config_cache.pop(os.path.abspath(self.file_path), None)
+
     def test_config_format(self, config):
 
         if config.keys() == self.skeleton.keys():
@@ -192,8 +456,33 @@ class Config:
 
 
 def get_config(filepath: str = os.path.join(base_dir, "config.yaml")):
+    """
+    Get the config parameters. The file is only parsed again if it has been modified since it was
+    last loaded, or if reload_config is called
+
+    Parameters
+    ----------
+    filepath : str, optional
+        path to config file. The default is config.yaml in the base directory.
+
+    Returns
+    -------
+    config : MappingProxyType
+        read only dictionary of config parameters.
+
+    """
+    mtime = _get_file_mtime(filepath)
+
+    with _config_lock:
+        cached = _config_cache.get(os.path.abspath(filepath))
+
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    Config(filepath).load_config()
 
-    config = Config(filepath).load_config()
+    with _config_lock:
+        config = _config_cache[os.path.abspath(filepath)][1]
 
     if config['private_key'] is None:
         logging.warning("Private key not set!")
@@ -207,19 +496,817 @@ def get_config(filepath: str = os.path.join(base_dir, "config.yaml")):
     if config['user_wallet_address'] is None:
         logging.warning("Wallet address not set!")
 
-    return config
+    return config
+
+
+def reload_config(filepath: str = os.path.join(base_dir, "config.yaml")):
+    """
+    Drop the cached config and load it again from file
+
+    Parameters
+    ----------
+    filepath : str, optional
+        path to config file. The default is config.yaml in the base directory.
+
+    Returns
+    -------
+    config : MappingProxyType
+        read only dictionary of config parameters.
+
+    """
+    with _config_lock:
+        _config_cache.pop(os.path.abspath(filepath), None)
+
+    return get_config(filepath)
+
+
+# Default limits applied to each RPC endpoint by its scheduler
+RPC_REQUESTS_PER_SECOND = 20
+RPC_MAX_CONCURRENCY = 16
+RPC_MAX_RETRIES = 5
+RPC_CALL_DEADLINE = 60
+
+# Methods which must never be resent automatically
+NON_RETRYABLE_RPC_METHODS = {
+    "eth_sendRawTransaction",
+    "eth_sendTransaction"
+}
+
+# JSON-RPC error codes providers use to signal rate limiting
+RATE_LIMIT_ERROR_CODES = {429, -32005, -32029}
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+_rpc_context = threading.local()
+
+
+class RateLimitError(Exception):
+    """
+    Raised when an RPC rejects a request because of rate limiting
+    """
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket which allows bursts of up to capacity requests and refills at rate per second
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self):
+        """
+        Take a token if one is available, otherwise return the seconds until one will be
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._last_refill) * self.rate
+            )
+            self._last_refill = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, deadline: float = None):
+        """
+        Block until a token is available
+
+        Parameters
+        ----------
+        deadline : float, optional
+            time.monotonic() value to give up at. The default is None, which waits indefinitely.
+
+        Returns
+        -------
+        bool
+            True if a token was taken, False if the deadline passed first.
+
+        """
+        while True:
+            wait = self._try_acquire()
+            if wait == 0:
+                return True
+
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+
+            time.sleep(wait)
+
+    async def aacquire(self, deadline: float = None):
+        """
+        Async version of acquire
+        """
+        while True:
+            wait = self._try_acquire()
+            if wait == 0:
+                return True
+
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+
+            await asyncio.sleep(wait)
+
+
+def is_retryable_rpc_error(error: Exception):
+    """
+    Check if an error raised by an RPC call is transient and worth retrying
+    """
+    if isinstance(error, (RateLimitError, requests.Timeout, requests.ConnectionError,
+                          asyncio.TimeoutError, aiohttp.ClientConnectionError)):
+        return True
+
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+
+    return False
+
+
+def is_throttling_rpc_error(error: Exception):
+    """
+    Check if an error means the RPC is overloaded, used to back off concurrency
+    """
+    if isinstance(error, (RateLimitError, requests.Timeout, asyncio.TimeoutError)):
+        return True
+
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429
+
+    return isinstance(error, requests.HTTPError) and error.response is not None and \
+        error.response.status_code == 429
+
+
+class RPCScheduler:
+    """
+    Runs calls against one RPC endpoint under a token bucket rate limit and an adaptive
+    concurrency limit. Concurrency grows additively while calls succeed and halves when the RPC
+    throttles or times out. Transient failures are retried with jittered exponential backoff until
+    the call deadline. Sync and async callers share the same limits.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = RPC_REQUESTS_PER_SECOND,
+        max_concurrency: int = RPC_MAX_CONCURRENCY,
+        min_concurrency: int = 1,
+        max_retries: int = RPC_MAX_RETRIES,
+        base_backoff: float = 0.25,
+        max_backoff: float = 8,
+        deadline: float = RPC_CALL_DEADLINE
+    ):
+        self.bucket = TokenBucket(requests_per_second)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+
+        self.concurrency = float(max_concurrency)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        # (event loop, asyncio.Event) of each async caller waiting for a slot
+        self._async_waiters = []
+
+    def _get_deadline(self, deadline: float = None):
+        if deadline is not None:
+            return deadline
+
+        return getattr(_rpc_context, 'deadline', None) or time.monotonic() + self.deadline
+
+    def _acquire(self, deadline: float):
+        with self._condition:
+            while self._in_flight >= int(self.concurrency):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("RPC call deadline exceeded waiting for a slot!")
+                self._condition.wait(remaining)
+            self._in_flight += 1
+
+        if not self.bucket.acquire(deadline):
+            self._release()
+            raise TimeoutError("RPC call deadline exceeded waiting for rate limit!")
+
+    async def _aacquire(self, deadline: float):
+        """
+        Async version of _acquire, waiting on an event set by _release rather than blocking the
+        event loop on the condition
+        """
+        loop = asyncio.get_running_loop()
+
+        while True:
+            with self._condition:
+                if self._in_flight < int(self.concurrency):
+                    self._in_flight += 1
+                    break
+
+                waiter = (loop, asyncio.Event())
+                self._async_waiters.append(waiter)
+
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                await asyncio.wait_for(waiter[1].wait(), remaining)
+
+            except asyncio.TimeoutError:
+                raise TimeoutError("RPC call deadline exceeded waiting for a slot!")
+
+            finally:
+                with self._condition:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+        if not await self.bucket.aacquire(deadline):
+            self._release()
+            raise TimeoutError("RPC call deadline exceeded waiting for rate limit!")
+
+    def _release(self, succeeded: bool = None, throttled: bool = False):
+        with self._condition:
+            self._in_flight -= 1
+
+            if throttled:
+                self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+            elif succeeded:
+                self.concurrency = min(
+                    self.max_concurrency,
+                    self.concurrency + 1 / self.concurrency
+                )
+
+            self._condition.notify_all()
+
+            async_waiters = self._async_waiters
+            self._async_waiters = []
+
+        # wake async callers on their own event loops, they recheck for a free slot
+        for loop, event in async_waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # the waiter's event loop has been closed
+                pass
+
+    def _get_backoff(self, error: Exception, attempt: int, deadline: float, retry: bool):
+        """
+        Release the slot of a failed call and return how long to wait before retrying it, or None
+        if the error should be raised
+        """
+        self._release(succeeded=False, throttled=is_throttling_rpc_error(error))
+
+        if not retry or not is_retryable_rpc_error(error) or attempt >= self.max_retries:
+            return None
+
+        backoff = random.uniform(0, min(self.max_backoff, self.base_backoff * 2**attempt))
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            backoff = max(backoff, retry_after)
+
+        if time.monotonic() + backoff > deadline:
+            return None
+
+        logging.debug("RPC call failed ({}), retrying in {:.2f}s".format(error, backoff))
+        return backoff
+
+    def run(self, function, *args, retry: bool = True, deadline: float = None, **kwargs):
+        """
+        Run function once a slot and a rate limit token are available, retrying transient errors
+
+        Parameters
+        ----------
+        function : callable
+            function which makes the RPC call.
+        *args : list
+            passed on to function.
+        retry : bool, optional
+            pass False for calls which must not be resent. The default is True.
+        deadline : float, optional
+            time.monotonic() value the call must finish by. The default is the scheduler deadline
+            from now, or the deadline set with rpc_deadline on the calling thread.
+        **kwargs : dict
+            passed on to function.
+
+        """
+        deadline = self._get_deadline(deadline)
+
+        attempt = 0
+        while True:
+            self._acquire(deadline)
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                backoff = self._get_backoff(e, attempt, deadline, retry)
+                if backoff is None:
+                    raise
+
+                time.sleep(backoff)
+                attempt += 1
+                continue
+
+            self._release(succeeded=True)
+            return result
+
+    async def arun(
+        self, coroutine_function, *args, retry: bool = True, deadline: float = None, **kwargs
+    ):
+        """
+        Async version of run, coroutine_function is awaited instead of called
+
+        Parameters
+        ----------
+        coroutine_function : callable
+            async function which makes the RPC call.
+        *args : list
+            passed on to coroutine_function.
+        retry : bool, optional
+            pass False for calls which must not be resent. The default is True.
+        deadline : float, optional
+            time.monotonic() value the call must finish by. The default is the scheduler deadline
+            from now.
+        **kwargs : dict
+            passed on to coroutine_function.
+
+        """
+        deadline = self._get_deadline(deadline)
+
+        attempt = 0
+        while True:
+            await self._aacquire(deadline)
+            try:
+                result = await coroutine_function(*args, **kwargs)
+            except Exception as e:
+                backoff = self._get_backoff(e, attempt, deadline, retry)
+                if backoff is None:
+                    raise
+
+                await asyncio.sleep(backoff)
+                attempt += 1
+                continue
+
+            self._release(succeeded=True)
+            return result
+
+
+def get_rpc_scheduler(endpoint_uri: str, **kwargs):
+    """
+    Get the scheduler for an RPC endpoint, creating it with kwargs if it does not exist yet
+
+    Parameters
+    ----------
+    endpoint_uri : str
+        rpc url.
+    **kwargs : dict
+        passed on to RPCScheduler.
+
+    """
+    with _schedulers_lock:
+        scheduler = _schedulers.get(endpoint_uri)
+
+        if scheduler is None:
+            scheduler = RPCScheduler(**kwargs)
+            _schedulers[endpoint_uri] = scheduler
+
+    return scheduler
+
+
+@contextmanager
+def rpc_deadline(seconds: float):
+    """
+    Set a deadline for all RPC calls made on the current thread inside the with block
+
+    Parameters
+    ----------
+    seconds : float
+        seconds from now the calls must finish in.
+
+    """
+    previous = getattr(_rpc_context, 'deadline', None)
+    _rpc_context.deadline = time.monotonic() + seconds
+    try:
+        yield
+    finally:
+        _rpc_context.deadline = previous
+
+
+def _raise_for_rate_limit(response):
+    """
+    Raise RateLimitError if a decoded JSON-RPC response is a rate limit error
+    """
+    if isinstance(response, dict) and isinstance(response.get('error'), dict) and \
+            response['error'].get('code') in RATE_LIMIT_ERROR_CODES:
+        raise RateLimitError(response['error'].get('message', 'Rate limited'))
+
+    return response
+
+
+# Maximum number of keep-alive HTTP connections pooled per RPC endpoint
+MAX_RPC_CONNECTIONS = 20
+
+# Read only methods the batching provider is allowed to coalesce into JSON-RPC batches
+BATCHABLE_RPC_METHODS = {
+    "eth_blockNumber",
+    "eth_call",
+    "eth_chainId",
+    "eth_gasPrice",
+    "eth_getBalance",
+    "eth_getTransactionCount"
+}
+
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+class PooledHTTPProvider(Web3.HTTPProvider):
+    """
+    HTTP provider which sends every request through one shared requests.Session, web3 would
+    otherwise create a session per thread and lose the keep-alive connections between them
+    """
+
+    def __init__(self, endpoint_uri: str, session, request_kwargs: dict = None):
+        super().__init__(endpoint_uri, request_kwargs=request_kwargs, session=session)
+        self._session = session
+
+    @property
+    def scheduler(self):
+        return get_rpc_scheduler(self.endpoint_uri)
+
+    def _post(self, request_data: bytes, deadline: float = None):
+        request_kwargs = dict(self.get_request_kwargs())
+        request_kwargs.setdefault('timeout', 30)
+
+        # never wait on the socket past a deadline set with rpc_deadline
+        if deadline is None:
+            deadline = getattr(_rpc_context, 'deadline', None)
+        if deadline is not None:
+            request_kwargs['timeout'] = max(0.1, min(request_kwargs['timeout'],
+                                                     deadline - time.monotonic()))
+
+        response = self._session.post(
+            self.endpoint_uri,
+            data=request_data,
+            **request_kwargs
+        )
+
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            raise RateLimitError(
+                "Rate limited by {}".format(self.endpoint_uri),
+                float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        response.raise_for_status()
+
+        return response.content
+
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+
+        return self.scheduler.run(
+            lambda: _raise_for_rate_limit(self.decode_rpc_response(self._post(request_data))),
+            retry=method not in NON_RETRYABLE_RPC_METHODS
+        )
+
+
+class _BatchedRequest:
+
+    __slots__ = ('request_id', 'request_data', 'deadline', 'response', 'error', 'done')
+
+    def __init__(self, request_data: bytes, deadline: float):
+        self.request_id = json.loads(request_data)['id']
+        self.request_data = request_data
+        self.deadline = deadline
+        self.response = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class BatchingHTTPProvider(PooledHTTPProvider):
+    """
+    Pooled HTTP provider which coalesces concurrently issued read requests into JSON-RPC batches.
+    A request waits at most flush_window seconds, or until max_batch_size requests are pending,
+    before the pending requests are sent together in one POST. Batches are sent from the
+    provider's own threads, the shared executor's workers may all be blocked waiting on them.
+
+    Each request keeps the deadline of its caller, set with rpc_deadline or else the scheduler
+    deadline. A batch is sent under the earliest deadline of its requests, and a caller whose
+    deadline passes before its batch is answered gets a TimeoutError. Once the provider is
+    closed, requests are sent one by one instead.
+    """
+
+    def __init__(
+        self,
+        endpoint_uri: str,
+        session,
+        flush_window: float = 0.005,
+        max_batch_size: int = 50,
+        max_concurrent_batches: int = 4,
+        request_kwargs: dict = None
+    ):
+        super().__init__(endpoint_uri, session, request_kwargs=request_kwargs)
+        self.flush_window = flush_window
+        self.max_batch_size = max_batch_size
+
+        self._pending = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._flusher = None
+        self._sender = ThreadPoolExecutor(
+            max_workers=max_concurrent_batches,
+            thread_name_prefix="rpc-batch"
+        )
+
+    def make_request(self, method, params):
+        if method not in BATCHABLE_RPC_METHODS:
+            return super().make_request(method, params)
+
+        # the deadline is captured here, the batch is sent from another thread
+        request = _BatchedRequest(
+            self.encode_rpc_request(method, params),
+            self.scheduler._get_deadline()
+        )
+
+        with self._condition:
+            closed = self._closed
+
+            if not closed:
+                self._pending.append(request)
+
+                if self._flusher is None:
+                    self._flusher = threading.Thread(
+                        target=self._flush_loop,
+                        name="rpc-batch-flusher",
+                        daemon=True
+                    )
+                    self._flusher.start()
+
+                self._condition.notify()
+
+        if closed:
+            return super().make_request(method, params)
+
+        # never block forever if the flusher or sender threads die or hang
+        if not request.done.wait(max(0, request.deadline - time.monotonic())):
+            with self._condition:
+                if request in self._pending:
+                    self._pending.remove(request)
+
+            raise TimeoutError(
+                "Batched RPC request {} deadline exceeded!".format(request.request_id)
+            )
+
+        if request.error is not None:
+            raise request.error
+
+        return request.response
+
+    def close(self):
+        """
+        Stop batching and shut down the sender threads. Requests still pending fail, later
+        requests are sent one by one.
+        """
+        with self._condition:
+            self._closed = True
+            pending = self._pending
+            self._pending = []
+            self._condition.notify_all()
+
+        self._sender.shutdown(wait=False)
+        self._fail_batch(pending, Exception("Batching provider was closed!"))
+
+    def _flush_loop(self):
+        """
+        Wait for pending requests and hand them to the sender in batches, until the provider is
+        closed
+        """
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+
+                if self._closed:
+                    self._flusher = None
+                    return
+
+                # give concurrent callers the flush window to join the batch
+                deadline = time.monotonic() + self.flush_window
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+
+            try:
+                self._sender.submit(self._send_batch, batch)
+
+            # the sender was shut down by close while the batch was collected
+            except RuntimeError as e:
+                self._fail_batch(batch, e)
+
+    def _fail_batch(self, batch: list, error: Exception):
+        for request in batch:
+            request.error = error
+            request.done.set()
+
+    def _post_scheduled(self, request_data: bytes, deadline: float):
+        return self.scheduler.run(
+            lambda: _raise_for_rate_limit(
+                self.decode_rpc_response(self._post(request_data, deadline))
+            ),
+            deadline=deadline
+        )
+
+    def _send_batch(self, batch: list):
+        """
+        Send a batch of requests in one POST and hand each response back to its caller
+        """
+        deadline = min(request.deadline for request in batch)
+
+        try:
+            if len(batch) == 1:
+                responses = [self._post_scheduled(batch[0].request_data, deadline)]
+            else:
+                responses = self._post_scheduled(
+                    b"[" + b",".join(request.request_data for request in batch) + b"]",
+                    deadline
+                )
+
+            # endpoints without batch support answer with a single error object
+            if isinstance(responses, dict):
+                responses = [
+                    self._post_scheduled(request.request_data, request.deadline)
+                    for request in batch
+                ]
+
+            responses_by_id = {response.get('id'): response for response in responses}
+
+            for request in batch:
+                request.response = responses_by_id.get(request.request_id)
+                if request.response is None:
+                    request.error = Exception(
+                        "No response to batched request {}!".format(request.request_id)
+                    )
+
+        except Exception as e:
+            for request in batch:
+                request.error = e
+
+        finally:
+            for request in batch:
+                request.done.set()
+
+
+def create_rpc_session(max_connections: int = MAX_RPC_CONNECTIONS):
+    """
+    Create a requests session with a connection pool sized to max_connections
+
+    Parameters
+    ----------
+    max_connections : int, optional
+        number of connections to keep alive. The default is MAX_RPC_CONNECTIONS.
+
+    Returns
+    -------
+    session : requests.Session
+        session with a sized connection pool mounted.
+
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=max_connections
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+def create_connection(
+    rpc: str = None,
+    chain: str = None,
+    max_connections: int = None,
+    batch_requests: bool = False
+):
+    """
+    Get a connection to the blockchain. Connections are created once per RPC and shared by all
+    callers for the life of the process
+
+    Parameters
+    ----------
+    rpc : str, optional
+        rpc url, taken from config file for the given chain if not passed.
+    chain : str, optional
+        arbitrum or avalanche.
+    max_connections : int, optional
+        size of the connection pool if the connection has not been created yet. The default is
+        MAX_RPC_CONNECTIONS.
+    batch_requests : bool, optional
+        pass True to get a connection which coalesces concurrent read requests into JSON-RPC
+        batches. The default is False.
+
+    Returns
+    -------
+    web3_obj : Web3
+        pooled web3 connection.
+
+    """
+    if rpc is None:
+        rpc = get_config()[chain]['rpc']
+
+    with _connections_lock:
+        web3_obj = _connections.get((rpc, batch_requests))
+
+        if web3_obj is None:
+            session = create_rpc_session(max_connections or MAX_RPC_CONNECTIONS)
+
+            if batch_requests:
+                provider = BatchingHTTPProvider(rpc, session)
+            else:
+                provider = PooledHTTPProvider(rpc, session)
+
+            web3_obj = Web3(provider)
+            _connections[(rpc, batch_requests)] = web3_obj
+
+    return web3_obj
+
+
+def close_connections():
+    """
+    Close the HTTP sessions of every pooled connection and empty the registry
+    """
+    with _connections_lock:
+        for web3_obj in _connections.values():
+            if isinstance(web3_obj.provider, BatchingHTTPProvider):
+                web3_obj.provider.close()
+            web3_obj.provider._session.close()
+        _connections.clear()
+
+
+class ScheduledAsyncHTTPProvider(AsyncHTTPProvider):
+    """
+    Async HTTP provider which sends its requests through the same per endpoint scheduler as the
+    sync providers
+    """
+
+    async def _make_checked_request(self, method, params):
+        return _raise_for_rate_limit(await AsyncHTTPProvider.make_request(self, method, params))
+
+    async def make_request(self, method, params):
+        return await get_rpc_scheduler(self.endpoint_uri).arun(
+            self._make_checked_request,
+            method,
+            params,
+            retry=method not in NON_RETRYABLE_RPC_METHODS
+        )
+
+
+_async_connections = {}
 
 
-def create_connection(rpc: str = None, chain: str = None):
+def create_async_connection(rpc: str = None, chain: str = None):
     """
-    Create a connection to the blockchain
+    Get an async connection to the blockchain, created once per RPC and shared by all callers
+
+    Parameters
+    ----------
+    rpc : str, optional
+        rpc url, taken from config file for the given chain if not passed.
+    chain : str, optional
+        arbitrum or avalanche.
+
+    Returns
+    -------
+    async_web3_obj : AsyncWeb3
+        shared async web3 connection.
+
     """
     if rpc is None:
         rpc = get_config()[chain]['rpc']
 
-    web3_obj = Web3(Web3.HTTPProvider(rpc))
+    with _connections_lock:
+        async_web3_obj = _async_connections.get(rpc)
 
-    return web3_obj
+        if async_web3_obj is None:
+            async_web3_obj = AsyncWeb3(ScheduledAsyncHTTPProvider(rpc))
+            _async_connections[rpc] = async_web3_obj
+
+    return async_web3_obj
 
 
 def convert_to_checksum_address(chain: str, address: str):
@@ -240,9 +1327,119 @@ def convert_to_checksum_address(chain: str, address: str):
 
     """
 
-    web3_obj = create_connection(chain=chain)
+    return Web3.to_checksum_address(address)
+
+
+# Parsed ABIs keyed by their path relative to base_dir
+_abi_cache = {}
+
+# Contract objects keyed by (chain, contract_name) and (chain, token_address, abi_path)
+_contract_cache = {}
+_contract_cache_lock = threading.Lock()
+
+default_abi_bundle_path = os.path.join(base_dir, 'contracts', 'v2', 'abi_bundle.pkl')
+
+
+def load_abi(abi_path: str):
+    """
+    Load a contract abi, each file is only read and parsed once per process
+
+    Parameters
+    ----------
+    abi_path : str
+        path of the abi json file relative to the base directory.
+
+    Returns
+    -------
+    list
+        parsed abi.
+
+    """
+    abi = _abi_cache.get(abi_path)
+
+    if abi is None:
+        with open(os.path.join(base_dir, abi_path)) as f:
+            abi = json.load(f)
+        _abi_cache[abi_path] = abi
+
+    return abi
+
+
+def _get_known_abi_paths():
+    """
+    List the path of every abi the sdk uses
+    """
+    abi_paths = [
+        contract['abi_path'] for chain_contracts in contract_map.values()
+        for contract in chain_contracts.values()
+    ]
+
+    return abi_paths + [
+        os.path.join('contracts', 'v2', 'balance_abi.json'),
+        os.path.join('contracts', 'v2', 'token_approval.json'),
+        os.path.join('contracts', 'v2', 'multicall3.json')
+    ]
+
+
+def save_abi_bundle(filepath: str = default_abi_bundle_path):
+    """
+    Parse every known abi and save them together as a single pickle, which can be loaded with
+    load_abi_bundle for a faster cold start
+
+    Parameters
+    ----------
+    filepath : str, optional
+        where to save the bundle. The default is contracts/v2/abi_bundle.pkl.
+
+    """
+    bundle = {abi_path: load_abi(abi_path) for abi_path in _get_known_abi_paths()}
+
+    with open(filepath, 'wb') as f:
+        pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_abi_bundle(filepath: str = default_abi_bundle_path):
+    """
+    Populate the abi cache from a bundle created with save_abi_bundle. Only load bundles you
+    created yourself, unpickling untrusted files is unsafe
+
+    Parameters
+    ----------
+    filepath : str, optional
+        path of the bundle. The default is contracts/v2/abi_bundle.pkl.
+
+    Returns
+    -------
+    bool
+        True if the bundle was found and loaded.
+
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            _abi_cache.update(pickle.load(f))
+    except FileNotFoundError:
+        logging.warning("ABI bundle '{}' not found!".format(filepath))
+        return False
+
+    return True
+
+
+def _get_cached_contract(cache_key: tuple, web3_obj, address: str, abi_path: str):
+    """
+    Return the cached contract object for cache_key, creating it if it does not exist or was
+    built on a different connection
+    """
+    with _contract_cache_lock:
+        contract_obj = _contract_cache.get(cache_key)
+
+        if contract_obj is None or contract_obj.w3 is not web3_obj:
+            contract_obj = web3_obj.eth.contract(
+                address=address,
+                abi=load_abi(abi_path)
+            )
+            _contract_cache[cache_key] = contract_obj
 
-    return web3_obj.toChecksumAddress(address)
+    return contract_obj
 
 
 def get_contract_object(web3_obj, contract_name: str, chain: str):
@@ -265,23 +1462,46 @@ def get_contract_object(web3_obj, contract_name: str, chain: str):
         an instantied web3 contract object.
 
     """
-    contract_address = contract_map[chain][contract_name]["contract_address"]
-
-    contract_abi = json.load(
-        open(
-            os.path.join(
-                base_dir,
-                contract_map[chain][contract_name]["abi_path"]
-            )
-        )
+    return _get_cached_contract(
+        (chain, contract_name),
+        web3_obj,
+        contract_map[chain][contract_name]["contract_address"],
+        contract_map[chain][contract_name]["abi_path"]
     )
-    return web3_obj.eth.contract(
-        address=contract_address,
-        abi=contract_abi
+
+
+def get_token_contract(
+    chain: str,
+    contract_address: str,
+    abi_name: str = 'balance_abi.json',
+    batch_requests: bool = False
+):
+    """
+    Get a contract object for a token using one of the generic token abis
+
+    Parameters
+    ----------
+    chain : str
+        arbitrum or avalanche.
+    contract_address : str
+        address of the token.
+    abi_name : str, optional
+        balance_abi.json or token_approval.json. The default is 'balance_abi.json'.
+    batch_requests : bool, optional
+        pass True to build the contract on the batching connection. The default is False.
+
+    """
+    abi_path = os.path.join('contracts', 'v2', abi_name)
+
+    return _get_cached_contract(
+        (chain, contract_address, abi_path, batch_requests),
+        create_connection(chain=chain, batch_requests=batch_requests),
+        contract_address,
+        abi_path
     )
 
 
-def get_token_balance_contract(chain: str, contract_address: str):
+def get_token_balance_contract(chain: str, contract_address: str, batch_requests: bool = False):
     """
     Get the contract object required to query a users token balance
 
@@ -291,28 +1511,325 @@ def get_token_balance_contract(chain: str, contract_address: str):
         arbitrum or avalanche.
     contract_address : str
         the token to determine the balance of.
+    batch_requests : bool, optional
+        pass True to build the contract on the batching connection. The default is False.
 
     """
-    rpc = get_config()[chain]['rpc']
+    return get_token_contract(chain, contract_address, batch_requests=batch_requests)
 
-    web3_obj = create_connection(rpc)
-    contract_abi = json.load(
-        open(
-            os.path.join(
-                base_dir,
-                'contracts',
-                'v2',
-                'balance_abi.json'
-            )
+
+token_api_url = {
+    "arbitrum": "https://arbitrum-api.gmxinfra.io/tokens",
+    "avalanche": "https://avalanche-api.gmxinfra.io/tokens"
+}
+
+
+def _process_token_infos(token_infos: list):
+    """
+    Key the token infos returned by the GMX infra api by token address
+    """
+    token_address_dict = {}
+
+    for token_info in token_infos:
+        token_address_dict[token_info['address']] = token_info
+
+    return token_address_dict
+
+
+# Version of the on disk layout of cached markets and tokens, bump to ignore old cache files
+METADATA_CACHE_VERSION = 2
+
+# Seconds cached markets and tokens are served before being revalidated in the background
+METADATA_CACHE_TTL = 3600
+
+metadata_cache_dir = os.path.join(base_dir, "data_store", "metadata_cache")
+
+_metadata_cache = {}
+_metadata_cache_lock = threading.Lock()
+_metadata_refreshes = set()
+
+
+def _get_metadata_cache_path(chain: str, name: str):
+    return os.path.join(metadata_cache_dir, "{}_{}.json".format(chain, name))
+
+
+def _get_metadata_entry(chain: str, name: str):
+    """
+    Get a cached metadata entry from memory, falling back to the on disk cache
+    """
+    with _metadata_cache_lock:
+        entry = _metadata_cache.get((chain, name))
+
+    if entry is not None:
+        return entry
+
+    try:
+        with open(_get_metadata_cache_path(chain, name)) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(entry, dict) or entry.get('version') != METADATA_CACHE_VERSION:
+        return None
+
+    with _metadata_cache_lock:
+        _metadata_cache.setdefault((chain, name), entry)
+
+    return entry
+
+
+def store_metadata(chain: str, name: str, data, block_number: int = None):
+    """
+    Store metadata in the memory and on disk caches
+
+    Parameters
+    ----------
+    chain : str
+        arbitrum or avalanche.
+    name : str
+        name of the metadata, eg markets or tokens.
+    data : dict
+        json serialisable data to cache.
+    block_number : int, optional
+        block the data is known to be valid at. The default is None.
+
+    Returns
+    -------
+    dict
+        a copy of data.
+
+    """
+    entry = {
+        'version': METADATA_CACHE_VERSION,
+        'fetched_at': time.time(),
+        'block_number': block_number,
+        'data': data
+    }
+
+    with _metadata_cache_lock:
+        _metadata_cache[(chain, name)] = entry
+
+    # write to a temporary file first so readers never see a half written cache
+    filepath = _get_metadata_cache_path(chain, name)
+    temporary_filepath = "{}.{}.tmp".format(filepath, threading.get_ident())
+    try:
+        os.makedirs(metadata_cache_dir, exist_ok=True)
+        with open(temporary_filepath, 'w') as f:
+            json.dump(entry, f)
+        os.replace(temporary_filepath, filepath)
+    except OSError as e:
+        logging.warning("Could not write {} cache to disk: {}".format(name, e))
+
+    return copy.deepcopy(data)
+
+
+def invalidate_metadata_cache(chain: str = None, name: str = None):
+    """
+    Drop cached metadata from memory and disk so the next read fetches it again
+
+    Parameters
+    ----------
+    chain : str, optional
+        only drop entries for this chain. The default is None, which drops all chains.
+    name : str, optional
+        only drop entries with this name. The default is None, which drops all names.
+
+    """
+    with _metadata_cache_lock:
+        keys = [
+            key for key in _metadata_cache
+            if (chain is None or key[0] == chain) and (name is None or key[1] == name)
+        ]
+        for key in keys:
+            del _metadata_cache[key]
+
+    if not os.path.isdir(metadata_cache_dir):
+        return
+
+    for filename in os.listdir(metadata_cache_dir):
+        if not filename.endswith(".json"):
+            continue
+
+        file_chain, file_name = filename[:-len(".json")].split("_", 1)
+        if (chain is None or file_chain == chain) and (name is None or file_name == name):
+            os.remove(os.path.join(metadata_cache_dir, filename))
+
+
+def _refresh_metadata(chain: str, name: str, loader, revalidator):
+    """
+    Revalidate or reload a cached metadata entry, keeping the stale entry if that fails
+    """
+    try:
+        entry = _get_metadata_entry(chain, name)
+
+        if entry is not None and revalidator is not None:
+            revalidated = revalidator(entry)
+            if revalidated is not None:
+                data, block_number = revalidated
+                store_metadata(chain, name, data, block_number)
+                return
+
+        data, block_number = loader()
+        store_metadata(chain, name, data, block_number)
+
+    except Exception as e:
+        logging.warning(
+            "Refreshing cached {} for {} failed, serving stale data: {}".format(name, chain, e)
         )
+
+    finally:
+        with _metadata_cache_lock:
+            _metadata_refreshes.discard((chain, name))
+
+
+def _schedule_metadata_refresh(chain: str, name: str, loader, revalidator):
+    """
+    Refresh a stale metadata entry on the shared executor, once at a time per entry
+    """
+    with _metadata_cache_lock:
+        if (chain, name) in _metadata_refreshes:
+            return
+        _metadata_refreshes.add((chain, name))
+
+    get_executor().submit(_refresh_metadata, chain, name, loader, revalidator)
+
+
+def get_cached_metadata(
+    chain: str,
+    name: str,
+    loader,
+    revalidator=None,
+    ttl: float = METADATA_CACHE_TTL
+):
+    """
+    Get metadata which rarely changes, such as markets and tokens, from the memory or on disk
+    cache. Entries older than ttl are still served, but revalidated in the background
+    (stale-while-revalidate). Only a missing entry is loaded before returning.
+
+    Parameters
+    ----------
+    chain : str
+        arbitrum or avalanche.
+    name : str
+        name of the metadata, eg markets or tokens.
+    loader : callable
+        function returning (data, block_number) with freshly fetched data.
+    revalidator : callable, optional
+        function taking a stale entry and returning (data, block_number) with the entry's data
+        brought up to date, or None if it needs reloading. The default is None, which always
+        reloads.
+    ttl : float, optional
+        seconds an entry is served before it is revalidated. The default is METADATA_CACHE_TTL.
+
+    Returns
+    -------
+    data
+        a copy of the cached data.
+
+    """
+    entry = _get_metadata_entry(chain, name)
+
+    if entry is None:
+        data, block_number = loader()
+        return store_metadata(chain, name, data, block_number)
+
+    if time.time() - entry['fetched_at'] >= ttl:
+        _schedule_metadata_refresh(chain, name, loader, revalidator)
+
+    return copy.deepcopy(entry['data'])
+
+
+async def aget_cached_metadata(
+    chain: str,
+    name: str,
+    async_loader,
+    loader,
+    revalidator=None,
+    ttl: float = METADATA_CACHE_TTL
+):
+    """
+    Async version of get_cached_metadata, a missing entry is loaded with async_loader while stale
+    entries are revalidated with loader on the shared executor
+    """
+    entry = _get_metadata_entry(chain, name)
+
+    if entry is None:
+        data, block_number = await async_loader()
+        return store_metadata(chain, name, data, block_number)
+
+    if time.time() - entry['fetched_at'] >= ttl:
+        _schedule_metadata_refresh(chain, name, loader, revalidator)
+
+    return copy.deepcopy(entry['data'])
+
+
+def _load_tokens_address_dict(chain: str):
+
+    return fetch_tokens_address_dict(chain), None
+
+
+async def _aload_tokens_address_dict(chain: str):
+
+    return await afetch_tokens_address_dict(chain), None
+
+
+def get_tokens_address_dict(chain: str, use_cache: bool = True):
+    """
+    Get the dictionary of tokens available on v2, from the metadata cache unless use_cache is
+    False
+
+    Parameters
+    ----------
+    chain : str
+        avalanche of arbitrum.
+    use_cache : bool, optional
+        pass False to always query the GMX infra api. The default is True.
+
+    Returns
+    -------
+    token_address_dict : dict
+        dictionary containing available tokens to trade on GMX.
+
+    """
+    if not use_cache:
+        return fetch_tokens_address_dict(chain)
+
+    return get_cached_metadata(
+        chain,
+        "tokens",
+        lambda: _load_tokens_address_dict(chain)
     )
-    return web3_obj.eth.contract(
-        address=contract_address,
-        abi=contract_abi
+
+
+async def aget_tokens_address_dict(chain: str, use_cache: bool = True):
+    """
+    Async version of get_tokens_address_dict
+
+    Parameters
+    ----------
+    chain : str
+        avalanche of arbitrum.
+    use_cache : bool, optional
+        pass False to always query the GMX infra api. The default is True.
+
+    Returns
+    -------
+    token_address_dict : dict
+        dictionary containing available tokens to trade on GMX.
+
+    """
+    if not use_cache:
+        return await afetch_tokens_address_dict(chain)
+
+    return await aget_cached_metadata(
+        chain,
+        "tokens",
+        lambda: _aload_tokens_address_dict(chain),
+        lambda: _load_tokens_address_dict(chain)
     )
 
 
-def get_tokens_address_dict(chain: str):
+def fetch_tokens_address_dict(chain: str):
     """
     Query the GMX infra api for to generate dictionary of tokens available on v2
 
@@ -328,13 +1845,8 @@ def get_tokens_address_dict(chain: str):
 
     """
 
-    url = {
-        "arbitrum": "https://arbitrum-api.gmxinfra.io/tokens",
-        "avalanche": "https://avalanche-api.gmxinfra.io/tokens"
-    }
-
     try:
-        response = requests.get(url[chain])
+        response = requests.get(token_api_url[chain])
 
         # Check if the request was successful (status code 200)
         if response.status_code == 200:
@@ -346,12 +1858,30 @@ def get_tokens_address_dict(chain: str):
     except requests.RequestException as e:
         print(f"Error: {e}")
 
-    token_address_dict = {}
+    return _process_token_infos(token_infos)
 
-    for token_info in token_infos:
-        token_address_dict[token_info['address']] = token_info
 
-    return token_address_dict
+async def afetch_tokens_address_dict(chain: str):
+    """
+    Async version of fetch_tokens_address_dict
+
+    Parameters
+    ----------
+    chain : str
+        avalanche of arbitrum.
+
+    Returns
+    -------
+    token_address_dict : dict
+        dictionary containing available tokens to trade on GMX.
+
+    """
+    async with aiohttp.ClientSession() as session:
+        async with session.get(token_api_url[chain]) as response:
+            response.raise_for_status()
+            token_infos = (await response.json())['tokens']
+
+    return _process_token_infos(token_infos)
 
 
 def get_reader_contract(chain: str):
@@ -364,9 +1894,7 @@ def get_reader_contract(chain: str):
         avalanche or arbitrum.
 
     """
-    rpc = get_config()[chain]['rpc']
-
-    web3_obj = create_connection(rpc)
+    web3_obj = create_connection(chain=chain)
     return get_contract_object(
         web3_obj,
         'syntheticsreader',
@@ -384,9 +1912,7 @@ def get_event_emitter_contract(chain: str):
         avalanche or arbitrum.
 
     """
-    rpc = get_config()[chain]['rpc']
-
-    web3_obj = create_connection(rpc)
+    web3_obj = create_connection(chain=chain)
     return get_contract_object(
         web3_obj,
         'eventemitter',
@@ -404,9 +1930,7 @@ def get_datastore_contract(chain: str):
         avalanche or arbitrum.
 
     """
-    rpc = get_config()[chain]['rpc']
-
-    web3_obj = create_connection(rpc)
+    web3_obj = create_connection(chain=chain)
     return get_contract_object(
         web3_obj,
         'datastore',
@@ -424,9 +1948,7 @@ def get_exchange_router_contract(chain: str):
         avalanche or arbitrum.
 
     """
-    rpc = get_config()[chain]['rpc']
-
-    web3_obj = create_connection(rpc)
+    web3_obj = create_connection(chain=chain)
     return get_contract_object(
         web3_obj,
         'exchangerouter',
@@ -444,11 +1966,8 @@ def create_signer(chain: str):
         avalanche or arbitrum.
 
     """
-    config = get_config()
-
-    private_key = config['private_key']
-    rpc = config[chain]['rpc']
-    web3_obj = create_connection(rpc)
+    private_key = get_config()['private_key']
+    web3_obj = create_connection(chain=chain)
 
     return web3_obj.eth.account.from_key(private_key)
 
@@ -694,9 +2213,14 @@ def make_timestamped_dataframe(data):
     return dataframe
 
 
+_csv_datastore_lock = threading.Lock()
+
+
 def save_csv_to_datastore(filename: str, dataframe):
     """
-    For a given filename, save pandas dataframe as a csv to datastore
+    For a given filename, append pandas dataframe to a csv in the datastore. Only the header of
+    an existing csv is read, the file is only rewritten when the dataframe adds new columns, eg
+    when a market is added.
 
     Parameters
     ----------
@@ -713,23 +2237,34 @@ def save_csv_to_datastore(filename: str, dataframe):
         filename
     )
 
-    if os.path.exists(archive_filepath):
-        archive = pd.read_csv(
-            archive_filepath
-        )
+    with _csv_datastore_lock:
 
-        dataframe = pd.concat(
-            [archive, dataframe]
-        )
+        if not os.path.exists(archive_filepath) or os.path.getsize(archive_filepath) == 0:
+            dataframe.to_csv(archive_filepath, index=False)
+            return
 
-    dataframe.to_csv(
-        os.path.join(
-            base_dir,
-            "data_store",
-            filename
-        ),
-        index=False
-    )
+        archive_columns = list(pd.read_csv(archive_filepath, nrows=0).columns)
+        new_columns = [column for column in dataframe.columns if column not in archive_columns]
+
+        if new_columns:
+            archive = pd.read_csv(
+                archive_filepath
+            )
+
+            dataframe = pd.concat(
+                [archive, dataframe]
+            )
+
+            dataframe.to_csv(archive_filepath, index=False)
+            return
+
+        # columns missing from the new rows are written empty, in the order of the archive
+        dataframe.reindex(columns=archive_columns).to_csv(
+            archive_filepath,
+            mode='a',
+            header=False,
+            index=False
+        )
 
 
 def determine_swap_route(markets: dict, in_token: str, out_token: str):
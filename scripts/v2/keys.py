@@ -6,14 +6,22 @@ Created on Thu Aug 10 21:22:09 2023
 @author: snipermonke01
 """
 
+import threading
+
+from functools import lru_cache
+
 from .gmx_utils import create_hash_string, create_hash, get_datastore_contract
 
+# Most keys kept per key function, enough for every market and token side on both chains
+KEY_CACHE_SIZE = 4096
+
 ACCOUNT_POSITION_LIST = create_hash_string("ACCOUNT_POSITION_LIST")
 CLAIMABLE_FEE_AMOUNT = create_hash_string("CLAIMABLE_FEE_AMOUNT")
 DECREASE_ORDER_GAS_LIMIT = create_hash_string("DECREASE_ORDER_GAS_LIMIT")
 EXECUTION_GAS_FEE_BASE_AMOUNT = create_hash_string("EXECUTION_GAS_FEE_BASE_AMOUNT")
 EXECUTION_GAS_FEE_MULTIPLIER_FACTOR = create_hash_string("EXECUTION_GAS_FEE_MULTIPLIER_FACTOR")
 INCREASE_ORDER_GAS_LIMIT = create_hash_string("INCREASE_ORDER_GAS_LIMIT")
+MARKET_LIST = create_hash_string("MARKET_LIST")
 MAX_OPEN_INTEREST = create_hash_string("MAX_OPEN_INTEREST")
 MAX_PNL_FACTOR_FOR_TRADERS = create_hash_string("MAX_PNL_FACTOR_FOR_TRADERS")
 MAX_PNL_FACTOR_FOR_DEPOSITS = create_hash_string("MAX_PNL_FACTOR_FOR_DEPOSITS")
@@ -31,6 +39,7 @@ SWAP_ORDER_GAS_LIMIT = create_hash_string("SWAP_ORDER_GAS_LIMIT")
 VIRTUAL_TOKEN_ID = create_hash_string("VIRTUAL_TOKEN_ID")
 
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def accountPositionListKey(account):
     return create_hash(
         ["bytes32", "address"],
@@ -38,6 +47,7 @@ def accountPositionListKey(account):
     )
 
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def claimable_fee_amount_key(market: str, token: str):
     return create_hash(
         ["bytes32", "address", "address"],
@@ -65,6 +75,11 @@ def min_additional_gas_for_execution_key():
     return MIN_ADDITIONAL_GAS_FOR_EXECUTION
 
 
+def market_list_key():
+    return MARKET_LIST
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def max_open_interest_key(market: str,
                           is_long: bool):
 
@@ -74,6 +89,7 @@ def max_open_interest_key(market: str,
     )
 
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def open_interest_in_tokens_key(
     market: str,
     collateral_token: str,
@@ -85,6 +101,7 @@ def open_interest_in_tokens_key(
     )
 
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def open_interest_key(
     market: str,
     collateral_token: str,
@@ -96,6 +113,7 @@ def open_interest_key(
     )
 
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def open_interest_reserve_factor_key(
     market: str,
     is_long: bool
@@ -106,6 +124,7 @@ def open_interest_reserve_factor_key(
     )
 
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def pool_amount_key(
     market: str,
     token: str
@@ -116,6 +135,7 @@ def pool_amount_key(
     )
 
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def reserve_factor_key(
     market: str,
     is_long: bool
@@ -134,10 +154,128 @@ def swap_order_gas_limit_key():
     return SWAP_ORDER_GAS_LIMIT
 
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def virtualTokenIdKey(token: str):
     return create_hash(["bytes32", "address"], [VIRTUAL_TOKEN_ID, token])
 
 
+class MarketKeyIndex:
+    """
+    Precomputed datastore keys for every market in a market set, stored as a table of
+    (market, key name, key) rows. Key names describe the side they are for, eg
+    pool_amount_long or open_interest_short_collateral_long.
+    """
+
+    def __init__(self, markets: dict):
+
+        self.rows = []
+        self._keys = {}
+
+        for market_key in markets:
+            long_token_address = markets[market_key]['long_token_address']
+            short_token_address = markets[market_key]['short_token_address']
+
+            for name, key in self._get_market_keys(
+                market_key, long_token_address, short_token_address
+            ):
+                self.rows.append((market_key, name, key))
+                self._keys[(market_key, name)] = key
+
+    def _get_market_keys(
+        self, market_key: str, long_token_address: str, short_token_address: str
+    ):
+        sides = (("long", True, long_token_address), ("short", False, short_token_address))
+
+        for side, is_long, token_address in sides:
+            yield "pool_amount_{}".format(side), pool_amount_key(market_key, token_address)
+            yield "claimable_fee_amount_{}".format(side), claimable_fee_amount_key(
+                market_key, token_address
+            )
+            yield "reserve_factor_{}".format(side), reserve_factor_key(market_key, is_long)
+            yield "open_interest_reserve_factor_{}".format(side), \
+                open_interest_reserve_factor_key(market_key, is_long)
+            yield "max_open_interest_{}".format(side), max_open_interest_key(market_key, is_long)
+
+            for collateral_side, collateral_token_address in (
+                ("long", long_token_address), ("short", short_token_address)
+            ):
+                yield "open_interest_{}_collateral_{}".format(side, collateral_side), \
+                    open_interest_key(market_key, collateral_token_address, is_long)
+                yield "open_interest_in_tokens_{}_collateral_{}".format(side, collateral_side), \
+                    open_interest_in_tokens_key(market_key, collateral_token_address, is_long)
+
+    def get(self, market_key: str, name: str):
+        """
+        Get the precomputed key with a given name for a market
+
+        Parameters
+        ----------
+        market_key : str
+            address of the GMX market.
+        name : str
+            key name, eg pool_amount_long.
+
+        Returns
+        -------
+        bytes
+            hashed datastore key.
+
+        """
+        return self._keys[(market_key, name)]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+# Key index of the market set last seen on each chain, keyed by chain
+_market_key_indexes = {}
+_market_key_indexes_lock = threading.Lock()
+
+
+def get_market_key_index(chain: str, markets: dict):
+    """
+    Get the key index for the markets of a chain, rebuilt only when the market set of the chain
+    changes
+
+    Parameters
+    ----------
+    chain : str
+        arbitrum or avalanche.
+    markets : dict
+        dictionary of available markets, as output by GetMarkets.
+
+    Returns
+    -------
+    MarketKeyIndex
+        precomputed keys for every market.
+
+    """
+    index_key = tuple(
+        (
+            market_key,
+            markets[market_key]['long_token_address'],
+            markets[market_key]['short_token_address']
+        )
+        for market_key in markets
+    )
+
+    with _market_key_indexes_lock:
+        cached = _market_key_indexes.get(chain)
+        if cached is not None and cached[0] == index_key:
+            return cached[1]
+
+    # build outside the lock, hashing every key of a market set takes a while
+    key_index = MarketKeyIndex(markets)
+
+    with _market_key_indexes_lock:
+        _market_key_indexes[chain] = (index_key, key_index)
+
+    return key_index
+
+
 if __name__ == "__main__":
     # market = '0x70d95587d40A2caf56bd97485aB3Eec10Bee6336'
     # token = '0x82aF49447D8a07e3bd95BD0d56f35241523fBab1'
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 18:12:40 2026
+
+@author: snipermonke01
+"""
+
+import numpy as np
+import pandas as pd
+
+# USD values and factors on GMX are expanded to 30 decimals
+PRECISION = 10**30
+
+
+def to_column(values: list, exact: bool = False):
+    """
+    Load a list of raw contract outputs into a numpy array. Failed reads (None) become nan, or
+    stay None in exact mode.
+
+    Parameters
+    ----------
+    values : list
+        raw contract outputs.
+    exact : bool, optional
+        keep the values as python ints in an object array, so nothing is rounded to a float. The
+        default is False.
+
+    Returns
+    -------
+    np.ndarray
+        column of values.
+
+    """
+    if exact:
+        return np.array(
+            [None if value is None else int(value) for value in values], dtype=object
+        )
+
+    return np.array(
+        [np.nan if value is None else float(value) for value in values], dtype=float
+    )
+
+
+def _apply(function, columns: list, exact: bool):
+    """
+    Apply function to the columns. In exact mode rows with a None in any column are left None,
+    as python ints can not carry nan through the math.
+    """
+    if not exact:
+        return function(*columns)
+
+    columns = np.broadcast_arrays(*columns)
+    valid = np.ones(columns[0].shape, dtype=bool)
+    for column in columns:
+        valid &= np.array([value is not None for value in column.flat]).reshape(column.shape)
+
+    output = np.full(columns[0].shape, None, dtype=object)
+    if valid.any():
+        output[valid] = function(*[column[valid] for column in columns])
+
+    return output
+
+
+def compute_open_interest(
+    open_interest_with_pnl, pnl, precision, exact: bool = False
+):
+    """
+    Open interest of every market at once, from the reader getOpenInterestWithPnl and getPnl
+    outputs
+
+    Parameters
+    ----------
+    open_interest_with_pnl : np.ndarray
+        raw open interest with pnl per market.
+    pnl : np.ndarray
+        raw pnl per market.
+    precision : np.ndarray or int
+        precision to divide the raw open interest by, per market.
+    exact : bool, optional
+        return ints expanded to 30 decimals instead of float USD. The default is False.
+
+    Returns
+    -------
+    np.ndarray
+        open interest per market.
+
+    """
+    if exact:
+        return _apply(
+            lambda oi, pnl, precision: (oi - pnl) * PRECISION // precision,
+            [open_interest_with_pnl, pnl, np.asarray(precision, dtype=object)],
+            exact
+        )
+
+    return (open_interest_with_pnl - pnl) / np.asarray(precision, dtype=float)
+
+
+def compute_max_reserved_usd(
+    pool_amount,
+    reserve_factor,
+    open_interest_reserve_factor,
+    token_price,
+    exact: bool = False
+):
+    """
+    Maximum USD value that can be reserved from one side of every pool at once, capped by the
+    lesser of the reserve factor and the open interest reserve factor
+
+    token_price can be a 2d array of shape (scenarios, markets) to evaluate a grid of price
+    scenarios in one go.
+
+    Parameters
+    ----------
+    pool_amount : np.ndarray
+        raw pool amount per market.
+    reserve_factor : np.ndarray
+        raw reserve factor per market.
+    open_interest_reserve_factor : np.ndarray
+        raw open interest reserve factor per market.
+    token_price : np.ndarray
+        raw oracle price of the pool token per market, ie USD expanded to 30 - token decimals.
+    exact : bool, optional
+        return ints expanded to 30 decimals instead of float USD. The default is False.
+
+    Returns
+    -------
+    np.ndarray
+        max reserved USD per market.
+
+    """
+    def max_reserved_usd(pool_amount, reserve_factor, open_interest_reserve_factor, token_price):
+
+        reserve_factor = np.minimum(reserve_factor, open_interest_reserve_factor)
+
+        if exact:
+            return pool_amount * reserve_factor * token_price // PRECISION
+
+        return pool_amount * reserve_factor / PRECISION * token_price / PRECISION
+
+    return _apply(
+        max_reserved_usd,
+        [pool_amount, reserve_factor, open_interest_reserve_factor, token_price],
+        exact
+    )
+
+
+def compute_funding_factor_per_period(
+    funding_factor_per_second,
+    is_long_pays_short,
+    long_interest_usd,
+    short_interest_usd,
+    period_in_seconds: int = 3600,
+    exact: bool = False
+):
+    """
+    Vectorised get_funding_factor_per_period for both sides of every market at once
+
+    Parameters
+    ----------
+    funding_factor_per_second : np.ndarray
+        raw funding factor per second per market.
+    is_long_pays_short : np.ndarray
+        True where longs pay shorts.
+    long_interest_usd : np.ndarray
+        long open interest per market, in any USD scale.
+    short_interest_usd : np.ndarray
+        short open interest per market, in the same scale as long_interest_usd.
+    period_in_seconds : int, optional
+        period to get the rate for. The default is 3600.
+    exact : bool, optional
+        return the funding factor as ints expanded to 30 decimals instead of a float
+        percentage. The default is False.
+
+    Returns
+    -------
+    long_funding : np.ndarray
+        funding rate of longs per market.
+    short_funding : np.ndarray
+        funding rate of shorts per market.
+
+    """
+    def funding_factor(
+        funding_factor_per_second, is_long_pays_short, long_interest_usd, short_interest_usd
+    ):
+        is_long_pays_short = is_long_pays_short.astype(bool)
+
+        if exact:
+            # the smaller side receives the funding paid by the larger side, pro rata
+            long_ratio = np.where(
+                short_interest_usd > 0,
+                long_interest_usd * PRECISION // np.where(
+                    short_interest_usd > 0, short_interest_usd, 1
+                ),
+                0
+            )
+            short_ratio = np.where(
+                long_interest_usd > 0,
+                short_interest_usd * PRECISION // np.where(
+                    long_interest_usd > 0, long_interest_usd, 1
+                ),
+                0
+            )
+            long_received = short_ratio * funding_factor_per_second // PRECISION
+            short_received = long_ratio * funding_factor_per_second // PRECISION
+
+        else:
+            # funding factor per second as a percentage
+            funding_factor_per_second = funding_factor_per_second * 10**-28
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                long_ratio = np.where(
+                    short_interest_usd > 0, long_interest_usd / short_interest_usd, 0
+                )
+                short_ratio = np.where(
+                    long_interest_usd > 0, short_interest_usd / long_interest_usd, 0
+                )
+            long_received = short_ratio * funding_factor_per_second
+            short_received = long_ratio * funding_factor_per_second
+
+        long_funding = np.where(
+            is_long_pays_short, funding_factor_per_second * -1, long_received
+        )
+        short_funding = np.where(
+            is_long_pays_short, short_received, funding_factor_per_second * -1
+        )
+
+        return np.stack([long_funding, short_funding]) * period_in_seconds
+
+    columns = [
+        funding_factor_per_second, is_long_pays_short, long_interest_usd, short_interest_usd
+    ]
+    if exact:
+        long_funding = _apply(
+            lambda *columns: funding_factor(*columns)[0], columns, exact
+        )
+        short_funding = _apply(
+            lambda *columns: funding_factor(*columns)[1], columns, exact
+        )
+        return long_funding, short_funding
+
+    long_funding, short_funding = funding_factor(*columns)
+
+    # a failed read on either side leaves the funding of both sides unknown
+    failed = np.isnan(
+        funding_factor_per_second + long_interest_usd + short_interest_usd
+    ) | np.isnan(is_long_pays_short)
+
+    return np.where(failed, np.nan, long_funding), np.where(failed, np.nan, short_funding)
+
+
+def _map_outputs(records: list, outputs: list, symbols: list):
+    """
+    Reorder raw outputs of the market records into the order of symbols, None where missing
+    """
+    outputs_by_symbol = {
+        record.market_symbol: output for record, output in zip(records, outputs)
+    }
+
+    return [outputs_by_symbol.get(symbol) for symbol in symbols]
+
+
+def get_market_columns(snapshot, exact: bool = False):
+    """
+    Load the raw contract outputs and token data of a refreshed MarketSnapshot into one numpy
+    column per value, one row per market
+
+    Parameters
+    ----------
+    snapshot : MarketSnapshot
+        refreshed snapshot to load.
+    exact : bool, optional
+        keep the raw values as python ints. The default is False.
+
+    Returns
+    -------
+    columns : dict
+        numpy column per value, with the market symbols of each row.
+
+    """
+    open_interest_queries, open_interest_outputs = snapshot.get_raw_outputs('open_interest')
+    liquidity_queries, liquidity_outputs = snapshot.get_raw_outputs('available_liquidity')
+    funding_queries, funding_outputs = snapshot.get_raw_outputs('funding_apr')
+
+    symbols = [record.market_symbol for record in open_interest_queries['records']]
+
+    # raw oracle price of the long token of each market, the midpoint of the min and max price
+    long_token_prices = {}
+    for market in snapshot.markets.values():
+        prices = snapshot.oracle_prices.get(market['long_token_address'])
+        if prices is not None:
+            long_token_prices[market['market_symbol']] = (
+                int(prices['minPriceFull']) + int(prices['maxPriceFull'])
+            ) // 2
+
+    # short side pools are treated as $1 stables, as in GetAvailableLiquidity
+    short_token_prices = {
+        market['market_symbol']: 10**(30 - market['short_token_metadata']['decimals'])
+        for market in snapshot.markets.values()
+        if 'decimals' in market['short_token_metadata']
+    }
+
+    long_pool_amount, short_pool_amount, long_reserve_factor, short_reserve_factor, \
+        long_open_interest_reserve_factor, short_open_interest_reserve_factor = [
+            _map_outputs(liquidity_queries['records'], output, symbols)
+            for output in liquidity_outputs
+        ]
+
+    market_info = _map_outputs(funding_queries['records'], funding_outputs, symbols)
+
+    columns = {
+        'market_symbol': np.array(symbols, dtype=object),
+        'long_open_interest_precision': np.array(
+            [record.long_precision for record in open_interest_queries['records']], dtype=object
+        ),
+        'long_token_price': to_column(
+            [long_token_prices.get(symbol) for symbol in symbols], exact
+        ),
+        'short_token_price': to_column(
+            [short_token_prices.get(symbol) for symbol in symbols], exact
+        ),
+        'long_pool_amount': to_column(long_pool_amount, exact),
+        'short_pool_amount': to_column(short_pool_amount, exact),
+        'long_reserve_factor': to_column(long_reserve_factor, exact),
+        'short_reserve_factor': to_column(short_reserve_factor, exact),
+        'long_open_interest_reserve_factor': to_column(long_open_interest_reserve_factor, exact),
+        'short_open_interest_reserve_factor': to_column(
+            short_open_interest_reserve_factor, exact
+        ),
+        'is_long_pays_short': to_column(
+            [None if output is None else output[4][0] for output in market_info], exact
+        ),
+        'funding_factor_per_second': to_column(
+            [None if output is None else output[4][1] for output in market_info], exact
+        )
+    }
+
+    for name, output in zip(
+        ['long_open_interest_with_pnl', 'short_open_interest_with_pnl', 'long_pnl', 'short_pnl'],
+        open_interest_outputs
+    ):
+        columns[name] = to_column(output, exact)
+
+    return columns
+
+
+def compute_market_frame(columns: dict, exact: bool = False, period_in_seconds: int = 3600):
+    """
+    Compute open interest, reserve caps, available liquidity and funding rates for every market
+    at once
+
+    Parameters
+    ----------
+    columns : dict
+        numpy columns, as output by get_market_columns.
+    exact : bool, optional
+        compute with python ints and return USD values and funding factors expanded to 30
+        decimals. The default is False, which returns float USD values and funding rates as a
+        percentage.
+    period_in_seconds : int, optional
+        period to get the funding rates for. The default is 3600.
+
+    Returns
+    -------
+    pd.DataFrame
+        market stats indexed by market symbol.
+
+    """
+    long_open_interest = compute_open_interest(
+        columns['long_open_interest_with_pnl'],
+        columns['long_pnl'],
+        columns['long_open_interest_precision'],
+        exact
+    )
+    short_open_interest = compute_open_interest(
+        columns['short_open_interest_with_pnl'],
+        columns['short_pnl'],
+        PRECISION,
+        exact
+    )
+
+    long_max_reserved_usd = compute_max_reserved_usd(
+        columns['long_pool_amount'],
+        columns['long_reserve_factor'],
+        columns['long_open_interest_reserve_factor'],
+        columns['long_token_price'],
+        exact
+    )
+    short_max_reserved_usd = compute_max_reserved_usd(
+        columns['short_pool_amount'],
+        columns['short_reserve_factor'],
+        columns['short_open_interest_reserve_factor'],
+        columns['short_token_price'],
+        exact
+    )
+
+    long_funding, short_funding = compute_funding_factor_per_period(
+        columns['funding_factor_per_second'],
+        columns['is_long_pays_short'],
+        long_open_interest,
+        short_open_interest,
+        period_in_seconds,
+        exact
+    )
+
+    return pd.DataFrame(
+        {
+            'long_open_interest': long_open_interest,
+            'short_open_interest': short_open_interest,
+            'long_max_reserved_usd': long_max_reserved_usd,
+            'short_max_reserved_usd': short_max_reserved_usd,
+            'long_available_liquidity': _apply(
+                np.subtract, [long_max_reserved_usd, long_open_interest], exact
+            ),
+            'short_available_liquidity': _apply(
+                np.subtract, [short_max_reserved_usd, short_open_interest], exact
+            ),
+            'long_funding_rate': long_funding,
+            'short_funding_rate': short_funding
+        },
+        index=pd.Index(columns['market_symbol'], name='market_symbol')
+    )
+
+
+if __name__ == "__main__":
+
+    from .market_snapshot import MarketSnapshot
+
+    snapshot = MarketSnapshot(chain="arbitrum").refresh()
+    market_frame = compute_market_frame(get_market_columns(snapshot))
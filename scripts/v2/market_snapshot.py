@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 14:02:18 2026
+
+@author: snipermonke01
+"""
+
+import asyncio
+
+from .get_available_liquidity import GetAvailableLiquidity
+from .get_borrow_apr import GetBorrowAPR
+from .get_claimable_fees import GetClaimableFees
+from .get_funding_apr import GetFundingFee
+from .get_gm_prices import GMPrices
+from .get_markets import GetMarkets
+from .get_open_interest import OpenInterest
+from .get_oracle_prices import GetOraclePrices
+from .get_pool_tvl import GetPoolTVL
+from .gmx_utils import create_connection, create_async_connection
+from .keys import MAX_PNL_FACTOR_FOR_TRADERS
+from .market_columns import get_market_columns, compute_market_frame
+from .multicall import execute_multicall_groups, async_execute_multicall_groups
+
+# metrics whose queries hold a list of call groups rather than a flat list of calls
+GROUPED_METRICS = {'open_interest', 'available_liquidity', 'claimable_fees', 'pool_tvl'}
+
+# metrics a snapshot can read
+SNAPSHOT_METRICS = (
+    'open_interest',
+    'borrow_apr',
+    'gm_prices',
+    'claimable_fees',
+    'pool_tvl',
+    'funding_apr',
+    'available_liquidity'
+)
+
+# metrics whose queries are built from open interest, read in a second multicall round
+SECOND_ROUND_METRICS = {'funding_apr', 'available_liquidity'}
+
+
+class MarketSnapshot:
+    """
+    Reads markets, token metadata, oracle prices and every datastore/reader value the stats
+    classes need once, pinned to one block, and derives each metric from that single read so all
+    metrics are consistent with each other.
+
+    Funding and liquidity need open interest to build their queries, so the contract reads are
+    made in two multicall rounds, both at the pinned block. A refresh can be limited to some of
+    the metrics, the others are then not available until the next full refresh.
+    """
+
+    def __init__(self, chain: str):
+
+        self.chain = chain
+        self.block_number = None
+        self.markets = None
+        self.oracle_prices = None
+
+        self._open_interest = OpenInterest(chain=chain)
+        self._borrow_apr = GetBorrowAPR(chain=chain)
+        self._funding_apr = GetFundingFee(chain=chain)
+        self._gm_prices = GMPrices(chain=chain)
+        self._available_liquidity = GetAvailableLiquidity(chain=chain)
+        self._claimable_fees = GetClaimableFees(chain=chain)
+        self._pool_tvl = GetPoolTVL(chain=chain)
+
+        self._queries = {}
+        self._outputs = {}
+        self._views = {}
+
+    def refresh(self, block_identifier: int = None, metrics: list = None):
+        """
+        Read a new snapshot of the chain
+
+        Parameters
+        ----------
+        block_identifier : int, optional
+            block to read at. The default is None, which uses the latest block.
+        metrics : list, optional
+            metrics to read, from SNAPSHOT_METRICS. Open interest is read too when funding or
+            available liquidity is asked for. The default is None, which reads every metric.
+
+        Returns
+        -------
+        MarketSnapshot
+            the refreshed snapshot.
+
+        """
+        metrics = self._get_metrics(metrics)
+
+        markets = GetMarkets(chain=self.chain).get_available_markets()
+        oracle_prices = GetOraclePrices(chain=self.chain).get_recent_prices()
+
+        if block_identifier is None:
+            block_identifier = create_connection(chain=self.chain).eth.block_number
+
+        self._reset(markets, oracle_prices, block_identifier)
+
+        queries = self._build_first_round_queries(metrics)
+        self._store_outputs(
+            queries,
+            execute_multicall_groups(
+                *self._get_call_groups(queries), block_identifier=self.block_number
+            )
+        )
+
+        if metrics & SECOND_ROUND_METRICS:
+            queries = self._build_second_round_queries(metrics)
+            self._store_outputs(
+                queries,
+                execute_multicall_groups(
+                    *self._get_call_groups(queries), block_identifier=self.block_number
+                )
+            )
+
+        return self
+
+    async def arefresh(self, block_identifier: int = None, metrics: list = None):
+        """
+        Async version of refresh, markets, prices and the block number are fetched concurrently
+
+        Parameters
+        ----------
+        block_identifier : int, optional
+            block to read at. The default is None, which uses the latest block.
+        metrics : list, optional
+            metrics to read, from SNAPSHOT_METRICS. The default is None, which reads every
+            metric.
+
+        Returns
+        -------
+        MarketSnapshot
+            the refreshed snapshot.
+
+        """
+        metrics = self._get_metrics(metrics)
+        async_web3_obj = create_async_connection(chain=self.chain)
+
+        if block_identifier is None:
+            markets, oracle_prices, block_identifier = await asyncio.gather(
+                GetMarkets(chain=self.chain).aget_available_markets(),
+                GetOraclePrices(chain=self.chain).aget_recent_prices(),
+                async_web3_obj.eth.block_number
+            )
+        else:
+            markets, oracle_prices = await asyncio.gather(
+                GetMarkets(chain=self.chain).aget_available_markets(),
+                GetOraclePrices(chain=self.chain).aget_recent_prices()
+            )
+
+        self._reset(markets, oracle_prices, block_identifier)
+
+        queries = self._build_first_round_queries(metrics)
+        self._store_outputs(
+            queries,
+            await async_execute_multicall_groups(
+                async_web3_obj,
+                *self._get_call_groups(queries),
+                block_identifier=self.block_number
+            )
+        )
+
+        if metrics & SECOND_ROUND_METRICS:
+            queries = self._build_second_round_queries(metrics)
+            self._store_outputs(
+                queries,
+                await async_execute_multicall_groups(
+                    async_web3_obj,
+                    *self._get_call_groups(queries),
+                    block_identifier=self.block_number
+                )
+            )
+
+        return self
+
+    def _reset(self, markets: dict, oracle_prices: dict, block_identifier: int):
+        self.markets = markets
+        self.oracle_prices = oracle_prices
+        self.block_number = block_identifier
+        self._queries = {}
+        self._outputs = {}
+        self._views = {}
+
+    def _get_metrics(self, metrics: list):
+        """
+        Metrics to read in a refresh, with open interest added when a second round metric needs
+        it
+        """
+        if metrics is None:
+            return set(SNAPSHOT_METRICS)
+
+        for metric in metrics:
+            if metric not in SNAPSHOT_METRICS:
+                raise Exception('Unknown snapshot metric "{}"!'.format(metric))
+
+        metrics = set(metrics)
+        if metrics & SECOND_ROUND_METRICS:
+            metrics.add('open_interest')
+
+        return metrics
+
+    def _build_first_round_queries(self, metrics: set):
+        """
+        Build the queries of the given metrics which only need markets and prices
+        """
+        builders = {
+            'open_interest': lambda: self._open_interest._build_open_interest_queries(
+                self.markets, self.oracle_prices
+            ),
+            'borrow_apr': lambda: self._borrow_apr._build_borrow_apr_queries(
+                self.markets, self.oracle_prices
+            ),
+            'gm_prices': lambda: self._gm_prices._build_gm_price_queries(
+                self.markets, self.oracle_prices, MAX_PNL_FACTOR_FOR_TRADERS
+            ),
+            'claimable_fees': lambda: self._claimable_fees._build_claimable_fees_queries(
+                self.markets, self.oracle_prices
+            ),
+            'pool_tvl': lambda: self._pool_tvl._build_pool_balance_queries(self.markets)
+        }
+
+        return {metric: builder() for metric, builder in builders.items() if metric in metrics}
+
+    def _build_second_round_queries(self, metrics: set):
+        """
+        Build the queries of the given metrics which need open interest from the first round
+        """
+        open_interest = self.get_open_interest()
+
+        builders = {
+            'funding_apr': lambda: self._funding_apr._build_funding_apr_queries(
+                self.markets, self.oracle_prices, open_interest
+            ),
+            'available_liquidity': lambda: (
+                self._available_liquidity._build_available_liquidity_queries(
+                    self.markets, self.oracle_prices, open_interest
+                )
+            )
+        }
+
+        return {metric: builder() for metric, builder in builders.items() if metric in metrics}
+
+    def _get_call_groups(self, queries: dict):
+        """
+        Flatten the calls of several metrics into one list of call groups. Metrics with a flat
+        list of calls are treated as one group.
+        """
+        call_groups = []
+        for metric, query in queries.items():
+            if metric in GROUPED_METRICS:
+                call_groups.extend(query['calls'])
+            else:
+                call_groups.append(query['calls'])
+
+        return call_groups
+
+    def _store_outputs(self, queries: dict, outputs: list):
+        """
+        Split the grouped multicall outputs back into each metric
+        """
+        start = 0
+        for metric, query in queries.items():
+            if metric in GROUPED_METRICS:
+                self._outputs[metric] = outputs[start:start + len(query['calls'])]
+                start += len(query['calls'])
+            else:
+                self._outputs[metric] = outputs[start]
+                start += 1
+
+            self._queries[metric] = query
+
+    def _check_metric(self, metric: str):
+        if self.block_number is None:
+            raise Exception("Snapshot has not been refreshed!")
+
+        if metric not in self._queries:
+            raise Exception('Snapshot was last refreshed without "{}"!'.format(metric))
+
+    def _get_view(self, metric: str, processor):
+        """
+        Process the stored outputs of a metric the first time it is asked for
+        """
+        self._check_metric(metric)
+
+        if metric not in self._views:
+            self._views[metric] = processor(self._queries[metric], self._outputs[metric])
+
+        return self._views[metric]
+
+    def get_raw_outputs(self, metric: str):
+        """
+        The queries and unprocessed multicall outputs of a metric
+
+        Parameters
+        ----------
+        metric : str
+            name of the metric, eg open_interest.
+
+        Returns
+        -------
+        queries : dict
+            queries the metric was read with.
+        outputs : list
+            raw multicall outputs.
+
+        """
+        self._check_metric(metric)
+
+        return self._queries[metric], self._outputs[metric]
+
+    def get_market_frame(self, exact: bool = False):
+        """
+        Open interest, reserve caps, available liquidity and funding rates of every market,
+        computed column wise with numpy rather than market by market
+
+        Parameters
+        ----------
+        exact : bool, optional
+            compute with python ints and return values expanded to 30 decimals. The default is
+            False.
+
+        Returns
+        -------
+        pd.DataFrame
+            market stats indexed by market symbol.
+
+        """
+        return compute_market_frame(get_market_columns(self, exact), exact)
+
+    def get_open_interest(self):
+        """
+        Open interest per market, as output by OpenInterest
+
+        Returns
+        -------
+        dict
+            dictionary of open interest data.
+
+        """
+        return self._get_view('open_interest', self._open_interest._process_open_interest)
+
+    def get_borrow_apr(self):
+        """
+        Borrow rates per market, as output by GetBorrowAPR
+
+        Returns
+        -------
+        dict
+            dictionary of borrow data.
+
+        """
+        return self._get_view('borrow_apr', self._borrow_apr._process_borrow_apr)
+
+    def get_funding_apr(self):
+        """
+        Funding rates per market, as output by GetFundingFee
+
+        Returns
+        -------
+        dict
+            dictionary of funding data.
+
+        """
+        return self._get_view('funding_apr', self._funding_apr._process_funding_apr)
+
+    def get_available_liquidity(self):
+        """
+        Available liquidity per market, as output by GetAvailableLiquidity
+
+        Returns
+        -------
+        dict
+            dictionary of available liquidity.
+
+        """
+        return self._get_view(
+            'available_liquidity', self._available_liquidity._process_available_liquidity
+        )
+
+    def get_gm_prices(self):
+        """
+        GM prices per market using the traders pnl factor, as output by GMPrices
+
+        Returns
+        -------
+        dict
+            dictionary of gm prices.
+
+        """
+        return self._get_view('gm_prices', self._gm_prices._process_gm_prices)
+
+    def get_claimable_fees(self):
+        """
+        Total claimable fees, as output by GetClaimableFees
+
+        Returns
+        -------
+        dict
+            dictionary of total fees for week so far.
+
+        """
+        return self._get_view('claimable_fees', self._claimable_fees._process_claimable_fees)
+
+    def get_pool_tvl(self):
+        """
+        Pool values per market, as output by GetPoolTVL
+
+        Returns
+        -------
+        dict
+            dictionary of pool values.
+
+        """
+        return self._get_view(
+            'pool_tvl',
+            lambda queries, outputs: self._pool_tvl._process_pool_balances(
+                self.markets, self.oracle_prices, queries, outputs
+            )
+        )
+
+
+if __name__ == "__main__":
+
+    snapshot = MarketSnapshot(chain="arbitrum").refresh()
+
+    open_interest = snapshot.get_open_interest()
+    funding_apr = snapshot.get_funding_apr()
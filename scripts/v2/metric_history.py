@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 22:05:33 2026
+
+@author: snipermonke01
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from .gmx_utils import base_dir
+from .timeseries_store import TimeSeriesStore, to_utc_timestamp
+
+HISTORY_CACHE_DIR = os.path.join(base_dir, 'data_store', 'history_cache')
+
+# seconds a converted version is kept for after it is written, even if it is not the newest
+HISTORY_VERSION_GRACE = 60
+
+# metrics saved by the stats classes, named as their datastore csv files without the chain
+HISTORY_METRICS = (
+    'long_open_interest',
+    'short_open_interest',
+    'long_funding_apr',
+    'short_funding_apr',
+    'long_borrow_apr',
+    'short_borrow_apr',
+    'long_available_liquidity',
+    'short_available_liquidity',
+    'gm_prices',
+    'total_tvl',
+    'total_fees'
+)
+
+
+def _local_to_utc(timestamps):
+    """
+    Convert naive timestamps in the local time of this machine to UTC, timestamps which carry a
+    time zone are only converted
+    """
+    timestamps = pd.to_datetime(timestamps)
+    if timestamps.dt.tz is not None:
+        return timestamps.dt.tz_convert('UTC')
+
+    # astimezone applies the local offset in force at each time, so DST changes are handled
+    return pd.to_datetime(
+        [timestamp.to_pydatetime().astimezone() for timestamp in timestamps], utc=True
+    )
+
+
+class MetricHistory:
+    """
+    History of one metric on one chain as memory mapped numpy columns, for backtests.
+
+    The first time a metric is opened, and whenever its source has changed since, the history is
+    converted from the TimeSeriesStore (or the legacy datastore csv if the store has none) to
+    .npy files under data_store/history_cache. After that it is opened with np.load in mmap mode,
+    so several processes share the same pages of the file rather than each parsing and holding
+    its own copy.
+
+    Slicing by time, and by one market symbol or a run of adjacent symbols, returns views of the
+    mapped file without copying.
+    """
+
+    def __init__(
+        self,
+        chain: str,
+        metric: str,
+        store: TimeSeriesStore = None,
+        cache_dir: str = HISTORY_CACHE_DIR
+    ):
+
+        if store is None:
+            store = TimeSeriesStore()
+
+        self.chain = chain
+        self.metric = metric
+        self.store = store
+        self.cache_dir = cache_dir
+
+        self.timestamps = None
+        self.values = None
+        self.symbols = []
+        self._symbol_index = {}
+        self._signature = None
+
+        self.refresh()
+
+    def refresh(self):
+        """
+        Reopen the history, converting the source again first if it has changed
+
+        Returns
+        -------
+        MetricHistory
+            the refreshed history.
+
+        """
+        signature = self._get_source_signature()
+        if signature == self._signature:
+            return self
+
+        version_dir = os.path.join(self.cache_dir, self.chain, self.metric, signature)
+        if not os.path.isdir(version_dir):
+            self._build(version_dir)
+
+        with open(os.path.join(version_dir, 'columns.json')) as f:
+            self.symbols = json.load(f)
+
+        self.timestamps = np.load(os.path.join(version_dir, 'timestamps.npy'), mmap_mode='r')
+        self.values = np.load(os.path.join(version_dir, 'values.npy'), mmap_mode='r')
+        self._symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._signature = signature
+
+        self._remove_old_versions()
+
+        return self
+
+    def get(self, symbol: str, start=None, end=None):
+        """
+        Values of one market symbol between start and end, as a view of the mapped file
+
+        Parameters
+        ----------
+        symbol : str
+            market symbol, eg ETH.
+        start : datetime, optional
+            earliest row. The default is None, which starts from the first row.
+        end : datetime, optional
+            latest row. The default is None, which ends at the last row.
+
+        Returns
+        -------
+        np.ndarray
+            values of the symbol.
+
+        """
+        try:
+            column = self._symbol_index[symbol]
+        except KeyError:
+            raise Exception('No history of "{}" for {}!'.format(symbol, self.metric))
+
+        return self.values[column, self._get_row_slice(start, end)]
+
+    def slice(self, start=None, end=None, symbols: list = None):
+        """
+        Rows between start and end for a list of market symbols. Adjacent symbols, or all of
+        them, are returned as a view of the mapped file, any other selection is copied.
+
+        Parameters
+        ----------
+        start : datetime, optional
+            earliest row. The default is None, which starts from the first row.
+        end : datetime, optional
+            latest row. The default is None, which ends at the last row.
+        symbols : list, optional
+            market symbols to return. The default is None, which returns every symbol.
+
+        Returns
+        -------
+        timestamps : np.ndarray
+            timestamps of the rows, as nanoseconds since the epoch in UTC.
+        values : np.ndarray
+            values of shape (symbols, rows).
+
+        """
+        rows = self._get_row_slice(start, end)
+
+        if symbols is None:
+            return self.timestamps[rows], self.values[:, rows]
+
+        columns = [self._symbol_index[symbol] for symbol in symbols]
+        if columns and columns == list(range(columns[0], columns[0] + len(columns))):
+            columns = slice(columns[0], columns[0] + len(columns))
+
+        return self.timestamps[rows], self.values[columns, rows]
+
+    def to_dataframe(self, start=None, end=None, symbols: list = None):
+        """
+        Rows between start and end as a dataframe, copied out of the mapped file
+
+        Returns
+        -------
+        pd.DataFrame
+            values indexed by timestamp with a column per symbol.
+
+        """
+        timestamps, values = self.slice(start, end, symbols)
+
+        return pd.DataFrame(
+            values.T,
+            index=pd.to_datetime(np.asarray(timestamps), utc=True),
+            columns=self.symbols if symbols is None else symbols
+        )
+
+    def _get_row_slice(self, start, end):
+        """
+        Rows between start and end, found by binary search of the sorted timestamps
+        """
+        first = 0
+        last = len(self.timestamps)
+
+        if start is not None:
+            first = np.searchsorted(self.timestamps, to_utc_timestamp(start).value, 'left')
+        if end is not None:
+            last = np.searchsorted(self.timestamps, to_utc_timestamp(end).value, 'right')
+
+        return slice(first, last)
+
+    def _get_legacy_csv_path(self):
+        return os.path.join(base_dir, 'data_store', '{}_{}.csv'.format(self.chain, self.metric))
+
+    def _get_source_signature(self):
+        """
+        Hash of the names, sizes and modified times of the source files, changing whenever rows
+        are appended
+        """
+        source_files = self.store.get_files(self.chain, self.metric)
+
+        if not source_files and os.path.exists(self._get_legacy_csv_path()):
+            source_files.append(self._get_legacy_csv_path())
+
+        if not source_files:
+            raise Exception("No history stored for {} on {}!".format(self.metric, self.chain))
+
+        signature = hashlib.sha1()
+        for path in source_files:
+            stat = os.stat(path)
+            signature.update("{}:{}:{};".format(path, stat.st_size, stat.st_mtime_ns).encode())
+
+        return signature.hexdigest()
+
+    def _read_source(self):
+        """
+        Read the whole history from the store, or the legacy csv if the store has none. Legacy
+        csv timestamps were written by make_timestamped_dataframe as naive local time, so they
+        are converted from the local time zone of this machine to UTC.
+        """
+        if self.store.get_days(self.chain, self.metric):
+            return self.store.read(self.chain, self.metric)
+
+        dataframe = pd.read_csv(self._get_legacy_csv_path())
+        dataframe['timestamp'] = _local_to_utc(dataframe['timestamp'])
+
+        return dataframe.sort_values('timestamp').reset_index(drop=True)
+
+    def _build(self, version_dir: str):
+        """
+        Convert the source to .npy columns, written to a temporary directory which is renamed
+        into place once complete so other processes never open a half written version
+        """
+        dataframe = self._read_source()
+        symbols = [column for column in dataframe.columns if column != 'timestamp']
+
+        tmp_dir = "{}.tmp-{}".format(version_dir, os.getpid())
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        np.save(
+            os.path.join(tmp_dir, 'timestamps.npy'),
+            dataframe['timestamp'].dt.tz_convert(None).to_numpy(
+                dtype='datetime64[ns]'
+            ).astype('int64')
+        )
+        np.save(
+            os.path.join(tmp_dir, 'values.npy'),
+            np.ascontiguousarray(
+                dataframe[symbols].apply(pd.to_numeric, errors='coerce').to_numpy(
+                    dtype=float
+                ).T
+            )
+        )
+        with open(os.path.join(tmp_dir, 'columns.json'), 'w') as f:
+            json.dump(symbols, f)
+
+        try:
+            os.rename(tmp_dir, version_dir)
+
+        # another process built the same version first
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _remove_old_versions(self):
+        """
+        Remove converted versions written before the current one, processes which still have
+        them mapped keep reading them until they refresh. Newer versions, which another process
+        may be about to open, and versions written in the last HISTORY_VERSION_GRACE seconds are
+        kept.
+        """
+        metric_dir = os.path.join(self.cache_dir, self.chain, self.metric)
+        current_mtime = os.stat(os.path.join(metric_dir, self._signature)).st_mtime
+
+        for version in os.listdir(metric_dir):
+            if version == self._signature or '.tmp-' in version:
+                continue
+
+            version_dir = os.path.join(metric_dir, version)
+            try:
+                mtime = os.stat(version_dir).st_mtime
+            except FileNotFoundError:
+                continue
+
+            if mtime < current_mtime and time.time() - mtime > HISTORY_VERSION_GRACE:
+                shutil.rmtree(version_dir, ignore_errors=True)
+
+
+def load_history(chain: str, metrics: list = HISTORY_METRICS, store: TimeSeriesStore = None):
+    """
+    Open the history of several metrics on a chain, skipping metrics with no history stored
+
+    Parameters
+    ----------
+    chain : str
+        chain to open the history of.
+    metrics : list, optional
+        metrics to open. The default is HISTORY_METRICS.
+    store : TimeSeriesStore, optional
+        store to read from. The default is None, which uses the default store.
+
+    Returns
+    -------
+    dict
+        MetricHistory keyed by metric.
+
+    """
+    history = {}
+    for metric in metrics:
+        try:
+            history[metric] = MetricHistory(chain, metric, store=store)
+        except Exception as e:
+            logging.warning("Skipping {}: {}".format(metric, e))
+
+    return history
+
+
+if __name__ == "__main__":
+
+    open_interest = MetricHistory("arbitrum", "long_open_interest")
+    eth_open_interest = open_interest.get("ETH", start="2026-10-01")
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 10:12:41 2026
+
+@author: snipermonke01
+"""
+
+import asyncio
+import logging
+
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+
+from .gmx_utils import _get_cached_contract, submit_many
+
+# Multicall3 is deployed at the same address on every chain we support
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+MULTICALL3_ABI_PATH = "contracts/v2/multicall3.json"
+
+# Limits used to split calls into several aggregate3 calls
+MAX_CALLS_PER_BATCH = 100
+MAX_CALLDATA_BYTES = 64000
+
+
+def get_multicall_contract(web3_obj):
+    """
+    Get the Multicall3 contract object for a given connection
+
+    Parameters
+    ----------
+    web3_obj : web3_obj
+        web3 connection.
+
+    """
+    return _get_cached_contract(
+        ("multicall3", web3_obj.provider.endpoint_uri),
+        web3_obj,
+        MULTICALL3_ADDRESS,
+        MULTICALL3_ABI_PATH
+    )
+
+
+def _chunk_calls(encoded_calls: list, max_calls_per_batch: int, max_calldata_bytes: int):
+    """
+    Split encoded calls into chunks which stay under the call count and calldata size limits
+    """
+    chunks = []
+    chunk = []
+    chunk_bytes = 0
+
+    for encoded_call in encoded_calls:
+        call_bytes = (len(encoded_call[2]) - 2) // 2
+
+        if chunk and (
+            len(chunk) >= max_calls_per_batch or chunk_bytes + call_bytes > max_calldata_bytes
+        ):
+            chunks.append(chunk)
+            chunk = []
+            chunk_bytes = 0
+
+        chunk.append(encoded_call)
+        chunk_bytes += call_bytes
+
+    if chunk:
+        chunks.append(chunk)
+
+    return chunks
+
+
+def _aggregate(multicall_contract, chunk: list, block_identifier):
+    """
+    Send one chunk of calls through aggregate3. If the node rejects the whole call, eg because it
+    runs out of gas, the chunk is split in half and each half is retried.
+    """
+    try:
+        return multicall_contract.functions.aggregate3(chunk).call(
+            block_identifier=block_identifier
+        )
+    except ValueError:
+        if len(chunk) == 1:
+            raise
+
+        middle = len(chunk) // 2
+        return _aggregate(multicall_contract, chunk[:middle], block_identifier) + \
+            _aggregate(multicall_contract, chunk[middle:], block_identifier)
+
+
+def _decode_result(web3_obj, function_call, success: bool, return_data: bytes):
+    """
+    Decode the raw return data of a call into the same output .call() would give
+    """
+    if not success or len(return_data) == 0:
+        return None
+
+    output_types = get_abi_output_types(function_call.abi)
+    output_data = web3_obj.codec.decode(output_types, return_data)
+    normalized_data = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, output_data)
+
+    if len(normalized_data) == 1:
+        return normalized_data[0]
+
+    return normalized_data
+
+
+def _encode_calls(function_calls: list):
+    return [
+        (function_call.address, True, function_call._encode_transaction_data())
+        for function_call in function_calls
+    ]
+
+
+def _decode_results(web3_obj, function_calls: list, raw_results: list, allow_failure: bool):
+    """
+    Decode the (success, return data) pairs of a multicall in the order of function_calls
+    """
+    results = []
+    for function_call, (success, return_data) in zip(function_calls, raw_results):
+        result = _decode_result(web3_obj, function_call, success, return_data)
+
+        if result is None:
+            if not allow_failure:
+                raise Exception(
+                    "Multicall to {} failed!".format(function_call.fn_name)
+                )
+            logging.warning("Multicall to {} failed!".format(function_call.fn_name))
+
+        results.append(result)
+
+    return results
+
+
+def _split_groups(results: list, function_call_groups: tuple):
+    """
+    Split the flat results of a grouped multicall back into lists the size of each group
+    """
+    grouped_results = []
+    start = 0
+    for group in function_call_groups:
+        grouped_results.append(results[start:start + len(group)])
+        start += len(group)
+
+    return grouped_results
+
+
+def execute_multicall(
+    function_calls: list,
+    block_identifier=None,
+    allow_failure: bool = True,
+    max_calls_per_batch: int = MAX_CALLS_PER_BATCH,
+    max_calldata_bytes: int = MAX_CALLDATA_BYTES
+):
+    """
+    Execute a list of uncalled web3 contract functions through Multicall3, all pinned to the same
+    block. Replaces execute_threading for read calls.
+
+    Parameters
+    ----------
+    function_calls : list
+        list of uncalled web3 contract functions, all on the same connection.
+    block_identifier : int, optional
+        block to execute the calls at. The default is None, which pins to the latest block.
+    allow_failure : bool, optional
+        if True a failed call returns None instead of raising. The default is True.
+    max_calls_per_batch : int, optional
+        most calls to send in one aggregate3 call. The default is MAX_CALLS_PER_BATCH.
+    max_calldata_bytes : int, optional
+        most calldata to send in one aggregate3 call. The default is MAX_CALLDATA_BYTES.
+
+    Returns
+    -------
+    results : list
+        decoded outputs in the same order as function_calls.
+
+    """
+    if len(function_calls) == 0:
+        return []
+
+    web3_obj = function_calls[0].w3
+    multicall_contract = get_multicall_contract(web3_obj)
+
+    if block_identifier is None:
+        block_identifier = web3_obj.eth.block_number
+
+    encoded_calls = _encode_calls(function_calls)
+    chunks = _chunk_calls(encoded_calls, max_calls_per_batch, max_calldata_bytes)
+
+    chunk_results = submit_many(
+        lambda chunk: _aggregate(multicall_contract, chunk, block_identifier),
+        chunks
+    )
+
+    raw_results = [raw_result for chunk_result in chunk_results for raw_result in chunk_result]
+
+    return _decode_results(web3_obj, function_calls, raw_results, allow_failure)
+
+
+def execute_multicall_groups(*function_call_groups: list, **kwargs):
+    """
+    Execute several lists of uncalled web3 contract functions in one multicall so they are all
+    read from the same block, and split the results back into the same groups
+
+    Parameters
+    ----------
+    *function_call_groups : list
+        lists of uncalled web3 contract functions.
+    **kwargs : dict
+        passed on to execute_multicall.
+
+    Returns
+    -------
+    grouped_results : list
+        list of result lists, in the same order as function_call_groups.
+
+    """
+    results = execute_multicall(
+        [function_call for group in function_call_groups for function_call in group],
+        **kwargs
+    )
+
+    return _split_groups(results, function_call_groups)
+
+
+def get_async_multicall_contract(async_web3_obj):
+    """
+    Get the Multicall3 contract object for a given async connection
+
+    Parameters
+    ----------
+    async_web3_obj : AsyncWeb3
+        async web3 connection.
+
+    """
+    return _get_cached_contract(
+        ("async multicall3", async_web3_obj.provider.endpoint_uri),
+        async_web3_obj,
+        MULTICALL3_ADDRESS,
+        MULTICALL3_ABI_PATH
+    )
+
+
+async def _async_aggregate(multicall_contract, chunk: list, block_identifier):
+    """
+    Async version of _aggregate
+    """
+    try:
+        return await multicall_contract.functions.aggregate3(chunk).call(
+            block_identifier=block_identifier
+        )
+    except ValueError:
+        if len(chunk) == 1:
+            raise
+
+        middle = len(chunk) // 2
+        first_half, second_half = await asyncio.gather(
+            _async_aggregate(multicall_contract, chunk[:middle], block_identifier),
+            _async_aggregate(multicall_contract, chunk[middle:], block_identifier)
+        )
+        return first_half + second_half
+
+
+async def async_execute_multicall(
+    async_web3_obj,
+    function_calls: list,
+    block_identifier=None,
+    allow_failure: bool = True,
+    max_calls_per_batch: int = MAX_CALLS_PER_BATCH,
+    max_calldata_bytes: int = MAX_CALLDATA_BYTES
+):
+    """
+    Async version of execute_multicall. The function calls are only used for encoding and
+    decoding so they can be built on a sync connection, the aggregate3 calls are sent
+    concurrently over async_web3_obj.
+
+    Parameters
+    ----------
+    async_web3_obj : AsyncWeb3
+        async web3 connection to send the calls over.
+    function_calls : list
+        list of uncalled web3 contract functions.
+    block_identifier : int, optional
+        block to execute the calls at. The default is None, which pins to the latest block.
+    allow_failure : bool, optional
+        if True a failed call returns None instead of raising. The default is True.
+    max_calls_per_batch : int, optional
+        most calls to send in one aggregate3 call. The default is MAX_CALLS_PER_BATCH.
+    max_calldata_bytes : int, optional
+        most calldata to send in one aggregate3 call. The default is MAX_CALLDATA_BYTES.
+
+    Returns
+    -------
+    results : list
+        decoded outputs in the same order as function_calls.
+
+    """
+    if len(function_calls) == 0:
+        return []
+
+    multicall_contract = get_async_multicall_contract(async_web3_obj)
+
+    if block_identifier is None:
+        block_identifier = await async_web3_obj.eth.block_number
+
+    chunks = _chunk_calls(
+        _encode_calls(function_calls), max_calls_per_batch, max_calldata_bytes
+    )
+
+    chunk_results = await asyncio.gather(
+        *[_async_aggregate(multicall_contract, chunk, block_identifier) for chunk in chunks]
+    )
+
+    raw_results = [raw_result for chunk_result in chunk_results for raw_result in chunk_result]
+
+    return _decode_results(
+        function_calls[0].w3, function_calls, raw_results, allow_failure
+    )
+
+
+async def async_execute_multicall_groups(async_web3_obj, *function_call_groups: list, **kwargs):
+    """
+    Async version of execute_multicall_groups
+
+    Parameters
+    ----------
+    async_web3_obj : AsyncWeb3
+        async web3 connection to send the calls over.
+    *function_call_groups : list
+        lists of uncalled web3 contract functions.
+    **kwargs : dict
+        passed on to async_execute_multicall.
+
+    Returns
+    -------
+    grouped_results : list
+        list of result lists, in the same order as function_call_groups.
+
+    """
+    results = await async_execute_multicall(
+        async_web3_obj,
+        [function_call for group in function_call_groups for function_call in group],
+        **kwargs
+    )
+
+    return _split_groups(results, function_call_groups)
+
+
+async def async_execute_call(async_web3_obj, function_call, block_identifier='latest'):
+    """
+    Send a single uncalled web3 contract function over an async connection, for calls which
+    can not go through Multicall3
+
+    Parameters
+    ----------
+    async_web3_obj : AsyncWeb3
+        async web3 connection to send the call over.
+    function_call : web3._utils.contracts.ContractFunction
+        uncalled web3 contract function.
+    block_identifier : int, optional
+        block to execute the call at. The default is 'latest'.
+
+    Returns
+    -------
+    result
+        decoded output, as .call() would give.
+
+    """
+    return_data = await async_web3_obj.eth.call(
+        {
+            'to': function_call.address,
+            'data': function_call._encode_transaction_data()
+        },
+        block_identifier
+    )
+
+    return _decode_result(function_call.w3, function_call, True, return_data)
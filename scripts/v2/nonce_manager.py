@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:14:36 2026
+
+@author: snipermonke01
+"""
+
+import asyncio
+import logging
+import threading
+
+from contextlib import contextmanager
+from web3 import Web3
+
+from .gmx_utils import create_connection, get_executor
+
+# fragments of the errors nodes return when a nonce is already used or out of order
+NONCE_ERROR_MESSAGES = (
+    'nonce too low',
+    'nonce too high',
+    'invalid nonce',
+    'already known',
+    'replacement transaction underpriced',
+    'known transaction'
+)
+
+
+def is_nonce_error(error: Exception):
+    """
+    Check if an error from sending a transaction means the local nonce is out of sync with the
+    chain
+
+    Parameters
+    ----------
+    error : Exception
+        error raised when sending a transaction.
+
+    Returns
+    -------
+    bool
+        True if the nonce needs resyncing.
+
+    """
+    message = str(error).lower()
+
+    return any(fragment in message for fragment in NONCE_ERROR_MESSAGES)
+
+
+class NonceManager:
+    """
+    Hands out nonces for one account on one chain locally, so transactions can be sent back to
+    back without racing on get_transaction_count or paying for it before every transaction.
+
+    The next nonce is synced from the pending transaction count of the account when first
+    needed and again after a nonce error. Only one sync runs at a time, and nonces which are
+    reserved but not yet sent are never handed out again by a sync. A nonce given back because
+    its transaction failed to send is handed out again before any new one, so no gap is left.
+
+    The manager does not watch the chain. A transaction which was sent but later dropped from
+    the mempool, or one sent from the same account elsewhere, is only noticed when a node error
+    matches NONCE_ERROR_MESSAGES or when reset() is called. Until then later transactions can
+    sit pending behind the missing nonce, so call reset() if transactions stop confirming.
+    """
+
+    def __init__(self, chain: str, address: str, connection=None):
+
+        if connection is None:
+            connection = create_connection(chain=chain)
+
+        self.chain = chain
+        self.address = Web3.to_checksum_address(address)
+        self.connection = connection
+
+        self._next_nonce = None
+        # nonces handed out whose transactions have not been sent yet
+        self._reserved = set()
+        # nonces given back below _next_nonce, reused first
+        self._released = set()
+
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def sync(self):
+        """
+        Set the next nonce from the pending transaction count of the account, never below a nonce
+        which is still reserved
+
+        Returns
+        -------
+        int
+            next nonce.
+
+        """
+        return self._sync(force=True)
+
+    def reserve(self):
+        """
+        Reserve the next nonce, syncing with the chain first if needed
+
+        Returns
+        -------
+        int
+            reserved nonce.
+
+        """
+        while True:
+            nonce = self._take()
+            if nonce is not None:
+                return nonce
+
+            self._sync(force=False)
+
+    async def areserve(self):
+        """
+        Async version of reserve, syncing on the shared executor rather than blocking the event
+        loop
+
+        Returns
+        -------
+        int
+            reserved nonce.
+
+        """
+        nonce = self._take()
+        if nonce is not None:
+            return nonce
+
+        return await asyncio.get_running_loop().run_in_executor(get_executor(), self.reserve)
+
+    def confirm(self, nonce: int):
+        """
+        Mark a reserved nonce as sent, after which the pending count of the node includes it
+
+        Parameters
+        ----------
+        nonce : int
+            reserved nonce.
+
+        """
+        with self._lock:
+            self._reserved.discard(nonce)
+
+    def release(self, nonce: int, error: Exception = None):
+        """
+        Give back a reserved nonce whose transaction was not sent, so it is handed out again. After
+        a nonce error the next reserve syncs with the chain instead.
+
+        Parameters
+        ----------
+        nonce : int
+            reserved nonce.
+        error : Exception, optional
+            error the transaction failed with. The default is None.
+
+        """
+        with self._lock:
+            self._reserved.discard(nonce)
+
+            if self._next_nonce is None:
+                return
+
+            if error is not None and is_nonce_error(error):
+                self._next_nonce = None
+
+            elif nonce == self._next_nonce - 1:
+                self._next_nonce = nonce
+                self._released.discard(nonce)
+
+            else:
+                self._released.add(nonce)
+
+    def reset(self):
+        """
+        Forget the local nonce so the next reserve syncs with the chain, eg after replacing or
+        cancelling a transaction by hand
+        """
+        with self._lock:
+            self._next_nonce = None
+
+    @contextmanager
+    def use_nonce(self):
+        """
+        Reserve a nonce for building and sending one transaction, releasing it if sending fails
+
+        Yields
+        ------
+        int
+            reserved nonce.
+
+        """
+        nonce = self.reserve()
+        try:
+            yield nonce
+        except Exception as e:
+            self.release(nonce, e)
+            raise
+
+        self.confirm(nonce)
+
+    def _sync(self, force: bool):
+        """
+        Sync with the pending count. Only one sync runs at a time, threads which needed one while
+        it ran use its result rather than syncing again unless force is True.
+        """
+        with self._sync_lock:
+            with self._lock:
+                if not force and self._next_nonce is not None:
+                    return self._next_nonce
+
+            pending_count = self.connection.eth.get_transaction_count(self.address, 'pending')
+
+            with self._lock:
+                if force or self._next_nonce is None:
+                    self._apply_sync(pending_count)
+
+                next_nonce = self._next_nonce
+
+        logging.info("Synced nonce of {} on {}: {}".format(self.address, self.chain, next_nonce))
+
+        return next_nonce
+
+    def _take(self):
+        """
+        Take a released nonce, or else the next one, if synced. Must not hold the lock.
+        """
+        with self._lock:
+            if self._next_nonce is None:
+                return None
+
+            if self._released:
+                nonce = min(self._released)
+                self._released.discard(nonce)
+            else:
+                nonce = self._next_nonce
+                self._next_nonce += 1
+
+            self._reserved.add(nonce)
+
+            return nonce
+
+    def _apply_sync(self, pending_count: int):
+        """
+        Set the next nonce from the pending count, above any nonce still reserved. Must hold the
+        lock.
+        """
+        next_nonce = pending_count
+        if self._reserved:
+            next_nonce = max(next_nonce, max(self._reserved) + 1)
+
+        self._next_nonce = next_nonce
+        self._released = {
+            nonce for nonce in self._released
+            if pending_count <= nonce < next_nonce and nonce not in self._reserved
+        }
+
+
+_nonce_managers = {}
+_nonce_managers_lock = threading.Lock()
+
+
+def get_nonce_manager(chain: str, address: str):
+    """
+    Get the nonce manager shared by everything sending transactions from an account on a chain
+
+    Parameters
+    ----------
+    chain : str
+        arbitrum or avalanche.
+    address : str
+        address of the account.
+
+    Returns
+    -------
+    NonceManager
+        nonce manager of the account.
+
+    """
+    key = (chain, Web3.to_checksum_address(address))
+
+    with _nonce_managers_lock:
+        if key not in _nonce_managers:
+            _nonce_managers[key] = NonceManager(chain, address)
+
+        return _nonce_managers[key]
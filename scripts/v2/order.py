@@ -4,15 +4,20 @@ import numpy as np
 from hexbytes import HexBytes
 from web3 import Web3
 
-from .get_markets import GetMarkets
 from .get_oracle_prices import GetOraclePrices
 from .gmx_utils import (
-    get_exchange_router_contract, create_connection, get_config, contract_map,
-    PRECISION, get_execution_price_and_price_impact, order_type as order_types,
-    decrease_position_swap_type as decrease_position_swap_types, determine_swap_route
+    get_config, contract_map, PRECISION, get_execution_price_and_price_impact,
+    order_type as order_types,
+    decrease_position_swap_type as decrease_position_swap_types, determine_swap_route,
+    submit_many
 )
 from .gas_utils import get_execution_fee
-from .approve_token_for_spend import check_if_approved
+from .nonce_manager import get_nonce_manager
+from .order_context import get_order_context
+
+
+# estimated gas is raised by this factor to cover state changing before the order is mined
+GAS_ESTIMATE_BUFFER = 1.2
 
 
 class Order:
@@ -20,7 +25,8 @@ class Order:
         self, chain: str, market_key: str, collateral_address: str,
         index_token_address: str, is_long: bool, size_delta: float,
         initial_collateral_delta_amount: str, slippage_percent: float,
-        swap_path: list
+        swap_path: list, submit: bool = True, simulate: bool = False,
+        estimate_gas: bool = True
     ) -> None:
         self.chain = chain
         self.market_key = market_key
@@ -31,69 +37,68 @@ class Order:
         self.initial_collateral_delta_amount = initial_collateral_delta_amount
         self.slippage_percent = slippage_percent
         self.swap_path = swap_path
-
-        self._exchange_router_contract_obj = get_exchange_router_contract(
-            chain=self.chain
-        )
-        self._connection = create_connection(chain=self.chain)
+        self.simulate = simulate
+        self.estimate_gas = estimate_gas
+        # a simulated order is never sent
+        self.submit = submit and not simulate
+        self.built_order = None
+
+        # contracts, signer, gas and markets are shared by every order on the chain
+        self._context = get_order_context(self.chain)
+        self._exchange_router_contract_obj = self._context.exchange_router
+        self._connection = self._context.connection
         self._is_swap = False
 
         self.log = logging.getLogger(__name__)
         self.log.info("Creating order...")
 
     def determine_gas_limits(self):
-        pass
+        self._gas_limits = self._context.get_gas_limits()
 
     def check_for_approval(self):
         """
-        Check for Approval
-
-        NOTE: Doesn't function at the moment. Original code was excluded.
+        Check for Approval, reusing the allowance cached by the order context while it covers
+        the order
         """
-        spender = contract_map[self.chain]["syntheticsrouter"]['contract_address']
-
-        check_if_approved(self.chain,
-                          spender,
-                          self.collateral_address,
-                          self.initial_collateral_delta_amount,
-                          approve=True)
+        self._context.check_for_approval(
+            self.collateral_address,
+            self.initial_collateral_delta_amount
+        )
 
     def _submit_transaction(
         self, user_wallet_address: str, value_amount: float,
-        multicall_args: list, gas_limits: dict
+        multicall_args: list, gas_limits: dict, gas: int = None
     ):
         """
         Submit Transaction
         """
+        if gas is None:
+            gas = self._get_order_gas(user_wallet_address, value_amount, multicall_args)
+
         self.log.info("Submitting transaction...")
 
-        nonce = self._connection.eth.get_transaction_count(
-            Web3.to_checksum_address(user_wallet_address)
-        )
+        nonce_manager = get_nonce_manager(self.chain, user_wallet_address)
+
+        # the nonce is given back if building, signing or sending fails
+        with nonce_manager.use_nonce() as nonce:
+            raw_txn = self._exchange_router_contract_obj.functions.multicall(
+                multicall_args
+            ).build_transaction(
+                {
+                    'value': value_amount,
+                    'chainId': 42161,
+                    'gas': gas,
+                    'maxFeePerGas': Web3.to_wei('0.1', 'gwei'),
+                    'maxPriorityFeePerGas': Web3.to_wei('0.1', 'gwei'),
+                    'nonce': nonce
+                }
+            )
 
-        raw_txn = self._exchange_router_contract_obj.functions.multicall(
-            multicall_args
-        ).build_transaction(
-            {
-                'value': value_amount,
-                'chainId': 42161,
-                # TODO - this is NOT correct
-                'gas': (
-                    self._gas_limits_order_type.call() +
-                    self._gas_limits_order_type.call()
-                ),
-                'maxFeePerGas': Web3.to_wei('0.1', 'gwei'),
-                'maxPriorityFeePerGas': Web3.to_wei('0.1', 'gwei'),
-                'nonce': nonce
-            }
-        )
+            signed_txn = self._context.sign_transaction(raw_txn)
+            tx_hash = self._connection.eth.send_raw_transaction(
+                signed_txn.rawTransaction
+            )
 
-        signed_txn = self._connection.eth.account.sign_transaction(
-            raw_txn, get_config()['private_key']
-        )
-        tx_hash = self._connection.eth.send_raw_transaction(
-            signed_txn.rawTransaction
-        )
         self.log.info("Txn submitted!")
         self.log.info(
             "Check status: https://arbiscan.io/tx/{}".format(tx_hash.hex())
@@ -101,6 +106,109 @@ class Order:
 
         self.log.info("Transaction submitted!")
 
+        return tx_hash
+
+    def simulate_transaction(
+        self, user_wallet_address: str, value_amount: int, multicall_args: list
+    ):
+        """
+        Run the multicall of an order through eth_call and estimateGas against the exchange
+        router without broadcasting it
+
+        Parameters
+        ----------
+        user_wallet_address : str
+            address the order is sent from.
+        value_amount : int
+            value sent with the multicall.
+        multicall_args : list
+            encoded calls of the multicall.
+
+        Returns
+        -------
+        simulation : dict
+            the unsigned transaction, the eth_call result or call_error and the gas estimate or
+            gas_error. Each call is kept even if the other fails.
+
+        """
+        transaction = self._get_call_transaction(user_wallet_address, value_amount, multicall_args)
+
+        def run(call):
+            try:
+                return call(transaction), None
+            except Exception as e:
+                return None, str(e)
+
+        (call_result, call_error), (gas_estimate, gas_error) = submit_many(
+            run,
+            [self._connection.eth.call, self._connection.eth.estimate_gas]
+        )
+
+        for name, error in (('eth_call', call_error), ('estimateGas', gas_error)):
+            if error is not None:
+                self.log.warning("Simulated order failed in {}: {}".format(name, error))
+
+        return {
+            'transaction': transaction,
+            'call_result': call_result,
+            'call_error': call_error,
+            'gas_estimate': gas_estimate,
+            'gas_error': gas_error
+        }
+
+    def _get_call_transaction(
+        self, user_wallet_address: str, value_amount: int, multicall_args: list
+    ):
+        """
+        Unsigned multicall transaction for eth_call and estimateGas
+        """
+        return {
+            'from': Web3.to_checksum_address(user_wallet_address),
+            'to': self._exchange_router_contract_obj.address,
+            'value': value_amount,
+            'data': self._exchange_router_contract_obj.encodeABI(
+                fn_name='multicall',
+                args=[multicall_args]
+            )
+        }
+
+    def _get_order_gas(
+        self, user_wallet_address: str, value_amount: int, multicall_args: list
+    ):
+        """
+        Gas limit to send the built order with. A simulated order reuses its gas estimate, other
+        orders estimate it unless created with estimate_gas=False, which saves the round trip and
+        uses the gas limits of the order type instead.
+        """
+        simulation = self.built_order.get('simulation')
+        if simulation is not None and simulation['gas_estimate'] is not None:
+            return self.built_order['gas']
+
+        if not self.estimate_gas:
+            return self.built_order['gas']
+
+        return self._estimate_gas(
+            user_wallet_address, value_amount, multicall_args, self.built_order['gas']
+        )
+
+    def _estimate_gas(
+        self, user_wallet_address: str, value_amount: int, multicall_args: list,
+        fallback_gas: int
+    ):
+        """
+        Gas limit of a multicall from estimateGas plus a buffer, or fallback_gas if it can not be
+        estimated, eg while an approval sent for the order is still pending
+        """
+        try:
+            gas_estimate = self._connection.eth.estimate_gas(
+                self._get_call_transaction(user_wallet_address, value_amount, multicall_args)
+            )
+        except Exception as e:
+            self.log.warning("Could not estimate gas, using {}: {}".format(fallback_gas, e))
+            return fallback_gas
+
+        return int(gas_estimate * GAS_ESTIMATE_BUFFER)
+
     def _get_prices(
         self, decimals: float, prices: float, is_open: bool = False,
         is_close: bool = False, is_swap: bool = False
@@ -154,11 +262,32 @@ class Order:
 
     def order_builder(self, is_open=False, is_close=False, is_swap=False):
         """
-        Create Order
+        Create Order, and submit it unless the order was created with submit=False or
+        simulate=True. Orders which are not submitted also skip the approval check, so building
+        one never sends a transaction. Simulated orders are run through eth_call and estimateGas,
+        and their gas is sized from the estimate.
+
+        Returns
+        -------
+        dict
+            multicall_args, value, execution_fee, gas, acceptable and execution prices of the
+            order, and the simulation result if simulated.
         """
         config = get_config()
-        self.determine_gas_limits()
-        gas_price = self._connection.eth.gas_price
+
+        # reads which only need the order parameters are made concurrently, reads which need
+        # the prices or markets follow in a second round
+        first_round = [
+            self.determine_gas_limits,
+            self._context.get_gas_price,
+            self._context.get_markets,
+            GetOraclePrices(chain=self.chain).get_recent_prices
+        ]
+        if not is_close and self.submit:
+            first_round.append(self.check_for_approval)
+
+        gas_price, markets, prices = submit_many(lambda call: call(), first_round)[1:4]
+
         execution_fee = int(
             get_execution_fee(
                 self._gas_limits,
@@ -166,15 +295,11 @@ class Order:
                 gas_price
             )
         )
-        if not is_close:
-            self.check_for_approval()
         if is_swap:
             execution_fee = int(execution_fee*1.5)
         else:
             execution_fee = int(execution_fee*1.2)
 
-        markets = GetMarkets(chain=self.chain).get_available_markets()
-
         if is_swap:
 
             # we need to determine what market(s) our swap needs to route through based on in and out token
@@ -188,8 +313,6 @@ class Order:
 
         initial_collateral_delta_amount = self.initial_collateral_delta_amount
 
-        prices = GetOraclePrices(chain=self.chain).get_recent_prices()
-
         size_delta_price_price_impact = self.size_delta
         if is_close:
             size_delta_price_price_impact = size_delta_price_price_impact * -1
@@ -210,6 +333,29 @@ class Order:
         }
 
         decimals = markets[self.market_key]['market_metadata']['decimals']
+
+        second_round = [
+            lambda: get_execution_price_and_price_impact(
+                self.chain,
+                execution_price_parameters,
+                decimals
+            )
+        ]
+        if is_swap:
+            # Estimate amount of token out using a reader function, necessary
+            # for multi swap
+            second_round.append(
+                lambda: self.estimated_swap_output(
+                    markets[swap_route[0]],
+                    self.collateral_address,
+                    initial_collateral_delta_amount,
+                    prices
+                )
+            )
+
+        second_round_outputs = submit_many(lambda call: call(), second_round)
+        execution_price_and_price_impact_dict = second_round_outputs[0]
+
         callback_gas_limit = 0
         min_output_amount = 0
 
@@ -219,13 +365,7 @@ class Order:
             order_type = order_types['market_decrease']
         elif is_swap:
             order_type = order_types['market_swap']
-            # Estimate amount of token out using a reader function, necessary
-            # for multi swap
-            estimated_output = self.estimated_swap_output(
-                markets[swap_route[0]],
-                self.collateral_address,
-                initial_collateral_delta_amount
-            )
+            estimated_output = second_round_outputs[1]
 
             # this var will help to calculate the cost gas depending on the
             # operation
@@ -237,7 +377,8 @@ class Order:
                     int(
                         estimated_output["out_token_amount"] -
                         estimated_output["out_token_amount"] * self.slippage_percent
-                    )
+                    ),
+                    prices
                 )
                 self._get_limits_order_type = self._gas_limits['swap_order']
 
@@ -272,12 +413,6 @@ class Order:
             acceptable_price = 0
             gmx_market_address = "0x0000000000000000000000000000000000000000"
 
-        execution_price_and_price_impact_dict = get_execution_price_and_price_impact(
-            self.chain,
-            execution_price_parameters,
-            decimals
-        )
-
         arguments = (
             (
                 Web3.to_checksum_address(user_wallet_address),
@@ -333,9 +468,33 @@ class Order:
                 HexBytes(self._create_order(arguments))
             ]
 
-        self._submit_transaction(
-            user_wallet_address, value_amount, multicall_args, self._gas_limits
-        )
+        self.built_order = {
+            'multicall_args': multicall_args,
+            'value': value_amount,
+            'execution_fee': execution_fee,
+            # used when the gas can not be estimated
+            'gas': self._gas_limits_order_type + self._gas_limits_order_type,
+            'acceptable_price': acceptable_price,
+            'acceptable_price_in_usd': acceptable_price_in_usd,
+            'execution_price': execution_price_and_price_impact_dict['execution_price'],
+            'price_impact_usd': execution_price_and_price_impact_dict['price_impact_usd']
+        }
+
+        if self.simulate:
+            simulation = self.simulate_transaction(
+                user_wallet_address, value_amount, multicall_args
+            )
+            self.built_order['simulation'] = simulation
+
+            if simulation['gas_estimate'] is not None:
+                self.built_order['gas'] = int(simulation['gas_estimate'] * GAS_ESTIMATE_BUFFER)
+
+        if self.submit:
+            self._submit_transaction(
+                user_wallet_address, value_amount, multicall_args, self._gas_limits
+            )
+
+        return self.built_order
 
     def _create_order(self, arguments):
         """
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:07:51 2026
+
+@author: snipermonke01
+"""
+
+import logging
+
+from .create_decrease_order import DecreaseOrder
+from .create_increase_order import IncreaseOrder
+from .create_swap_order import SwapOrder
+from .gmx_utils import get_config, submit_many
+from .order_context import get_order_context
+
+ORDER_CLASSES = {
+    'increase': IncreaseOrder,
+    'decrease': DecreaseOrder,
+    'swap': SwapOrder
+}
+
+# kept below the arbitrum block gas limit of 32m
+DEFAULT_MAX_BATCH_GAS = 30000000
+
+
+class OrderBatch:
+    """
+    Submit many increase, decrease and swap orders in as few ExchangeRouter multicall
+    transactions as the gas limit allows.
+
+    Each order is built without being submitted, then the sendWnt, sendTokens and createOrder
+    calls of consecutive orders are packed into one multicall until the next order would take it
+    over max_gas. The value of each transaction is the sum of the values of its orders, which
+    covers their execution fees and any native token collateral. Orders are kept in the order
+    they were added, so eg closes added first are created first.
+
+    Each transaction's gas is estimated before it is sent, unless the batch was created with
+    estimate_gas=False, which uses the sum of its orders' gas instead.
+    """
+
+    def __init__(
+        self, chain: str, max_gas: int = DEFAULT_MAX_BATCH_GAS, estimate_gas: bool = True
+    ):
+        self.chain = chain
+        self.max_gas = max_gas
+        self.estimate_gas = estimate_gas
+        self.orders = []
+        self._order_objects = []
+
+        self.log = logging.getLogger(__name__)
+
+    def add(self, order_type: str, **parameters):
+        """
+        Add an order to the batch
+
+        Parameters
+        ----------
+        order_type : str
+            increase, decrease or swap.
+        **parameters
+            arguments of IncreaseOrder, DecreaseOrder or SwapOrder other than chain.
+
+        Returns
+        -------
+        OrderBatch
+            the batch, so adds can be chained.
+
+        """
+        if order_type not in ORDER_CLASSES:
+            raise Exception('Unknown order type "{}"!'.format(order_type))
+
+        self.orders.append((order_type, parameters))
+
+        return self
+
+    def add_increase(self, **parameters):
+        return self.add('increase', **parameters)
+
+    def add_decrease(self, **parameters):
+        return self.add('decrease', **parameters)
+
+    def add_swap(self, **parameters):
+        return self.add('swap', **parameters)
+
+    def build(self):
+        """
+        Build every order and pack them into transactions, without approving or sending anything
+
+        Returns
+        -------
+        transactions : list
+            dictionary of multicall_args, value, execution_fee, gas and the indices of the orders
+            in the transaction, for each transaction.
+
+        """
+        if not self.orders:
+            raise Exception("No orders to build!")
+
+        self._order_objects = submit_many(self._build_order, self.orders)
+
+        transactions = []
+        for index, order_object in enumerate(self._order_objects):
+            built_order = order_object.built_order
+
+            if built_order['gas'] > self.max_gas:
+                raise Exception(
+                    "Order {} needs {} gas, more than the batch limit of {}!".format(
+                        index, built_order['gas'], self.max_gas
+                    )
+                )
+
+            if not transactions or transactions[-1]['gas'] + built_order['gas'] > self.max_gas:
+                transactions.append(
+                    {
+                        'multicall_args': [],
+                        'value': 0,
+                        'execution_fee': 0,
+                        'gas': 0,
+                        'orders': []
+                    }
+                )
+
+            transaction = transactions[-1]
+            transaction['multicall_args'] += built_order['multicall_args']
+            transaction['value'] += built_order['value']
+            transaction['execution_fee'] += built_order['execution_fee']
+            transaction['gas'] += built_order['gas']
+            transaction['orders'].append(index)
+
+        return transactions
+
+    def submit(self):
+        """
+        Approve the collateral of every order at once, then build and send the batch
+
+        Returns
+        -------
+        tx_hashes : list
+            hash of each transaction sent.
+
+        """
+        self.check_for_approval()
+
+        transactions = self.build()
+        self.log.info("Submitting {} orders in {} transactions".format(
+            len(self.orders), len(transactions)
+        ))
+
+        # every transaction goes to the same exchange router, send them through the first order
+        order = self._order_objects[0]
+        user_wallet_address = get_config()['user_wallet_address']
+
+        tx_hashes = []
+        for transaction in transactions:
+            gas = transaction['gas']
+            if self.estimate_gas:
+                gas = order._estimate_gas(
+                    user_wallet_address,
+                    transaction['value'],
+                    transaction['multicall_args'],
+                    transaction['gas']
+                )
+            tx_hashes.append(
+                order._submit_transaction(
+                    user_wallet_address,
+                    transaction['value'],
+                    transaction['multicall_args'],
+                    order._gas_limits,
+                    gas=gas
+                )
+            )
+
+        return tx_hashes
+
+    def simulate(self):
+        """
+        Build the batch and run each transaction through eth_call and estimateGas, without
+        approving or sending anything
+
+        Returns
+        -------
+        transactions : list
+            transactions as returned by build, each with the result of
+            Order.simulate_transaction under simulation.
+
+        """
+        transactions = self.build()
+
+        order = self._order_objects[0]
+        user_wallet_address = get_config()['user_wallet_address']
+
+        simulations = submit_many(
+            lambda transaction: order.simulate_transaction(
+                user_wallet_address,
+                transaction['value'],
+                transaction['multicall_args']
+            ),
+            transactions
+        )
+
+        for transaction, simulation in zip(transactions, simulations):
+            transaction['simulation'] = simulation
+
+        return transactions
+
+    def check_for_approval(self):
+        """
+        Check the router is approved to spend the combined collateral of the orders which send
+        tokens, approving it if not
+        """
+        amounts = {}
+        for order_type, parameters in self.orders:
+            if order_type == 'decrease':
+                continue
+
+            token = parameters['collateral_address']
+            amounts[token] = amounts.get(token, 0) + parameters['initial_collateral_delta_amount']
+
+        for token, amount in amounts.items():
+            get_order_context(self.chain).check_for_approval(token, amount)
+
+    def _build_order(self, order):
+        """
+        Build one order without submitting it
+        """
+        order_type, parameters = order
+
+        return ORDER_CLASSES[order_type](chain=self.chain, submit=False, **parameters)
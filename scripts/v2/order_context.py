@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:21:09 2026
+
+@author: snipermonke01
+"""
+
+import logging
+import threading
+import time
+
+from web3 import Web3
+
+from .approve_token_for_spend import check_if_approved
+from .gas_utils import get_gas_limits, get_execution_fee
+from .get_markets import GetMarkets
+from .gmx_utils import (
+    contract_map, create_connection, create_signer, get_config, get_datastore_contract,
+    get_exchange_router_contract, get_token_contract, submit_many
+)
+
+# seconds each prefetched value is reused for before it is read again
+ORDER_CONTEXT_TTLS = {
+    'gas_limits': 300,
+    'gas_price': 5,
+    'allowances': 60
+}
+
+# seconds between refreshes of a started context
+ORDER_CONTEXT_REFRESH_INTERVAL = 4
+
+
+class OrderContext:
+    """
+    Warm state needed to build and sign orders on one chain: contracts, the signer, gas limits,
+    gas price and allowances. Everything but the oracle prices is read once and reused until its
+    ttl has passed, so building an order only needs a fresh price lookup. Markets come from the
+    cache of GetMarkets, which revalidates them when new markets are created.
+
+    The context can also be started, refreshing the gas price, gas limits and markets in a
+    background thread so they are never stale when an order is built.
+    """
+
+    def __init__(self, chain: str, ttls: dict = None):
+
+        self.chain = chain
+        self.ttls = dict(ORDER_CONTEXT_TTLS, **(ttls or {}))
+
+        self.connection = create_connection(chain=chain)
+        self.exchange_router = get_exchange_router_contract(chain=chain)
+        self.datastore = get_datastore_contract(chain)
+        self.signer = create_signer(chain)
+        self.user_wallet_address = Web3.to_checksum_address(get_config()['user_wallet_address'])
+        self.spender = Web3.to_checksum_address(
+            contract_map[chain]["syntheticsrouter"]['contract_address']
+        )
+
+        # name -> (value, fetched at)
+        self._values = {}
+        # token address -> (allowance not yet used by orders, fetched at)
+        self._allowances = {}
+        self._lock = threading.Lock()
+
+        self._refresh_thread = None
+        self._stop_event = threading.Event()
+
+        self.log = logging.getLogger(__name__)
+
+    def refresh(self, tokens: list = None):
+        """
+        Read the gas limits, gas price and markets, and the allowances of any tokens given,
+        concurrently
+
+        Parameters
+        ----------
+        tokens : list, optional
+            collateral token addresses to read allowances of. The default is None.
+
+        Returns
+        -------
+        OrderContext
+            the refreshed context.
+
+        """
+        loaders = [
+            lambda: self._store('gas_limits', get_gas_limits(self.datastore)),
+            lambda: self._store('gas_price', self.connection.eth.gas_price),
+            # warms the markets cache of GetMarkets
+            lambda: GetMarkets(chain=self.chain).get_available_markets()
+        ]
+        loaders += [
+            lambda token=token: self._store_allowance(token, self._fetch_allowance(token))
+            for token in tokens or []
+        ]
+
+        submit_many(lambda loader: loader(), loaders)
+
+        return self
+
+    def start(self, interval: float = ORDER_CONTEXT_REFRESH_INTERVAL):
+        """
+        Keep the context warm by refreshing it every interval seconds in a background thread
+
+        Parameters
+        ----------
+        interval : float, optional
+            seconds between refreshes. The default is ORDER_CONTEXT_REFRESH_INTERVAL.
+
+        Returns
+        -------
+        OrderContext
+            the started context.
+
+        """
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return self
+
+        self._stop_event.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._run_refresh,
+            args=(interval,),
+            name="gmx-sdk-order-context-{}".format(self.chain),
+            daemon=True
+        )
+        self._refresh_thread.start()
+
+        return self
+
+    def stop(self):
+        """
+        Stop refreshing the context in the background
+        """
+        self._stop_event.set()
+
+    def get_gas_limits(self):
+        return self._get('gas_limits', lambda: get_gas_limits(self.datastore))
+
+    def get_gas_price(self):
+        return self._get('gas_price', lambda: self.connection.eth.gas_price)
+
+    def get_markets(self):
+        return GetMarkets(chain=self.chain).get_available_markets()
+
+    def get_execution_fee(self, order_type: str, multiplier: float = 1):
+        """
+        Execution fee of an order from the cached gas limits and gas price
+
+        Parameters
+        ----------
+        order_type : str
+            key of the order type in the gas limits, eg increase_order.
+        multiplier : float, optional
+            buffer to apply on top of the minimum fee. The default is 1.
+
+        Returns
+        -------
+        int
+            execution fee in wei.
+
+        """
+        gas_limits = self.get_gas_limits()
+
+        return int(
+            int(get_execution_fee(gas_limits, gas_limits[order_type], self.get_gas_price())) *
+            multiplier
+        )
+
+    def check_for_approval(self, token: str, amount: int):
+        """
+        Check the router can spend amount of a token for an order, approving it if not. The
+        allowance read is cached and reduced by every order it covers, so while a larger
+        approval lasts no RPC call is made. The token balance is only checked when the allowance
+        is read or approved.
+
+        Parameters
+        ----------
+        token : str
+            address of the collateral token.
+        amount : int
+            amount of tokens the order sends, in expanded decimals.
+
+        """
+        token = Web3.to_checksum_address(token)
+
+        if self._use_allowance(token, amount):
+            return
+
+        self._store_allowance(token, self._fetch_allowance(token))
+        if self._use_allowance(token, amount):
+            return
+
+        # approves exactly amount, which the order then uses up
+        check_if_approved(self.chain, self.spender, token, amount, approve=True)
+        self._store_allowance(token, 0)
+
+    def sign_transaction(self, raw_txn: dict):
+        return self.signer.sign_transaction(raw_txn)
+
+    def _get(self, name: str, loader):
+        """
+        Cached value if younger than its ttl, else loaded again
+        """
+        with self._lock:
+            entry = self._values.get(name)
+
+        if entry is not None and time.monotonic() - entry[1] < self.ttls[name]:
+            return entry[0]
+
+        return self._store(name, loader())
+
+    def _store(self, name: str, value):
+        with self._lock:
+            self._values[name] = (value, time.monotonic())
+
+        return value
+
+    def _fetch_allowance(self, token: str):
+        token_contract_obj = get_token_contract(self.chain, token, 'token_approval.json')
+
+        return token_contract_obj.functions.allowance(
+            self.user_wallet_address,
+            self.spender
+        ).call()
+
+    def _store_allowance(self, token: str, allowance: int):
+        with self._lock:
+            self._allowances[Web3.to_checksum_address(token)] = (allowance, time.monotonic())
+
+    def _use_allowance(self, token: str, amount: int):
+        """
+        Take amount from the cached allowance of a token if it is fresh and covers it
+        """
+        with self._lock:
+            entry = self._allowances.get(token)
+
+            if entry is None or time.monotonic() - entry[1] >= self.ttls['allowances']:
+                return False
+
+            allowance, fetched_at = entry
+            if allowance < amount:
+                return False
+
+            self._allowances[token] = (allowance - amount, fetched_at)
+
+            return True
+
+    def _run_refresh(self, interval: float):
+        while not self._stop_event.wait(interval):
+            try:
+                self.refresh()
+
+            # keep the thread alive, the cached values are used until the next refresh works
+            except Exception as e:
+                self.log.warning("Failed to refresh order context on {}: {}".format(
+                    self.chain, e
+                ))
+
+
+_order_contexts = {}
+_order_contexts_lock = threading.Lock()
+
+
+def get_order_context(chain: str):
+    """
+    Get the order context shared by every order on a chain
+
+    Parameters
+    ----------
+    chain : str
+        arbitrum or avalanche.
+
+    Returns
+    -------
+    OrderContext
+        order context of the chain.
+
+    """
+    with _order_contexts_lock:
+        if chain not in _order_contexts:
+            _order_contexts[chain] = OrderContext(chain)
+
+        return _order_contexts[chain]
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:41:09 2026
+
+@author: snipermonke01
+"""
+
+import os
+import threading
+import time
+
+import pandas as pd
+
+from .gmx_utils import base_dir
+
+# pyarrow is optional, without it partitions are stored as csv
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+TIMESERIES_DIR = os.path.join(base_dir, 'data_store', 'timeseries')
+
+_partition_locks = {}
+_partition_locks_lock = threading.Lock()
+
+
+def _get_partition_lock(path: str):
+    with _partition_locks_lock:
+        return _partition_locks.setdefault(path, threading.Lock())
+
+
+def to_utc_timestamp(value):
+    """
+    Convert a datetime, string or pd.Timestamp to a UTC pd.Timestamp, naive values are taken to
+    be UTC
+    """
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        return timestamp.tz_localize('UTC')
+
+    return timestamp.tz_convert('UTC')
+
+
+class TimeSeriesStore:
+    """
+    Append only store of metric rows, partitioned on disk as
+
+        {root}/{chain}/{metric}/{YYYY-MM-DD}/part-*.parquet (or .csv)
+
+    Every append writes a new parquet part, or appends to the latest csv part, so a write never
+    reads or rewrites earlier rows. Rows can add columns over time, eg when markets are added,
+    reading aligns the columns of every part. When the first row of a new day is appended to a
+    metric, its past days are compacted into one part each so reads of past days open one file
+    per day, unless the store was created with auto_compact=False.
+    """
+
+    def __init__(
+        self, root: str = TIMESERIES_DIR, file_format: str = None, auto_compact: bool = True
+    ):
+
+        if file_format is None:
+            file_format = 'csv' if pq is None else 'parquet'
+
+        if file_format not in ('parquet', 'csv'):
+            raise Exception('Unknown time series file format "{}"!'.format(file_format))
+
+        if file_format == 'parquet' and pq is None:
+            raise Exception("pyarrow is required to store time series as parquet!")
+
+        self.root = root
+        self.file_format = file_format
+        self.auto_compact = auto_compact
+
+    def append(self, chain: str, metric: str, data, timestamp=None):
+        """
+        Append a row of data, eg {market symbol: value}, or a dataframe of rows to a metric
+
+        Parameters
+        ----------
+        chain : str
+            chain the data is from.
+        metric : str
+            name of the metric, eg long_open_interest.
+        data : dict or pd.DataFrame
+            row or rows to append.
+        timestamp : datetime, optional
+            time of the row. The default is None, which uses the timestamp column of data or
+            else the current time.
+
+        Returns
+        -------
+        str
+            path of the last part rows were written to.
+
+        """
+        if isinstance(data, pd.DataFrame):
+            dataframe = data.copy()
+        else:
+            dataframe = pd.DataFrame(data, index=[0])
+
+        if timestamp is not None or 'timestamp' not in dataframe:
+            dataframe['timestamp'] = pd.Timestamp.now(tz='UTC') if timestamp is None \
+                else to_utc_timestamp(timestamp)
+
+        dataframe['timestamp'] = pd.to_datetime(dataframe['timestamp'], utc=True)
+
+        path = None
+        new_days = []
+
+        # write each day of rows to its own partition
+        for day, rows in dataframe.groupby(dataframe['timestamp'].dt.strftime('%Y-%m-%d')):
+            partition_dir = self._get_partition_dir(chain, metric, day)
+            if not os.path.isdir(partition_dir):
+                new_days.append(day)
+
+            path = self._append_partition(partition_dir, rows)
+
+        if self.auto_compact and new_days:
+            self.compact_past_days(chain, metric, before=max(new_days))
+
+        return path
+
+    def read(self, chain: str, metric: str, start=None, end=None, columns: list = None):
+        """
+        Read the rows of a metric between start and end, only the partitions of days in the range
+        are opened
+
+        Parameters
+        ----------
+        chain : str
+            chain the data is from.
+        metric : str
+            name of the metric.
+        start : datetime, optional
+            earliest row to read. The default is None, which reads from the first row.
+        end : datetime, optional
+            latest row to read. The default is None, which reads up to the last row.
+        columns : list, optional
+            columns to read, eg market symbols. The default is None, which reads every column.
+
+        Returns
+        -------
+        pd.DataFrame
+            rows sorted by timestamp.
+
+        """
+        if start is not None:
+            start = to_utc_timestamp(start)
+        if end is not None:
+            end = to_utc_timestamp(end)
+
+        frames = []
+        for day in self.get_days(chain, metric):
+
+            if start is not None and day < start.strftime('%Y-%m-%d'):
+                continue
+            if end is not None and day > end.strftime('%Y-%m-%d'):
+                continue
+
+            partition_dir = self._get_partition_dir(chain, metric, day)
+            for part in self._get_parts(partition_dir):
+                frames.append(self._read_part(os.path.join(partition_dir, part), columns))
+
+        if not frames:
+            return pd.DataFrame(columns=['timestamp'] + (columns or []))
+
+        dataframe = pd.concat(frames, ignore_index=True)
+        dataframe['timestamp'] = pd.to_datetime(dataframe['timestamp'], utc=True)
+
+        if start is not None:
+            dataframe = dataframe[dataframe['timestamp'] >= start]
+        if end is not None:
+            dataframe = dataframe[dataframe['timestamp'] <= end]
+
+        return dataframe.sort_values('timestamp').reset_index(drop=True)
+
+    def get_metrics(self, chain: str):
+        """
+        Names of the metrics stored for a chain
+        """
+        chain_dir = os.path.join(self.root, chain)
+        if not os.path.isdir(chain_dir):
+            return []
+
+        return sorted(os.listdir(chain_dir))
+
+    def get_days(self, chain: str, metric: str):
+        """
+        Days, as YYYY-MM-DD, that a metric has rows for
+        """
+        metric_dir = os.path.join(self.root, chain, metric)
+        if not os.path.isdir(metric_dir):
+            return []
+
+        return sorted(os.listdir(metric_dir))
+
+    def get_files(self, chain: str, metric: str):
+        """
+        Paths of every part of a metric, in the order they were written
+        """
+        files = []
+        for day in self.get_days(chain, metric):
+            partition_dir = self._get_partition_dir(chain, metric, day)
+            files.extend(
+                os.path.join(partition_dir, part) for part in self._get_parts(partition_dir)
+            )
+
+        return files
+
+    def compact(self, chain: str, metric: str, day: str):
+        """
+        Merge every part of a day into one part, eg once the day has passed so reads open one
+        file per day
+
+        Parameters
+        ----------
+        chain : str
+            chain the data is from.
+        metric : str
+            name of the metric.
+        day : str
+            day to compact, as YYYY-MM-DD.
+
+        """
+        partition_dir = self._get_partition_dir(chain, metric, day)
+
+        with _get_partition_lock(partition_dir):
+            parts = self._get_parts(partition_dir)
+            if len(parts) < 2:
+                return
+
+            dataframe = pd.concat(
+                [self._read_part(os.path.join(partition_dir, part)) for part in parts],
+                ignore_index=True
+            )
+
+            # write the compacted part before removing the old ones so no rows are ever missing
+            self._write_part(partition_dir, dataframe.sort_values('timestamp'))
+            for part in parts:
+                os.remove(os.path.join(partition_dir, part))
+
+    def compact_past_days(self, chain: str, metric: str, before: str = None):
+        """
+        Compact every day of a metric before the given day which has more than one part
+
+        Parameters
+        ----------
+        chain : str
+            chain the data is from.
+        metric : str
+            name of the metric.
+        before : str, optional
+            first day not to compact, as YYYY-MM-DD. The default is None, which is today in UTC.
+
+        """
+        if before is None:
+            before = pd.Timestamp.now(tz='UTC').strftime('%Y-%m-%d')
+
+        for day in self.get_days(chain, metric):
+            if day < before:
+                self.compact(chain, metric, day)
+
+    def _get_partition_dir(self, chain: str, metric: str, day: str):
+        return os.path.join(self.root, chain, metric, day)
+
+    def _get_parts(self, partition_dir: str):
+        """
+        Part files of a partition in the order they were written
+        """
+        if not os.path.isdir(partition_dir):
+            return []
+
+        return sorted(
+            part for part in os.listdir(partition_dir)
+            if part.startswith('part-') and part.endswith(('.parquet', '.csv'))
+        )
+
+    def _get_part_name(self):
+        # zero padded nanoseconds so names sort in the order they were written
+        return "part-{:020d}-{}.{}".format(time.time_ns(), os.getpid(), self.file_format)
+
+    def _append_partition(self, partition_dir: str, dataframe):
+        with _get_partition_lock(partition_dir):
+            os.makedirs(partition_dir, exist_ok=True)
+
+            if self.file_format == 'csv':
+                parts = [part for part in self._get_parts(partition_dir) if part.endswith('.csv')]
+
+                # append to the latest part unless the rows add columns
+                if parts:
+                    path = os.path.join(partition_dir, parts[-1])
+                    part_columns = list(pd.read_csv(path, nrows=0).columns)
+                    if set(dataframe.columns).issubset(part_columns):
+                        dataframe.reindex(columns=part_columns).to_csv(
+                            path, mode='a', header=False, index=False
+                        )
+                        return path
+
+            return self._write_part(partition_dir, dataframe)
+
+    def _write_part(self, partition_dir: str, dataframe):
+        path = os.path.join(partition_dir, self._get_part_name())
+        tmp_path = path + ".tmp"
+
+        # write to a temporary file first so readers never see a half written part
+        if self.file_format == 'parquet':
+            pq.write_table(pa.Table.from_pandas(dataframe, preserve_index=False), tmp_path)
+        else:
+            dataframe.to_csv(tmp_path, index=False)
+
+        os.replace(tmp_path, path)
+
+        return path
+
+    def _read_part(self, path: str, columns: list = None):
+        if path.endswith('.parquet'):
+            if columns is not None:
+                part_columns = pq.read_schema(path).names
+                columns = ['timestamp'] + [
+                    column for column in columns if column in part_columns
+                ]
+            return pq.read_table(path, columns=columns).to_pandas()
+
+        if columns is not None:
+            part_columns = list(pd.read_csv(path, nrows=0).columns)
+            columns = ['timestamp'] + [column for column in columns if column in part_columns]
+
+        return pd.read_csv(path, usecols=columns)
+
+
+if __name__ == "__main__":
+
+    store = TimeSeriesStore()
+    store.append("arbitrum", "long_open_interest", {"ETH": 1000000, "BTC": 2000000})
+    history = store.read("arbitrum", "long_open_interest", columns=["ETH"])
@@ -0,0 +1,54 @@
+import pytest
+
+import get_gmx_stats
+from get_gmx_stats import GetGMXv2Stats
+
+
+class FakeSnapshot:
+    refreshes = []
+
+    def __init__(self, chain):
+        self.chain = chain
+        self.markets = {}
+        self.oracle_prices = {}
+
+    def refresh(self):
+        FakeSnapshot.refreshes.append(self.chain)
+        return self
+
+    def get_open_interest(self):
+        return {'long': {'ETH': 1}, 'short': {'ETH': 2}}
+
+    def get_gm_prices(self):
+        return {'ETH': 1.5}
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    FakeSnapshot.refreshes = []
+    monkeypatch.setattr(get_gmx_stats, "MarketSnapshot", FakeSnapshot)
+
+    # every snapshot is stale as soon as it is read
+    return GetGMXv2Stats(to_json=False, to_csv=False, snapshot_max_age=0)
+
+
+def test_collect_all_derives_every_stat_from_one_snapshot_per_chain(stats):
+    collected = stats.collect_all(
+        chains=["arbitrum", "avalanche"], metrics=["open_interest", "gm_prices"]
+    )
+
+    assert sorted(FakeSnapshot.refreshes) == ["arbitrum", "avalanche"]
+    assert collected["arbitrum"]["gm_prices"] == {'ETH': 1.5}
+    assert collected["avalanche"]["open_interest"]["short"] == {'ETH': 2}
+
+
+def test_getters_still_refresh_stale_snapshots_after_collect_all(stats):
+    stats.collect_all(chains=["arbitrum"], metrics=["open_interest"])
+    stats.get_gm_price("arbitrum")
+
+    assert FakeSnapshot.refreshes == ["arbitrum", "arbitrum"]
+
+
+def test_collect_all_rejects_unknown_stats(stats):
+    with pytest.raises(Exception, match="Unknown stat"):
+        stats.collect_all(chains=["arbitrum"], metrics=["volume"])
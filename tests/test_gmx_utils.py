@@ -0,0 +1,272 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from scripts.v2.gmx_utils import (
+    BatchingHTTPProvider, RateLimitError, RPCScheduler, TokenBucket, submit_many
+)
+
+
+class FakeResponse:
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.status_code = 200
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """
+    Answers every request with its own params as the result, batches in reverse order
+    """
+
+    def __init__(self, drop_ids=()):
+        self.posts = []
+        self.drop_ids = drop_ids
+
+    def post(self, endpoint_uri, data, **kwargs):
+        self.posts.append(data)
+        request = json.loads(data)
+
+        if isinstance(request, dict):
+            return FakeResponse(json.dumps(self._answer(request)).encode())
+
+        responses = [
+            self._answer(item) for item in reversed(request) if item['id'] not in self.drop_ids
+        ]
+        return FakeResponse(json.dumps(responses).encode())
+
+    def _answer(self, request):
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': request['params']}
+
+
+class FlakyCall:
+    """
+    Raises each of errors in turn, then returns the number of calls made
+    """
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+        return self.calls
+
+
+def make_concurrent_requests(provider, count):
+    results = [None] * count
+
+    def make_request(i):
+        try:
+            results[i] = provider.make_request('eth_call', [i])
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=make_request, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+def test_batch_responses_are_routed_by_id():
+    session = FakeSession()
+    provider = BatchingHTTPProvider('http://rpc', session, flush_window=1, max_batch_size=4)
+
+    results = make_concurrent_requests(provider, 4)
+
+    assert len(session.posts) == 1
+    assert [result['result'] for result in results] == [[0], [1], [2], [3]]
+
+    provider.close()
+
+
+def test_missing_batch_response_fails_only_its_request():
+    session = FakeSession(drop_ids={1})
+    provider = BatchingHTTPProvider('http://rpc', session, flush_window=1, max_batch_size=3)
+
+    results = make_concurrent_requests(provider, 3)
+
+    failed = [result for result in results if isinstance(result, Exception)]
+    assert len(failed) == 1
+    assert "No response to batched request 1" in str(failed[0])
+
+    provider.close()
+
+
+def test_closed_provider_sends_requests_one_by_one():
+    session = FakeSession()
+    provider = BatchingHTTPProvider('http://rpc', session)
+    provider.close()
+
+    assert provider.make_request('eth_call', [7])['result'] == [7]
+    assert json.loads(session.posts[0])['params'] == [7]
+
+
+def test_token_bucket_allows_a_burst_then_refills():
+    bucket = TokenBucket(rate=20, capacity=2)
+
+    assert bucket.acquire()
+    assert bucket.acquire()
+
+    # the next token is 0.05 seconds away
+    assert not bucket.acquire(deadline=time.monotonic() + 0.01)
+
+    start = time.monotonic()
+    assert bucket.acquire()
+    assert time.monotonic() - start >= 0.03
+
+
+def test_scheduler_retries_transient_errors():
+    scheduler = RPCScheduler(requests_per_second=1000, base_backoff=0.001)
+    call = FlakyCall(RateLimitError("Rate limited"), RateLimitError("Rate limited"))
+
+    assert scheduler.run(call) == 3
+
+
+def test_scheduler_does_not_retry_other_errors():
+    scheduler = RPCScheduler(requests_per_second=1000, base_backoff=0.001)
+
+    call = FlakyCall(ValueError("execution reverted"))
+    with pytest.raises(ValueError):
+        scheduler.run(call)
+    assert call.calls == 1
+
+    call = FlakyCall(RateLimitError("Rate limited"))
+    with pytest.raises(RateLimitError):
+        scheduler.run(call, retry=False)
+    assert call.calls == 1
+
+
+def test_scheduler_gives_up_after_max_retries():
+    scheduler = RPCScheduler(requests_per_second=1000, max_retries=2, base_backoff=0.001)
+    call = FlakyCall(*[RateLimitError("Rate limited")] * 3)
+
+    with pytest.raises(RateLimitError):
+        scheduler.run(call)
+    assert call.calls == 3
+
+
+def test_scheduler_halves_concurrency_when_throttled_and_grows_it_on_success():
+    scheduler = RPCScheduler(
+        requests_per_second=1000, max_concurrency=8, min_concurrency=2, max_retries=0
+    )
+
+    with pytest.raises(RateLimitError):
+        scheduler.run(FlakyCall(RateLimitError("Rate limited")))
+    assert scheduler.concurrency == 4
+
+    # errors which are not throttling leave concurrency alone
+    with pytest.raises(ValueError):
+        scheduler.run(FlakyCall(ValueError("execution reverted")))
+    assert scheduler.concurrency == 4
+
+    scheduler.run(FlakyCall())
+    assert scheduler.concurrency == 4.25
+
+    for _ in range(3):
+        with pytest.raises(RateLimitError):
+            scheduler.run(FlakyCall(RateLimitError("Rate limited")))
+    assert scheduler.concurrency == 2
+
+
+def test_submit_many_keeps_the_order_of_items():
+    # later items finish first
+    results = submit_many(lambda i: time.sleep(0.05 - i * 0.01) or i, range(5))
+
+    assert results == [0, 1, 2, 3, 4]
+
+
+def test_submit_many_times_out():
+    with pytest.raises(TimeoutError):
+        submit_many(time.sleep, [0, 1], timeout=0.1)
+
+    results = submit_many(lambda i: time.sleep(i) or i, [0, 1], timeout=0.1, return_partial=True)
+    assert results == [0, None]
+
+    # a single item is not run inline when there is a timeout
+    with pytest.raises(TimeoutError):
+        submit_many(time.sleep, [1], timeout=0.1)
+
+
+def test_submit_many_returns_partial_results_of_failed_items():
+    def function(i):
+        if i == 1:
+            raise ValueError("failed")
+        return i
+
+    with pytest.raises(ValueError):
+        submit_many(function, range(3))
+
+    assert submit_many(function, range(3), return_partial=True) == [0, None, 2]
+
+
+def test_nested_submit_many_runs_in_parallel():
+    def inner(i):
+        time.sleep(0.2)
+        return i
+
+    def outer(i):
+        return submit_many(inner, [i, i + 1])
+
+    start = time.monotonic()
+    results = submit_many(outer, [0, 10, 20])
+
+    assert results == [[0, 1], [10, 11], [20, 21]]
+    assert time.monotonic() - start < 0.5
+
+
+def test_third_level_of_submit_many_runs_inline():
+    def third(i):
+        return threading.current_thread().name
+
+    def second(i):
+        return submit_many(third, [i, i])
+
+    names = submit_many(lambda i: submit_many(second, [i, i]), [0, 1])
+
+    # each third level call ran on the nested worker which started it
+    for first_level in names:
+        for second_level in first_level:
+            assert len(set(second_level)) == 1
+            assert "nested" in second_level[0]
+
+
+def test_async_callers_wait_for_a_released_slot():
+    scheduler = RPCScheduler(requests_per_second=1000, max_concurrency=1)
+    scheduler._acquire(time.monotonic() + 1)
+
+    async def acquire_slot():
+        await scheduler._aacquire(time.monotonic() + 1)
+        return time.monotonic()
+
+    releaser = threading.Timer(0.1, scheduler._release)
+    start = time.monotonic()
+    releaser.start()
+
+    acquired_at = asyncio.run(acquire_slot())
+
+    assert 0.09 <= acquired_at - start < 0.5
+    assert scheduler._in_flight == 1
+
+
+def test_async_callers_time_out_waiting_for_a_slot():
+    scheduler = RPCScheduler(requests_per_second=1000, max_concurrency=1)
+    scheduler._acquire(time.monotonic() + 1)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(scheduler._aacquire(time.monotonic() + 0.05))
+
+    assert scheduler._async_waiters == []
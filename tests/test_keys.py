@@ -0,0 +1,42 @@
+from scripts.v2.keys import get_market_key_index, pool_amount_key
+
+
+def make_markets(*market_keys):
+    return {
+        market_key: {
+            'long_token_address': '0x' + '1' * 40,
+            'short_token_address': '0x' + '2' * 40
+        }
+        for market_key in market_keys
+    }
+
+
+MARKET_A = '0x' + 'a' * 40
+MARKET_B = '0x' + 'b' * 40
+
+
+def test_key_index_is_reused_for_the_same_market_set():
+    key_index = get_market_key_index("arbitrum", make_markets(MARKET_A))
+
+    assert get_market_key_index("arbitrum", make_markets(MARKET_A)) is key_index
+    assert key_index.get(MARKET_A, "pool_amount_long") == pool_amount_key(
+        MARKET_A, '0x' + '1' * 40
+    )
+
+
+def test_key_index_is_kept_per_chain():
+    arbitrum_index = get_market_key_index("arbitrum", make_markets(MARKET_A))
+    avalanche_index = get_market_key_index("avalanche", make_markets(MARKET_B))
+
+    assert get_market_key_index("arbitrum", make_markets(MARKET_A)) is arbitrum_index
+    assert get_market_key_index("avalanche", make_markets(MARKET_B)) is avalanche_index
+
+
+def test_key_index_is_rebuilt_when_the_market_set_changes():
+    key_index = get_market_key_index("arbitrum", make_markets(MARKET_A))
+    new_index = get_market_key_index("arbitrum", make_markets(MARKET_A, MARKET_B))
+
+    assert new_index is not key_index
+    assert new_index.get(MARKET_B, "pool_amount_short") == pool_amount_key(
+        MARKET_B, '0x' + '2' * 40
+    )
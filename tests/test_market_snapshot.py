@@ -0,0 +1,91 @@
+import pytest
+
+from scripts.v2 import market_snapshot
+from scripts.v2.market_snapshot import MarketSnapshot, SNAPSHOT_METRICS
+
+
+class FakeGetter:
+    def __init__(self, chain):
+        pass
+
+    def get_available_markets(self):
+        return {}
+
+    def get_recent_prices(self):
+        return {}
+
+
+class FakeConnection:
+    class eth:
+        block_number = 100
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    monkeypatch.setattr(market_snapshot, "GetMarkets", FakeGetter)
+    monkeypatch.setattr(market_snapshot, "GetOraclePrices", FakeGetter)
+    monkeypatch.setattr(market_snapshot, "create_connection", lambda chain: FakeConnection)
+
+    multicall_rounds = []
+
+    def execute_multicall_groups(*call_groups, block_identifier=None):
+        multicall_rounds.append(call_groups)
+        return [[] for _ in call_groups]
+
+    monkeypatch.setattr(market_snapshot, "execute_multicall_groups", execute_multicall_groups)
+
+    snapshot = MarketSnapshot(chain="arbitrum")
+    snapshot.multicall_rounds = multicall_rounds
+
+    # builders return one empty call group per metric rather than reading contracts
+    builders = {
+        '_open_interest': '_build_open_interest_queries',
+        '_borrow_apr': '_build_borrow_apr_queries',
+        '_gm_prices': '_build_gm_price_queries',
+        '_claimable_fees': '_build_claimable_fees_queries',
+        '_pool_tvl': '_build_pool_balance_queries',
+        '_funding_apr': '_build_funding_apr_queries',
+        '_available_liquidity': '_build_available_liquidity_queries'
+    }
+    for stats, builder in builders.items():
+        monkeypatch.setattr(getattr(snapshot, stats), builder, lambda *args: {'calls': [[]]})
+
+    monkeypatch.setattr(
+        snapshot._open_interest, '_process_open_interest', lambda queries, outputs: {}
+    )
+
+    return snapshot
+
+
+def test_refresh_reads_every_metric_by_default(snapshot):
+    snapshot.refresh()
+
+    assert set(snapshot._queries) == set(SNAPSHOT_METRICS)
+    assert len(snapshot.multicall_rounds) == 2
+
+
+def test_refresh_only_reads_the_given_metrics(snapshot):
+    snapshot.refresh(metrics=['borrow_apr', 'gm_prices'])
+
+    assert set(snapshot._queries) == {'borrow_apr', 'gm_prices'}
+    assert len(snapshot.multicall_rounds) == 1
+
+    with pytest.raises(Exception, match="without"):
+        snapshot.get_pool_tvl()
+
+
+def test_refresh_reads_open_interest_for_second_round_metrics(snapshot):
+    snapshot.refresh(metrics=['funding_apr'])
+
+    assert set(snapshot._queries) == {'open_interest', 'funding_apr'}
+    assert len(snapshot.multicall_rounds) == 2
+
+
+def test_refresh_rejects_unknown_metrics(snapshot):
+    with pytest.raises(Exception, match="Unknown snapshot metric"):
+        snapshot.refresh(metrics=['total_tvl'])
+
+
+def test_snapshot_must_be_refreshed_first(snapshot):
+    with pytest.raises(Exception, match="has not been refreshed"):
+        snapshot.get_open_interest()
@@ -0,0 +1,138 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.v2.metric_history import MetricHistory
+from scripts.v2.timeseries_store import TimeSeriesStore
+
+
+START = pd.Timestamp("2026-10-01 00:00", tz="UTC")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimeSeriesStore(root=str(tmp_path / "store"), file_format="csv")
+    for hour in range(6):
+        store.append(
+            "arbitrum",
+            "long_open_interest",
+            {"ETH": float(hour), "BTC": 10.0 * hour, "ARB": 100.0 * hour},
+            timestamp=START + pd.Timedelta(hours=hour)
+        )
+
+    return store
+
+
+def open_history(store, tmp_path, metric="long_open_interest"):
+    return MetricHistory("arbitrum", metric, store=store, cache_dir=str(tmp_path / "cache"))
+
+
+def test_history_is_memory_mapped(store, tmp_path):
+    history = open_history(store, tmp_path)
+
+    assert isinstance(history.values, np.memmap)
+    assert isinstance(history.timestamps, np.memmap)
+    assert history.symbols == ["ETH", "BTC", "ARB"]
+
+
+def test_get_returns_a_view_of_the_mapped_file(store, tmp_path):
+    history = open_history(store, tmp_path)
+
+    eth = history.get(
+        "ETH", start=START + pd.Timedelta(hours=1), end=START + pd.Timedelta(hours=3)
+    )
+
+    assert list(eth) == [1.0, 2.0, 3.0]
+    assert np.shares_memory(eth, history.values)
+
+
+def test_slice_of_adjacent_symbols_is_a_view(store, tmp_path):
+    history = open_history(store, tmp_path)
+
+    timestamps, values = history.slice(start=START + pd.Timedelta(hours=4), symbols=["BTC", "ARB"])
+
+    assert values.shape == (2, 2)
+    assert np.shares_memory(values, history.values)
+    assert np.shares_memory(timestamps, history.timestamps)
+    assert list(values[1]) == [400.0, 500.0]
+
+    # symbols which are not adjacent are copied
+    _, values = history.slice(symbols=["ETH", "ARB"])
+    assert not np.shares_memory(values, history.values)
+    assert list(values[1]) == [100.0 * hour for hour in range(6)]
+
+
+def test_to_dataframe(store, tmp_path):
+    history = open_history(store, tmp_path)
+
+    dataframe = history.to_dataframe(end=START + pd.Timedelta(hours=1), symbols=["BTC"])
+
+    assert list(dataframe.columns) == ["BTC"]
+    assert list(dataframe["BTC"]) == [0.0, 10.0]
+    assert dataframe.index[1] == START + pd.Timedelta(hours=1)
+
+
+def test_unknown_symbol_raises(store, tmp_path):
+    history = open_history(store, tmp_path)
+
+    with pytest.raises(Exception, match="No history"):
+        history.get("DOGE")
+
+
+def test_missing_metric_raises(store, tmp_path):
+    with pytest.raises(Exception, match="No history stored"):
+        open_history(store, tmp_path, metric="short_open_interest")
+
+
+def test_refresh_picks_up_appended_rows(store, tmp_path):
+    history = open_history(store, tmp_path)
+    signature = history._signature
+
+    # a refresh with nothing new keeps the same mapped version
+    assert history.refresh()._signature == signature
+
+    store.append(
+        "arbitrum",
+        "long_open_interest",
+        {"ETH": 6.0, "BTC": 60.0, "ARB": 600.0, "SOL": 1.0},
+        timestamp=START + pd.Timedelta(hours=6)
+    )
+    history.refresh()
+
+    assert history._signature != signature
+    assert len(history.timestamps) == 7
+    assert history.get("ETH")[-1] == 6.0
+    assert list(history.get("SOL")[-2:]) == [pytest.approx(np.nan, nan_ok=True), 1.0]
+
+
+@pytest.fixture
+def new_york_time(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_legacy_csv_local_timestamps_are_read_as_utc(tmp_path, monkeypatch, new_york_time):
+    legacy_csv = tmp_path / "arbitrum_long_open_interest.csv"
+    pd.DataFrame(
+        {
+            "ETH": [1.0, 2.0],
+            "timestamp": ["2026-10-01 12:00:00", "2026-12-01 12:00:00"]
+        }
+    ).to_csv(legacy_csv, index=False)
+    monkeypatch.setattr(MetricHistory, "_get_legacy_csv_path", lambda self: str(legacy_csv))
+
+    history = open_history(
+        TimeSeriesStore(root=str(tmp_path / "store"), file_format="csv"), tmp_path
+    )
+    dataframe = history.to_dataframe()
+
+    # New York is UTC-4 in October and UTC-5 after daylight saving time ends
+    assert list(dataframe.index) == [
+        pd.Timestamp("2026-10-01 16:00", tz="UTC"),
+        pd.Timestamp("2026-12-01 17:00", tz="UTC")
+    ]
@@ -0,0 +1,12 @@
+from scripts.v2.multicall import _split_groups
+
+
+def test_split_groups_into_group_sizes():
+    results = [1, 2, 3, 4, 5, 6]
+    groups = (['a'], ['b', 'c', 'd'], [], ['e', 'f'])
+
+    assert _split_groups(results, groups) == [[1], [2, 3, 4], [], [5, 6]]
+
+
+def test_split_groups_without_groups():
+    assert _split_groups([], ()) == []
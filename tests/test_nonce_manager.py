@@ -0,0 +1,115 @@
+import threading
+import time
+
+from scripts.v2.nonce_manager import NonceManager, is_nonce_error
+
+ADDRESS = '0x' + '1' * 40
+
+
+class StubEth:
+    def __init__(self, pending_count, delay):
+        self.pending_count = pending_count
+        self.delay = delay
+        self.calls = 0
+
+    def get_transaction_count(self, address, block_identifier):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.pending_count
+
+
+class StubConnection:
+    def __init__(self, pending_count=0, delay=0):
+        self.eth = StubEth(pending_count, delay)
+
+
+def make_manager(pending_count=0, delay=0):
+    connection = StubConnection(pending_count, delay)
+    return NonceManager("arbitrum", ADDRESS, connection=connection), connection
+
+
+def test_concurrent_reserves_get_distinct_nonces_from_one_sync():
+    manager, connection = make_manager(pending_count=7, delay=0.05)
+    nonces = []
+    nonces_lock = threading.Lock()
+
+    def reserve():
+        nonce = manager.reserve()
+        with nonces_lock:
+            nonces.append(nonce)
+
+    threads = [threading.Thread(target=reserve) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(nonces) == list(range(7, 17))
+    assert connection.eth.calls == 1
+
+
+def test_released_nonce_is_handed_out_again_first():
+    manager, connection = make_manager(pending_count=3)
+
+    first, second, third = manager.reserve(), manager.reserve(), manager.reserve()
+    manager.confirm(first)
+    manager.confirm(third)
+
+    # the transaction of the middle nonce failed to send, leaving a gap
+    manager.release(second, Exception("insufficient funds"))
+
+    assert manager.reserve() == second
+    assert manager.reserve() == 6
+    assert connection.eth.calls == 1
+
+
+def test_releasing_the_last_nonce_moves_the_next_nonce_back():
+    manager, _ = make_manager(pending_count=3)
+
+    nonce = manager.reserve()
+    manager.release(nonce)
+
+    assert manager.reserve() == nonce
+
+
+def test_nonce_error_resyncs_with_the_chain():
+    manager, connection = make_manager(pending_count=3)
+
+    nonce = manager.reserve()
+    assert nonce == 3
+
+    # the nonce was used outside of the manager
+    connection.eth.pending_count = 5
+    manager.release(nonce, Exception("nonce too low: next nonce 5, tx nonce 3"))
+
+    assert manager.reserve() == 5
+    assert connection.eth.calls == 2
+
+
+def test_sync_never_hands_out_a_reserved_nonce():
+    manager, _ = make_manager(pending_count=3)
+
+    reserved = [manager.reserve(), manager.reserve()]
+
+    # the node has not seen the reserved nonces yet
+    manager.sync()
+
+    assert manager.reserve() not in reserved
+
+
+def test_use_nonce_releases_the_nonce_when_sending_fails():
+    manager, _ = make_manager(pending_count=0)
+
+    try:
+        with manager.use_nonce() as nonce:
+            raise Exception("execution reverted")
+    except Exception:
+        pass
+
+    assert manager.reserve() == nonce
+
+
+def test_is_nonce_error():
+    assert is_nonce_error(Exception("Nonce too low"))
+    assert is_nonce_error(ValueError({'message': 'replacement transaction underpriced'}))
+    assert not is_nonce_error(Exception("insufficient funds for gas"))
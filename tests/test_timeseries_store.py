@@ -0,0 +1,137 @@
+import os
+
+import pandas as pd
+import pytest
+
+from scripts.v2.timeseries_store import TimeSeriesStore
+
+
+DAY_1 = pd.Timestamp("2026-10-01 12:00", tz="UTC")
+DAY_2 = pd.Timestamp("2026-10-02 12:00", tz="UTC")
+
+
+def get_parts(store, day, chain="arbitrum", metric="long_open_interest"):
+    return store._get_parts(store._get_partition_dir(chain, metric, day))
+
+
+def test_csv_appends_go_to_the_latest_part(tmp_path):
+    store = TimeSeriesStore(root=str(tmp_path), file_format="csv")
+
+    store.append("arbitrum", "long_open_interest", {"ETH": 1, "BTC": 2}, timestamp=DAY_1)
+    store.append(
+        "arbitrum", "long_open_interest", {"ETH": 3, "BTC": 4},
+        timestamp=DAY_1 + pd.Timedelta(hours=1)
+    )
+
+    assert len(get_parts(store, "2026-10-01")) == 1
+
+    history = store.read("arbitrum", "long_open_interest")
+    assert list(history['ETH']) == [1, 3]
+    assert list(history['BTC']) == [2, 4]
+
+
+def test_new_columns_start_a_new_part_and_reads_align_them(tmp_path):
+    store = TimeSeriesStore(root=str(tmp_path), file_format="csv")
+
+    store.append("arbitrum", "long_open_interest", {"ETH": 1}, timestamp=DAY_1)
+    store.append(
+        "arbitrum", "long_open_interest", {"ETH": 2, "ARB": 5},
+        timestamp=DAY_1 + pd.Timedelta(hours=1)
+    )
+
+    assert len(get_parts(store, "2026-10-01")) == 2
+
+    history = store.read("arbitrum", "long_open_interest")
+    assert list(history['ETH']) == [1, 2]
+    assert pd.isna(history['ARB'][0])
+    assert history['ARB'][1] == 5
+
+
+def test_past_days_are_compacted_when_a_new_day_is_appended(tmp_path):
+    store = TimeSeriesStore(root=str(tmp_path), file_format="csv")
+
+    store.append("arbitrum", "long_open_interest", {"ETH": 1}, timestamp=DAY_1)
+    store.append(
+        "arbitrum", "long_open_interest", {"ETH": 2, "ARB": 5},
+        timestamp=DAY_1 + pd.Timedelta(hours=1)
+    )
+    store.append("arbitrum", "long_open_interest", {"ETH": 3}, timestamp=DAY_2)
+
+    assert len(get_parts(store, "2026-10-01")) == 1
+    assert list(store.read("arbitrum", "long_open_interest")['ETH']) == [1, 2, 3]
+
+
+def test_past_days_are_kept_as_written_without_auto_compact(tmp_path):
+    store = TimeSeriesStore(root=str(tmp_path), file_format="csv", auto_compact=False)
+
+    store.append("arbitrum", "long_open_interest", {"ETH": 1}, timestamp=DAY_1)
+    store.append(
+        "arbitrum", "long_open_interest", {"ETH": 2, "ARB": 5},
+        timestamp=DAY_1 + pd.Timedelta(hours=1)
+    )
+    store.append("arbitrum", "long_open_interest", {"ETH": 3}, timestamp=DAY_2)
+
+    assert len(get_parts(store, "2026-10-01")) == 2
+
+    store.compact_past_days("arbitrum", "long_open_interest", before="2026-10-02")
+    assert len(get_parts(store, "2026-10-01")) == 1
+
+
+def test_read_a_range_of_columns_and_rows(tmp_path):
+    store = TimeSeriesStore(root=str(tmp_path), file_format="csv")
+
+    for hour in range(4):
+        store.append(
+            "arbitrum", "long_open_interest", {"ETH": hour, "BTC": 10 * hour},
+            timestamp=DAY_1 + pd.Timedelta(hours=hour)
+        )
+    store.append("arbitrum", "long_open_interest", {"ETH": 99, "BTC": 990}, timestamp=DAY_2)
+
+    history = store.read(
+        "arbitrum",
+        "long_open_interest",
+        start=DAY_1 + pd.Timedelta(hours=1),
+        end=DAY_1 + pd.Timedelta(hours=2),
+        columns=["ETH"]
+    )
+
+    assert set(history.columns) == {"timestamp", "ETH"}
+    assert list(history['ETH']) == [1, 2]
+
+    # a naive start is taken to be UTC and days before it are not opened
+    assert list(
+        store.read("arbitrum", "long_open_interest", start="2026-10-02")['ETH']
+    ) == [99]
+
+
+def test_reading_an_unknown_metric_returns_no_rows(tmp_path):
+    store = TimeSeriesStore(root=str(tmp_path), file_format="csv")
+
+    history = store.read("arbitrum", "short_open_interest", columns=["ETH"])
+
+    assert history.empty
+    assert list(history.columns) == ["timestamp", "ETH"]
+
+
+def test_parquet_parts_are_written_per_append_and_compacted(tmp_path):
+    pytest.importorskip("pyarrow")
+    store = TimeSeriesStore(root=str(tmp_path), file_format="parquet")
+
+    store.append("arbitrum", "long_open_interest", {"ETH": 1.0}, timestamp=DAY_1)
+    store.append(
+        "arbitrum", "long_open_interest", {"ETH": 2.0, "ARB": 5.0},
+        timestamp=DAY_1 + pd.Timedelta(hours=1)
+    )
+
+    parts = get_parts(store, "2026-10-01")
+    assert len(parts) == 2
+    assert all(part.endswith(".parquet") for part in parts)
+    assert list(
+        store.read("arbitrum", "long_open_interest", columns=["ARB"])['ARB'].fillna(0)
+    ) == [0, 5.0]
+
+    store.append("arbitrum", "long_open_interest", {"ETH": 3.0}, timestamp=DAY_2)
+
+    assert len(get_parts(store, "2026-10-01")) == 1
+    assert os.listdir(store._get_partition_dir("arbitrum", "long_open_interest", "2026-10-02"))
+    assert list(store.read("arbitrum", "long_open_interest")['ETH']) == [1.0, 2.0, 3.0]